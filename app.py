@@ -1,8 +1,12 @@
 from flask import Flask
 from src.routes import init_routes
-from src.k8s_client import load_kube_config
+from src.k8s_client import load_kube_config, enable_search_index, enable_namespace_counts, enable_owner_index, enable_volume_index, enable_live_updates, start_metrics_sampler
+from src.informer import informers_enabled, start_informers
+from src.cache_server import connect_cache_server
+from src.profiling import start_continuous_profiler
 
 import logging
+import os
 
 logging.basicConfig(
     level=logging.INFO,  # Ensure it captures DEBUG and above logs
@@ -12,13 +16,37 @@ logging.basicConfig(
     ],
 )
 
-# Create Flask app
-app = Flask(__name__, template_folder="templates", static_folder="static")
+def create_app():
+    """Create the Flask app and start (or connect to) the shared Kubernetes caches."""
+    app = Flask(__name__, template_folder="templates", static_folder="static")
 
-load_kube_config()
+    load_kube_config()
 
-# Initialize routes
-init_routes(app)
+    cache_url = os.getenv("KUBEFUN_CACHE_URL")
+    if cache_url:
+        # Informers run once in the shared cache process (see gunicorn.conf.py)
+        connect_cache_server(cache_url)
+    elif informers_enabled():
+        # Start shared LIST+WATCH caches; list pages fall back to direct LISTs until they sync
+        start_informers()
+        enable_search_index()
+        enable_namespace_counts()
+        enable_owner_index()
+        enable_volume_index()
+        enable_live_updates()
+
+    # Sample node and pod metrics in the background for /nodes, /pods and the metrics history API
+    start_metrics_sampler()
+
+    # Opt-in low-rate stack sampling into a bounded on-disk buffer (KUBEFUN_PROFILE_CONTINUOUS_HZ)
+    start_continuous_profiler()
+
+    # Initialize routes
+    init_routes(app)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=39027)
@@ -0,0 +1,26 @@
+"""
+ASGI entry point for kubefun.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Flask is a WSGI app: a2wsgi runs every request, including live update
+streams, on a pool of KUBEFUN_ASGI_WORKERS threads, and each Kubernetes call
+blocks its thread. Concurrent requests per process are therefore capped by
+that pool, as with gunicorn's gthread worker; this entry point does not serve
+more requests at once than the same number of threads would. Only accepting
+and parsing connections moves to the event loop, so idle keep-alive clients
+do not hold a thread.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app
+from src.live_updates import live_hub
+
+ASGI_WORKERS = int(os.getenv("KUBEFUN_ASGI_WORKERS", "32"))
+
+# A live update stream holds one of the view threads for as long as it is open
+live_hub.limit_to_threads(ASGI_WORKERS)
+
+app = WSGIMiddleware(flask_app, workers=ASGI_WORKERS)
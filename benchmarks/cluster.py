@@ -0,0 +1,272 @@
+"""
+Synthetic Kubernetes clusters for the benchmark apiserver.
+
+generate_cluster() returns {resource: [objects]} keyed by the resource names
+of benchmarks/fake_apiserver.py. Objects carry the bulk real clusters have
+(labels, managedFields, last-applied-configuration annotations, container
+specs) so decode and memory costs are representative, and are linked the way
+the apiserver links them: Pod -> ReplicaSet -> Deployment and
+Pod -> StatefulSet owner references, PVC spec.volumeName <-> PV claimRef.
+"""
+import base64
+import json
+import random
+
+# Preset sizes; any count can be overridden from the command line
+SIZES = {
+    "small": {
+        "nodes": 5, "namespaces": 5, "deployments": 40, "statefulsets": 5, "pods_per_workload": 3,
+        "services": 40, "secrets": 100, "pvcs": 50, "unbound_pvs": 5, "crds": 20, "cluster_roles": 20,
+    },
+    "medium": {
+        "nodes": 50, "namespaces": 50, "deployments": 1000, "statefulsets": 100, "pods_per_workload": 4,
+        "services": 1000, "secrets": 2000, "pvcs": 1000, "unbound_pvs": 100, "crds": 100, "cluster_roles": 100,
+    },
+    "large": {
+        "nodes": 500, "namespaces": 200, "deployments": 10000, "statefulsets": 1000, "pods_per_workload": 4,
+        "services": 10000, "secrets": 20000, "pvcs": 20000, "unbound_pvs": 2000, "crds": 300, "cluster_roles": 500,
+    },
+}
+
+CREATED = "2024-01-01T00:00:00Z"
+# Pods of the first workloads get events, so /pod pages have something to list
+EVENTED_PODS = 200
+
+
+def _metadata(name, namespace=None, labels=None, owner=None, applied=None):
+    metadata = {
+        "name": name,
+        "uid": f"uid-{namespace or '_'}-{name}",
+        "resourceVersion": "1",
+        "creationTimestamp": CREATED,
+        "labels": labels or {},
+        "managedFields": [{
+            "manager": "kubectl-client-side-apply",
+            "operation": "Update",
+            "apiVersion": "v1",
+            "time": CREATED,
+            "fieldsType": "FieldsV1",
+            "fieldsV1": {"f:metadata": {"f:labels": {f"f:{key}": {} for key in (labels or {})}}, "f:spec": {".": {}}},
+        }],
+    }
+    if namespace:
+        metadata["namespace"] = namespace
+    if owner:
+        kind, owner_name, controller = owner
+        metadata["ownerReferences"] = [{
+            "apiVersion": "apps/v1", "kind": kind, "name": owner_name,
+            "uid": f"uid-{namespace}-{owner_name}", "controller": controller, "blockOwnerDeletion": True,
+        }]
+    if applied is not None:
+        metadata["annotations"] = {"kubectl.kubernetes.io/last-applied-configuration": json.dumps(applied)}
+    return metadata
+
+def _container(name, rng):
+    return {
+        "name": name,
+        "image": f"registry.example.com/{name}:{rng.randint(1, 40)}.{rng.randint(0, 9)}",
+        "ports": [{"containerPort": 8080, "protocol": "TCP"}],
+        "env": [{"name": f"SETTING_{i}", "value": f"value-{i}"} for i in range(5)],
+        "resources": {
+            "requests": {"cpu": f"{rng.choice([50, 100, 250, 500])}m", "memory": f"{rng.choice([64, 128, 256, 512])}Mi"},
+            "limits": {"cpu": "1", "memory": "1Gi"},
+        },
+    }
+
+def _pod_template(app, rng):
+    return {"metadata": {"labels": {"app": app}}, "spec": {"containers": [_container(app, rng)]}}
+
+def _pod(name, namespace, app, owner, node, rng):
+    template = _pod_template(app, rng)
+    phase = rng.choices(["Running", "Pending", "Succeeded", "Failed"], weights=[90, 5, 3, 2])[0]
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": _metadata(name, namespace, labels={"app": app}, owner=owner),
+        "spec": {**template["spec"], "nodeName": node, "restartPolicy": "Always"},
+        "status": {
+            "phase": phase,
+            "podIP": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "conditions": [{"type": "Ready", "status": "True" if phase == "Running" else "False"}],
+            "containerStatuses": [{"name": app, "ready": phase == "Running", "restartCount": rng.randint(0, 3)}],
+        },
+    }
+
+def generate_cluster(size="small", seed=0, **overrides):
+    """Build a synthetic cluster from a preset size with optional per-count overrides."""
+    counts = {**SIZES[size], **{key: value for key, value in overrides.items() if value is not None}}
+    rng = random.Random(seed)
+    namespaces = [f"ns-{i}" for i in range(counts["namespaces"])]
+    nodes = [f"node-{i}" for i in range(counts["nodes"])]
+    cluster = {resource: [] for resource in (
+        "nodes", "namespaces", "pods", "services", "secrets", "persistentvolumes", "persistentvolumeclaims",
+        "events", "deployments", "statefulsets", "replicasets", "storageclasses", "customresourcedefinitions",
+        "clusterroles", "clusterrolebindings", "nodemetrics", "podmetrics",
+    )}
+
+    for name in nodes:
+        cluster["nodes"].append({
+            "apiVersion": "v1", "kind": "Node",
+            "metadata": _metadata(name, labels={"kubernetes.io/hostname": name}),
+            "status": {
+                "capacity": {"cpu": "16", "memory": "65843680Ki", "pods": "110"},
+                "conditions": [{"type": "Ready", "status": "True" if rng.random() > 0.02 else "False"}],
+                "images": [{"names": [f"registry.example.com/image-{i}:1.0"], "sizeBytes": 1000000} for i in range(10)],
+            },
+        })
+        cluster["nodemetrics"].append({
+            "metadata": {"name": name},
+            "usage": {"cpu": f"{rng.randint(100, 15000)}m", "memory": f"{rng.randint(1000000, 60000000)}Ki"},
+        })
+
+    for namespace in namespaces:
+        cluster["namespaces"].append({
+            "apiVersion": "v1", "kind": "Namespace",
+            "metadata": _metadata(namespace, labels={"kubernetes.io/metadata.name": namespace}),
+            "status": {"phase": "Active"},
+        })
+
+    pods_per_workload = counts["pods_per_workload"]
+    for i in range(counts["deployments"]):
+        namespace, app = namespaces[i % len(namespaces)], f"app-{i}"
+        spec = {"replicas": pods_per_workload, "selector": {"matchLabels": {"app": app}},
+                "strategy": {"type": "RollingUpdate"}, "template": _pod_template(app, rng)}
+        cluster["deployments"].append({
+            "apiVersion": "apps/v1", "kind": "Deployment",
+            "metadata": _metadata(app, namespace, labels={"app": app}, applied={"spec": spec}),
+            "spec": spec,
+            "status": {"replicas": pods_per_workload, "readyReplicas": pods_per_workload - 1 if i % 7 == 0 else pods_per_workload},
+        })
+        replica_set = f"{app}-5d8f7c9b6"
+        cluster["replicasets"].append({
+            "apiVersion": "apps/v1", "kind": "ReplicaSet",
+            "metadata": _metadata(replica_set, namespace, labels={"app": app}, owner=("Deployment", app, True)),
+            "spec": {"replicas": pods_per_workload, "selector": {"matchLabels": {"app": app}}},
+            "status": {"replicas": pods_per_workload, "readyReplicas": pods_per_workload},
+        })
+        for j in range(pods_per_workload):
+            cluster["pods"].append(_pod(f"{replica_set}-{j:05d}", namespace, app,
+                                        ("ReplicaSet", replica_set, True), rng.choice(nodes), rng))
+
+    for i in range(counts["statefulsets"]):
+        namespace, app = namespaces[i % len(namespaces)], f"db-{i}"
+        spec = {"replicas": pods_per_workload, "serviceName": app, "selector": {"matchLabels": {"app": app}},
+                "template": _pod_template(app, rng)}
+        cluster["statefulsets"].append({
+            "apiVersion": "apps/v1", "kind": "StatefulSet",
+            "metadata": _metadata(app, namespace, labels={"app": app}, applied={"spec": spec}),
+            "spec": spec,
+            "status": {"replicas": pods_per_workload, "readyReplicas": pods_per_workload},
+        })
+        for j in range(pods_per_workload):
+            cluster["pods"].append(_pod(f"{app}-{j}", namespace, app, ("StatefulSet", app, True), rng.choice(nodes), rng))
+
+    for pod in cluster["pods"]:
+        metadata = pod["metadata"]
+        cluster["podmetrics"].append({
+            "metadata": {"name": metadata["name"], "namespace": metadata["namespace"]},
+            "containers": [{"name": container["name"], "usage": {
+                "cpu": f"{rng.randint(1, 900000000)}n", "memory": f"{rng.randint(10000, 900000)}Ki",
+            }} for container in pod["spec"]["containers"]],
+        })
+    for pod in cluster["pods"][:EVENTED_PODS]:
+        metadata = pod["metadata"]
+        for j, reason in enumerate(("Scheduled", "Pulled", "Created", "Started")):
+            cluster["events"].append({
+                "apiVersion": "v1", "kind": "Event",
+                "metadata": _metadata(f"{metadata['name']}.{j:x}", metadata["namespace"]),
+                "involvedObject": {"kind": "Pod", "name": metadata["name"], "namespace": metadata["namespace"]},
+                "reason": reason, "message": f"{reason} {metadata['name']}", "type": "Normal", "count": 1,
+            })
+
+    for i in range(counts["services"]):
+        namespace, app = namespaces[i % len(namespaces)], f"app-{i}"
+        spec = {"type": rng.choice(["ClusterIP", "ClusterIP", "ClusterIP", "NodePort", "LoadBalancer"]),
+                "clusterIP": f"10.96.{i // 250 % 256}.{i % 250 + 1}", "selector": {"app": app},
+                "ports": [{"name": "http", "port": 80, "protocol": "TCP", "targetPort": 8080}]}
+        cluster["services"].append({
+            "apiVersion": "v1", "kind": "Service",
+            "metadata": _metadata(f"svc-{i}", namespace, labels={"app": app}, applied={"spec": spec}),
+            "spec": spec, "status": {"loadBalancer": {}},
+        })
+
+    for i in range(counts["secrets"]):
+        payload = base64.b64encode(rng.randbytes(128).hex().encode()).decode()
+        cluster["secrets"].append({
+            "apiVersion": "v1", "kind": "Secret",
+            "metadata": _metadata(f"secret-{i}", namespaces[i % len(namespaces)]),
+            "type": rng.choice(["Opaque", "kubernetes.io/tls", "kubernetes.io/dockerconfigjson"]),
+            "data": {"key": payload, "other": payload[:64]},
+        })
+
+    storage_classes = ["standard", "fast-ssd", "archive"]
+    for name in storage_classes:
+        cluster["storageclasses"].append({
+            "apiVersion": "storage.k8s.io/v1", "kind": "StorageClass",
+            "metadata": _metadata(name), "provisioner": "csi.example.com",
+            "reclaimPolicy": "Delete", "volumeBindingMode": "WaitForFirstConsumer",
+        })
+    for i in range(counts["pvcs"]):
+        namespace, claim, volume = namespaces[i % len(namespaces)], f"data-{i}", f"pvc-{i:08x}"
+        storage_class = storage_classes[i % len(storage_classes)]
+        # Every tenth claim is still pending, with no volume
+        bound = i % 10 != 0
+        spec = {"storageClassName": storage_class, "accessModes": ["ReadWriteOnce"],
+                "resources": {"requests": {"storage": "10Gi"}}}
+        if bound:
+            spec["volumeName"] = volume
+        cluster["persistentvolumeclaims"].append({
+            "apiVersion": "v1", "kind": "PersistentVolumeClaim",
+            "metadata": _metadata(claim, namespace),
+            "spec": spec,
+            "status": {"phase": "Bound" if bound else "Pending", "capacity": {"storage": "10Gi"} if bound else {}},
+        })
+        if bound:
+            cluster["persistentvolumes"].append({
+                "apiVersion": "v1", "kind": "PersistentVolume",
+                "metadata": _metadata(volume),
+                "spec": {"capacity": {"storage": "10Gi"}, "storageClassName": storage_class,
+                         "claimRef": {"kind": "PersistentVolumeClaim", "namespace": namespace, "name": claim},
+                         "csi": {"driver": "csi.example.com", "volumeHandle": volume}},
+                "status": {"phase": "Bound"},
+            })
+    for i in range(counts["unbound_pvs"]):
+        cluster["persistentvolumes"].append({
+            "apiVersion": "v1", "kind": "PersistentVolume",
+            "metadata": _metadata(f"pv-available-{i}"),
+            "spec": {"capacity": {"storage": "100Gi"}, "storageClassName": "archive"},
+            "status": {"phase": "Available"},
+        })
+
+    for i in range(counts["crds"]):
+        group, plural = f"group{i % 10}.example.com", f"widgets{i}"
+        schema = {"type": "object", "properties": {
+            f"field{j}": {"type": "string", "description": "x" * 80} for j in range(20)
+        }}
+        cluster["customresourcedefinitions"].append({
+            "apiVersion": "apiextensions.k8s.io/v1", "kind": "CustomResourceDefinition",
+            "metadata": _metadata(f"{plural}.{group}"),
+            "spec": {"group": group, "scope": "Namespaced",
+                     "names": {"kind": f"Widget{i}", "plural": plural},
+                     "versions": [{"name": "v1", "served": True, "storage": True,
+                                   "schema": {"openAPIV3Schema": schema}}]},
+        })
+
+    for i in range(counts["cluster_roles"]):
+        cluster["clusterroles"].append({
+            "apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRole",
+            "metadata": _metadata(f"role-{i}"),
+            "rules": [{"apiGroups": [""], "resources": ["pods", "services"], "verbs": ["get", "list", "watch"]}],
+        })
+        cluster["clusterrolebindings"].append({
+            "apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRoleBinding",
+            "metadata": _metadata(f"role-{i}-binding"),
+            "roleRef": {"apiGroup": "rbac.authorization.k8s.io", "kind": "ClusterRole", "name": f"role-{i}"},
+            "subjects": [{"kind": "ServiceAccount", "name": f"sa-{i}", "namespace": namespaces[i % len(namespaces)]}],
+        })
+
+    return cluster
+
+def describe(cluster):
+    """Object counts per resource, stored with every result."""
+    return {resource: len(objects) for resource, objects in cluster.items()}
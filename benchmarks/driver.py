@@ -0,0 +1,238 @@
+"""
+Measure one kubefun process against the benchmark apiserver.
+
+benchmarks/run.py starts this module in a fresh process for every mode,
+since kubefun keeps its caches at module level, with the environment already
+pointing kubefun at the fake apiserver (KUBECONFIG, KUBEFUN_* settings). It
+drives every GET route of the Flask app and every get_*/search_* function of
+src/k8s_client.py, then prints one JSON document on stdout.
+"""
+import argparse
+import inspect
+import json
+import logging
+import math
+import resource
+import sys
+import time
+import urllib.request
+
+# Endpoints that never finish on their own
+SKIPPED_ENDPOINTS = {"static", "live_updates"}
+
+DATATABLES_QUERY = (
+    "draw=1&start=0&length=25&columns[0][data]=name&columns[1][data]=namespace"
+    "&order[0][column]=0&order[0][dir]=asc&search[value]="
+)
+
+# Extra query strings measured per endpoint, besides the bare URL
+QUERY_VARIANTS = {
+    "search": ["query=app-1"],
+    "pods": ["", "namespace={namespace}"],
+    "deployments": ["", "namespace={namespace}"],
+    "services": ["", "namespace={namespace}"],
+    "secrets": ["", "namespace={namespace}"],
+    "table_data": [DATATABLES_QUERY, DATATABLES_QUERY + "app-1", DATATABLES_QUERY + "&namespace={namespace}"],
+}
+
+# Route and function parameter -> key of the object names passed in by run.py
+ARGUMENTS = {
+    "node_name": "node",
+    "namespace_name": "namespace",
+    "namespace": "namespace",
+    "deployment_name": "deployment",
+    "statefulset_name": "statefulset",
+    "stateful_name": "statefulset",
+    "pod_name": "pod",
+    "service_name": "service",
+    "secret_name": "secret",
+    "storageclass_name": "storage_class",
+    "query": "query",
+}
+
+# Parameters whose meaning depends on the route or function
+ENDPOINT_ARGUMENTS = {
+    "statefulset_details": {"name": "statefulset"},
+    "pv_details": {"name": "pv"},
+    "pvc_details": {"namespace": "pvc_namespace", "name": "pvc"},
+    "node_metrics_history": {"name": "node"},
+    "pod_metrics_history": {"namespace": "pod_namespace", "name": "pod"},
+    "pod_events": {"namespace": "pod_namespace"},
+    "pod_details": {"namespace": "pod_namespace"},
+    "get_pod_details": {"namespace": "pod_namespace"},
+    "get_pod_events": {"namespace": "pod_namespace"},
+    "get_pv_details": {"name": "pv"},
+    "get_pvc_details": {"namespace": "pvc_namespace", "name": "pvc"},
+    "get_metrics_version": {"source": "metrics_source"},
+    "get_metrics_history": {"source": "metrics_source", "name": "pod", "namespace": "pod_namespace"},
+}
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+class ApiserverRequests:
+    """Read the fake apiserver's request counters, excluding long-running WATCHes."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def snapshot(self):
+        with urllib.request.urlopen(f"{self.url}/_bench/requests") as response:
+            return json.load(response)
+
+    def total(self):
+        return sum(count for key, count in self.snapshot().items() if not key.startswith("WATCH "))
+
+def measure(call, iterations, requests):
+    """Time one cold call and `iterations` warm calls, with the apiserver requests they made."""
+    before = requests.total()
+    started = time.perf_counter()
+    outcome = call()
+    first_ms = (time.perf_counter() - started) * 1000
+    first_requests = requests.total() - before
+
+    samples = []
+    before = requests.total()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    result = {
+        "first_ms": round(first_ms, 3),
+        "first_requests": first_requests,
+        "requests_per_call": round((requests.total() - before) / iterations, 3) if iterations else None,
+    }
+    if samples:
+        result.update({
+            "p50_ms": round(percentile(samples, 0.50), 3),
+            "p90_ms": round(percentile(samples, 0.90), 3),
+            "p99_ms": round(percentile(samples, 0.99), 3),
+            "max_ms": round(samples[-1], 3),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+        })
+    if outcome is not None:
+        result.update(outcome)
+    return result
+
+def _arguments(endpoint, parameters, names):
+    overrides = ENDPOINT_ARGUMENTS.get(endpoint, {})
+    values = {}
+    for parameter in parameters:
+        key = overrides.get(parameter, ARGUMENTS.get(parameter))
+        if key is None:
+            return None
+        values[parameter] = names[key]
+    return values
+
+def route_targets(app, names):
+    """Yield (label, url) for every GET route, with the query variants of QUERY_VARIANTS."""
+    with app.test_request_context():
+        from flask import url_for
+
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+            if rule.endpoint in SKIPPED_ENDPOINTS or "GET" not in rule.methods:
+                continue
+            kinds = [None]
+            if rule.endpoint == "table_data":
+                from src.routes import TABLE_SOURCES
+                kinds = list(TABLE_SOURCES)
+            for kind in kinds:
+                arguments = _arguments(rule.endpoint, [arg for arg in rule.arguments if arg != "kind"], names)
+                if arguments is None:
+                    yield rule.rule, None
+                    continue
+                if kind is not None:
+                    arguments["kind"] = kind
+                path = url_for(rule.endpoint, **arguments)
+                for query in QUERY_VARIANTS.get(rule.endpoint, [""]):
+                    query = query.format(**names)
+                    url = f"{path}?{query}" if query else path
+                    yield url, url
+
+def function_targets(module, names):
+    """Yield (label, callable) for every get_*/search_* function, plus namespaced variants."""
+    for name, function in sorted(vars(module).items()):
+        if not name.startswith(("get_", "search_")) or not inspect.isfunction(function):
+            continue
+        if function.__module__ != module.__name__:
+            continue
+        parameters = inspect.signature(function).parameters
+        required = [parameter for parameter, spec in parameters.items() if spec.default is inspect.Parameter.empty]
+        arguments = _arguments(name, required, names)
+        if arguments is None:
+            yield name, None
+            continue
+        yield f"{name}({', '.join(map(repr, arguments.values()))})", (function, arguments)
+        if "namespace" in parameters and "namespace" not in arguments:
+            namespaced = {**arguments, "namespace": names["namespace"]}
+            yield f"{name}({', '.join(map(repr, namespaced.values()))})", (function, namespaced)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--apiserver", required=True)
+    parser.add_argument("--mode", required=True)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--names", required=True, help="JSON object of sample object names")
+    parser.add_argument("--sync-timeout", type=float, default=600)
+    args = parser.parse_args()
+    names = json.loads(args.names)
+    requests = ApiserverRequests(args.apiserver)
+
+    started = time.perf_counter()
+    import app as kubefun
+    from src import k8s_client
+    from src.informer import wait_for_informers
+    from src.snapshot import begin_snapshot, end_snapshot
+
+    logging.getLogger().setLevel(logging.WARNING)
+    synced = wait_for_informers(args.sync_timeout)
+    result = {
+        "mode": args.mode,
+        "startup_s": round(time.perf_counter() - started, 3),
+        "informers_synced": synced,
+        "startup_requests": requests.snapshot(),
+        "routes": {},
+        "functions": {},
+    }
+
+    client = kubefun.app.test_client()
+    for label, url in route_targets(kubefun.app, names):
+        if url is None:
+            result["routes"][label] = {"skipped": "no sample value for its arguments"}
+            continue
+
+        def get(url=url):
+            response = client.get(url)
+            # Reading the body runs streamed templates to completion
+            size = len(response.get_data())
+            return {"status": response.status_code, "bytes": size}
+        result["routes"][label] = measure(get, args.iterations, requests)
+
+    for label, target in function_targets(k8s_client, names):
+        if target is None:
+            result["functions"][label] = {"skipped": "no sample value for its arguments"}
+            continue
+        function, arguments = target
+
+        def call(function=function, arguments=arguments):
+            # Each call gets its own request snapshot, as it would inside a route
+            token = begin_snapshot()
+            try:
+                function(**arguments)
+            except Exception as e:
+                return {"error": repr(e)}
+            finally:
+                end_snapshot(token)
+            return None
+        result["functions"][label] = measure(call, args.iterations, requests)
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["watches"] = {key: count for key, count in requests.snapshot().items() if key.startswith("WATCH ")}
+    json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Stand-in Kubernetes apiserver for benchmarks.
+
+Serves a synthetic cluster (benchmarks/cluster.py) over plain HTTP with the
+parts of the API kubefun uses: cluster-wide and namespaced LISTs with
+limit/continue paging and remainingItemCount, GET by name, WATCH streams fed
+by emit(), the involvedObject.name field selector on events, and
+metrics.k8s.io node and pod metrics.
+
+Every object is encoded once up front, so the server's own cost stays small
+next to the client being measured. Requests are counted per verb and
+resource and exposed on two control endpoints:
+
+    GET  /_bench/requests   {"LIST pods": 3, "GET nodes": 1, "WATCH pods": 1, ...}
+    POST /_bench/reset      clear the counters
+"""
+import json
+import queue
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Resource name in benchmarks/cluster.py -> (API prefix, URL plural, List kind, namespaced)
+RESOURCES = {
+    "nodes": ("/api/v1", "nodes", "NodeList", False),
+    "namespaces": ("/api/v1", "namespaces", "NamespaceList", False),
+    "pods": ("/api/v1", "pods", "PodList", True),
+    "services": ("/api/v1", "services", "ServiceList", True),
+    "secrets": ("/api/v1", "secrets", "SecretList", True),
+    "persistentvolumes": ("/api/v1", "persistentvolumes", "PersistentVolumeList", False),
+    "persistentvolumeclaims": ("/api/v1", "persistentvolumeclaims", "PersistentVolumeClaimList", True),
+    "events": ("/api/v1", "events", "EventList", True),
+    "deployments": ("/apis/apps/v1", "deployments", "DeploymentList", True),
+    "statefulsets": ("/apis/apps/v1", "statefulsets", "StatefulSetList", True),
+    "replicasets": ("/apis/apps/v1", "replicasets", "ReplicaSetList", True),
+    "storageclasses": ("/apis/storage.k8s.io/v1", "storageclasses", "StorageClassList", False),
+    "customresourcedefinitions": (
+        "/apis/apiextensions.k8s.io/v1", "customresourcedefinitions", "CustomResourceDefinitionList", False,
+    ),
+    "clusterroles": ("/apis/rbac.authorization.k8s.io/v1", "clusterroles", "ClusterRoleList", False),
+    "clusterrolebindings": ("/apis/rbac.authorization.k8s.io/v1", "clusterrolebindings", "ClusterRoleBindingList", False),
+    "nodemetrics": ("/apis/metrics.k8s.io/v1beta1", "nodes", "NodeMetricsList", False),
+    "podmetrics": ("/apis/metrics.k8s.io/v1beta1", "pods", "PodMetricsList", True),
+}
+_ROUTES = {(prefix, plural): resource for resource, (prefix, plural, _, _) in RESOURCES.items()}
+_PATH = re.compile(r"^(/api/v1|/apis/[^/]+/[^/]+)(?:/namespaces/([^/]+))?/([^/]+)(?:/([^/]+))?$")
+
+# Longest a WATCH is held open, whatever timeoutSeconds the client asks for
+MAX_WATCH_SECONDS = 60
+
+
+def _encode(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class ResourceStore:
+    """Encoded objects of one resource in list order, indexed by namespace and by name."""
+
+    def __init__(self, objects):
+        self.entries = []
+        self.by_key = {}
+        for obj in objects:
+            self.put(obj)
+
+    def put(self, obj):
+        metadata = obj["metadata"]
+        key = (metadata.get("namespace"), metadata["name"])
+        entry = (key, obj, _encode(obj))
+        if key in self.by_key:
+            self.entries[self.entries.index(self.by_key[key])] = entry
+        else:
+            self.entries.append(entry)
+        self.by_key[key] = entry
+
+    def delete(self, obj):
+        metadata = obj["metadata"]
+        entry = self.by_key.pop((metadata.get("namespace"), metadata["name"]), None)
+        if entry is not None:
+            self.entries.remove(entry)
+
+    def select(self, namespace=None, involved_name=None):
+        entries = self.entries
+        if namespace:
+            entries = [entry for entry in entries if entry[0][0] == namespace]
+        if involved_name:
+            entries = [entry for entry in entries if entry[1].get("involvedObject", {}).get("name") == involved_name]
+        return entries
+
+
+class FakeApiServer:
+    """Serve a synthetic cluster on 127.0.0.1 until stop() is called."""
+
+    def __init__(self, cluster, host="127.0.0.1", port=0):
+        self.stores = {resource: ResourceStore(cluster.get(resource, [])) for resource in RESOURCES}
+        self.resource_version = 1000
+        self.requests = Counter()
+        self._watchers = defaultdict(list)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.apiserver = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-apiserver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def write_kubeconfig(self, path):
+        """Write a kubeconfig whose current context points at this server."""
+        config = {
+            "apiVersion": "v1", "kind": "Config", "current-context": "bench",
+            "clusters": [{"name": "bench", "cluster": {"server": self.url}}],
+            "contexts": [{"name": "bench", "context": {"cluster": "bench", "user": "bench"}}],
+            "users": [{"name": "bench", "user": {"token": "bench"}}],
+        }
+        with open(path, "w") as f:
+            json.dump(config, f)
+        return path
+
+    def emit(self, resource, event_type, obj):
+        """Apply an ADDED/MODIFIED/DELETED change and send it to open watches of the resource."""
+        with self._lock:
+            self.resource_version += 1
+            obj["metadata"]["resourceVersion"] = str(self.resource_version)
+            store = self.stores[resource]
+            if event_type == "DELETED":
+                store.delete(obj)
+            else:
+                store.put(obj)
+            line = _encode({"type": event_type, "object": obj}) + b"\n"
+            for namespace, events in self._watchers[resource]:
+                if namespace is None or namespace == obj["metadata"].get("namespace"):
+                    events.put(line)
+
+    def count(self, verb, resource):
+        with self._lock:
+            self.requests[f"{verb} {resource}"] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer each response so headers and body leave in one write instead of waiting on delayed ACKs
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _status(self, code, reason, message):
+        self._send(code, _encode({
+            "kind": "Status", "apiVersion": "v1", "status": "Failure",
+            "code": code, "reason": reason, "message": message,
+        }))
+
+    def do_POST(self):
+        apiserver = self.server.apiserver
+        if self.path == "/_bench/reset":
+            with apiserver._lock:
+                apiserver.requests.clear()
+            self._send(200, b"{}")
+        else:
+            self._status(404, "NotFound", self.path)
+
+    def do_GET(self):
+        apiserver = self.server.apiserver
+        url = urlsplit(self.path)
+        if url.path == "/_bench/requests":
+            with apiserver._lock:
+                self._send(200, _encode(dict(apiserver.requests)))
+            return
+
+        match = _PATH.match(url.path)
+        resource = match and _ROUTES.get((match.group(1), match.group(3)))
+        if resource is None:
+            self._status(404, "NotFound", f"the server could not find the requested resource {url.path}")
+            return
+        _, namespace, _, name = match.groups()
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        store = apiserver.stores[resource]
+
+        if name is not None:
+            apiserver.count("GET", resource)
+            entry = store.by_key.get((namespace, name))
+            if entry is None:
+                self._status(404, "NotFound", f'{resource} "{name}" not found')
+            else:
+                self._send(200, entry[2])
+            return
+
+        if query.get("watch", "").lower() in ("true", "1"):
+            apiserver.count("WATCH", resource)
+            self._watch(resource, namespace, float(query.get("timeoutSeconds", MAX_WATCH_SECONDS)))
+            return
+
+        apiserver.count("LIST", resource)
+        field_selector = query.get("fieldSelector", "")
+        involved_name = field_selector.split("=", 1)[1] if field_selector.startswith("involvedObject.name=") else None
+        with apiserver._lock:
+            entries = store.select(namespace, involved_name)
+            resource_version = str(apiserver.resource_version)
+        start = int(query.get("continue") or 0)
+        limit = int(query.get("limit") or 0)
+        metadata = {"resourceVersion": resource_version}
+        page = entries[start:]
+        if limit and len(page) > limit:
+            page = page[:limit]
+            metadata["continue"] = str(start + limit)
+            metadata["remainingItemCount"] = len(entries) - start - limit
+        body = b'{"kind":"%s","apiVersion":"v1","metadata":%s,"items":[%s]}' % (
+            RESOURCES[resource][2].encode(), _encode(metadata), b",".join(entry[2] for entry in page),
+        )
+        self._send(200, body)
+
+    def _watch(self, resource, namespace, timeout):
+        apiserver = self.server.apiserver
+        events = queue.Queue()
+        watcher = (namespace, events)
+        with apiserver._lock:
+            apiserver._watchers[resource].append(watcher)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+        deadline = time.monotonic() + min(timeout, MAX_WATCH_SECONDS)
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    line = events.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            self.close_connection = True
+        finally:
+            with apiserver._lock:
+                apiserver._watchers[resource].remove(watcher)
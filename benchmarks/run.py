@@ -0,0 +1,289 @@
+"""
+Offline benchmark suite for kubefun.
+
+    python -m benchmarks.run --size small
+    python -m benchmarks.run --size large --modes informers,shared --iterations 10
+    python -m benchmarks.run --size medium --pods-per-workload 10 --churn 20 --fail-on-regression
+
+Starts a fake apiserver (benchmarks/fake_apiserver.py) holding a synthetic
+cluster (benchmarks/cluster.py), then measures kubefun in a fresh process for
+each mode:
+
+    direct      KUBEFUN_INFORMERS=false; pages read the apiserver through the TTL caches
+    informers   LIST+WATCH informers in the web process (`python app.py`)
+    shared      informers in the shared cache process (the gunicorn default)
+
+For every GET route and every get_*/search_* function of src/k8s_client.py it
+records the first (cold) call and the latency percentiles of warm calls, with
+the apiserver requests each made, plus startup time and peak RSS per process.
+Results are written to benchmarks/results/<size>/<timestamp>-<commit>.json and
+compared with the previous result of the same size, so regressions between
+versions show up. Request counts of warm calls depend on whether a TTL cache
+entry expired mid-run; use --no-cache when comparing them exactly.
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+from .cluster import SIZES, describe, generate_cluster
+from .fake_apiserver import FakeApiServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MODES = ("direct", "informers", "shared")
+
+
+def sample_names(cluster):
+    """Pick the objects detail routes and functions are measured with."""
+    pod = cluster["pods"][0]["metadata"]
+    bound = next((pv for pv in cluster["persistentvolumes"] if pv["spec"].get("claimRef")), None)
+    claim = bound["spec"]["claimRef"] if bound else {"name": "missing", "namespace": "ns-0"}
+    first = lambda resource: cluster[resource][0]["metadata"]["name"] if cluster[resource] else "missing"
+    return {
+        "node": first("nodes"),
+        "namespace": first("namespaces"),
+        "deployment": first("deployments"),
+        "statefulset": first("statefulsets"),
+        "pod": pod["name"],
+        "pod_namespace": pod["namespace"],
+        "service": first("services"),
+        "secret": first("secrets"),
+        "storage_class": first("storageclasses"),
+        "pv": bound["metadata"]["name"] if bound else "missing",
+        "pvc": claim["name"],
+        "pvc_namespace": claim["namespace"],
+        "query": "app-1",
+        "metrics_source": "pods",
+    }
+
+def git_version():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+
+def peak_rss_mb(pid):
+    """Peak resident set size of another process (Linux only), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def churn(apiserver, cluster, rate, stop):
+    """Modify random pods `rate` times per second, as a busy cluster would, until stop is set."""
+    rng = random.Random(1)
+    pods = cluster["pods"]
+    while not stop.wait(1 / rate):
+        pod = rng.choice(pods)
+        statuses = pod["status"]["containerStatuses"]
+        statuses[0]["restartCount"] += 1
+        apiserver.emit("pods", "MODIFIED", pod)
+
+def start_cache_server(env, timeout):
+    """Start the shared cache process and wait until every informer has synced."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.cache_server"], cwd=ROOT,
+        env={**env, "KUBEFUN_CACHE_PORT": str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The shared cache process exited during startup.")
+        try:
+            with urllib.request.urlopen(f"{url}/status", timeout=1) as response:
+                if all(version is not None for version in json.load(response).values()):
+                    return process, url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The shared cache process did not sync in time.")
+
+def run_mode(mode, apiserver, names, env, args):
+    env = dict(env)
+    cache_process = None
+    if mode == "direct":
+        env["KUBEFUN_INFORMERS"] = "false"
+    elif mode == "informers":
+        env["KUBEFUN_INFORMERS"] = "true"
+    elif mode == "shared":
+        env["KUBEFUN_CACHE_TOKEN"] = secrets.token_urlsafe(32)
+        started = time.perf_counter()
+        cache_process, env["KUBEFUN_CACHE_URL"] = start_cache_server(env, args.sync_timeout)
+        cache_startup = time.perf_counter() - started
+
+    command = [
+        sys.executable, "-m", "benchmarks.driver", "--apiserver", apiserver.url, "--mode", mode,
+        "--iterations", str(args.iterations), "--names", json.dumps(names), "--sync-timeout", str(args.sync_timeout),
+    ]
+    try:
+        completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr[-4000:])
+            raise RuntimeError(f"Benchmark driver for mode {mode} failed with exit code {completed.returncode}.")
+        result = json.loads(completed.stdout)
+        if cache_process is not None:
+            result["cache_server"] = {"startup_s": round(cache_startup, 3), "peak_rss_mb": peak_rss_mb(cache_process.pid)}
+        return result
+    finally:
+        if cache_process is not None:
+            cache_process.terminate()
+            cache_process.wait(10)
+
+def latest_result(size, exclude=None):
+    directory = os.path.join(RESULTS_DIR, size)
+    if not os.path.isdir(directory):
+        return None
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(".json") and os.path.join(directory, name) != exclude
+    )
+    return paths[-1] if paths else None
+
+def compare(previous, current, threshold, min_delta_ms):
+    """Return human-readable regressions of `current` against `previous`."""
+    regressions = []
+    for mode, result in current["modes"].items():
+        before = previous["modes"].get(mode)
+        if before is None:
+            continue
+        old_rss, new_rss = before.get("peak_rss_mb"), result.get("peak_rss_mb")
+        if old_rss and new_rss and new_rss > old_rss * (1 + threshold):
+            regressions.append(f"{mode}: peak RSS {old_rss} MB -> {new_rss} MB")
+        for section in ("routes", "functions"):
+            for target, new in result[section].items():
+                old = before.get(section, {}).get(target)
+                if not old or "p50_ms" not in old or "p50_ms" not in new:
+                    continue
+                if new["p50_ms"] > old["p50_ms"] * (1 + threshold) and new["p50_ms"] - old["p50_ms"] > min_delta_ms:
+                    regressions.append(f"{mode} {target}: p50 {old['p50_ms']} ms -> {new['p50_ms']} ms")
+                for counter in ("requests_per_call", "first_requests"):
+                    if (new.get(counter) or 0) > (old.get(counter) or 0):
+                        regressions.append(f"{mode} {target}: {counter} {old.get(counter)} -> {new.get(counter)}")
+    return regressions
+
+def print_summary(result):
+    for mode, run in result["modes"].items():
+        line = f"\n== {mode}: startup {run['startup_s']}s, peak RSS {run['peak_rss_mb']} MB"
+        if "cache_server" in run:
+            line += f", cache process {run['cache_server']['peak_rss_mb']} MB"
+        print(line)
+        print(f"{'route':58s} {'first ms':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'req/call':>8s} {'first req':>9s}")
+        for target, timing in run["routes"].items():
+            if "p50_ms" not in timing:
+                print(f"{target[:58]:58s} {timing.get('skipped') or timing.get('error')}")
+                continue
+            print(f"{target[:58]:58s} {timing['first_ms']:9.1f} {timing['p50_ms']:8.2f} {timing['p99_ms']:8.2f} "
+                  f"{timing['requests_per_call']:8.2f} {timing['first_requests']:9d}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kubefun against a fake apiserver with a synthetic cluster.")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    for count in SIZES["small"]:
+        parser.add_argument(f"--{count.replace('_', '-')}", type=int, dest=count, help=f"override the preset {count}")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated, from {', '.join(MODES)}")
+    parser.add_argument("--iterations", type=int, default=20, help="warm calls measured per route and function")
+    parser.add_argument("--no-cache", action="store_true", help="disable the render cache and the TTL caches")
+    parser.add_argument("--churn", type=float, default=0, help="pod modifications per second while measuring")
+    parser.add_argument("--sync-timeout", type=float, default=600)
+    parser.add_argument("--output", default=None, help="result file (default benchmarks/results/<size>/...)")
+    parser.add_argument("--compare", default="latest", help="result file to compare with, 'latest' or 'none'")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="smaller slowdowns are treated as noise")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"unknown mode {mode}")
+
+    overrides = {count: getattr(args, count) for count in SIZES["small"]}
+    cluster = generate_cluster(args.size, **overrides)
+    apiserver = FakeApiServer(cluster).start()
+    names = sample_names(cluster)
+    print(f"Fake apiserver on {apiserver.url} with {describe(cluster)}")
+
+    workdir = tempfile.mkdtemp(prefix="kubefun-bench-")
+    env = {key: value for key, value in os.environ.items() if key != "KUBEFUN_CACHE_URL"}
+    env.update({
+        "KUBECONFIG": apiserver.write_kubeconfig(os.path.join(workdir, "kubeconfig")),
+        # One metrics sample at startup, so sampler traffic does not land in the measured calls
+        "KUBEFUN_METRICS_INTERVAL": env.get("KUBEFUN_METRICS_INTERVAL", "3600"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    if args.no_cache:
+        env.update({"KUBEFUN_RENDER_CACHE_SIZE": "0", "KUBEFUN_CACHE_MAX_ENTRIES": "0"})
+
+    version = git_version()
+    result = {
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "size": args.size,
+        "cluster": describe(cluster),
+        "settings": {"iterations": args.iterations, "no_cache": args.no_cache, "churn": args.churn,
+                     "overrides": {key: value for key, value in overrides.items() if value is not None}},
+        "modes": {},
+    }
+
+    stop = threading.Event()
+    if args.churn > 0:
+        threading.Thread(target=churn, args=(apiserver, cluster, args.churn, stop), daemon=True).start()
+    try:
+        for mode in modes:
+            print(f"Measuring {mode}...", flush=True)
+            result["modes"][mode] = run_mode(mode, apiserver, names, env, args)
+    finally:
+        stop.set()
+        apiserver.stop()
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, args.size, f"{stamp}-{version['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=1)
+    print_summary(result)
+    print(f"\nResults written to {output}")
+
+    baseline = latest_result(args.size, exclude=os.path.abspath(output)) if args.compare == "latest" else args.compare
+    if baseline and baseline != "none":
+        with open(baseline) as f:
+            previous = json.load(f)
+        regressions = compare(previous, result, args.threshold, args.min_delta_ms)
+        print(f"\nCompared with {baseline} ({previous['version']['commit']}): {len(regressions)} regression(s)")
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
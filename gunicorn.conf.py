@@ -0,0 +1,85 @@
+"""
+Production server configuration for kubefun.
+
+    gunicorn -c gunicorn.conf.py
+
+Runs KUBEFUN_WORKERS preforked workers, by default uvicorn workers serving
+the ASGI app (asgi.py). Flask views still run on KUBEFUN_ASGI_WORKERS threads
+per worker and block them on Kubernetes calls, so concurrency per worker is
+capped by that thread count just as with KUBEFUN_THREADS under gthread; add
+workers or threads to serve more requests at once. The master first starts one shared cache process
+(src/cache_server.py) that owns the informers and the search index,
+namespace counters, owner and volume indexes and live updates built on them,
+so adding workers does not add apiserver watches or object stores. Workers
+ask it for projected rows, counts and search results over localhost.
+
+KUBEFUN_SHARED_CACHE=false instead has every worker run its own informers
+and indexes.
+"""
+import os
+import secrets
+import subprocess
+import sys
+import time
+import urllib.request
+
+from src.cache_server import CACHE_HOST, CACHE_PORT
+
+bind = os.getenv("KUBEFUN_BIND", "0.0.0.0:5000")
+wsgi_app = os.getenv("KUBEFUN_APP", "asgi:app")
+worker_class = os.getenv("KUBEFUN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+workers = int(os.getenv("KUBEFUN_WORKERS", "2"))
+# Used by the threaded WSGI worker (KUBEFUN_APP=app:app KUBEFUN_WORKER_CLASS=gthread)
+threads = int(os.getenv("KUBEFUN_THREADS", "8"))
+timeout = int(os.getenv("KUBEFUN_WORKER_TIMEOUT", "120"))
+keepalive = 5
+accesslog = "-"
+
+SHARED_CACHE = os.getenv("KUBEFUN_SHARED_CACHE", "true").lower() in ("1", "true", "yes")
+
+_cache_process = None
+
+
+def on_starting(server):
+    """Start the shared cache process before any worker is forked."""
+    global _cache_process
+    if not SHARED_CACHE:
+        return
+    # Workers inherit the master's environment and connect to the cache instead of starting informers;
+    # the token keeps other local processes from reading or writing the cache
+    os.environ.setdefault("KUBEFUN_CACHE_TOKEN", secrets.token_urlsafe(32))
+    _cache_process = subprocess.Popen([sys.executable, "-m", "src.cache_server"])
+    cache_url = f"http://{CACHE_HOST}:{CACHE_PORT}"
+    os.environ["KUBEFUN_CACHE_URL"] = cache_url
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{cache_url}/status", timeout=1).close()
+            server.log.info(f"Shared cache process {_cache_process.pid} listening on {cache_url}")
+            return
+        except OSError:
+            if _cache_process.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.log.warning("Shared cache process is not reachable yet; workers will read from the apiserver until it is.")
+
+
+def post_worker_init(worker):
+    """Keep live update streams from taking every thread of a WSGI worker."""
+    from gunicorn.workers.gthread import ThreadWorker
+    from gunicorn.workers.sync import SyncWorker
+
+    from src.live_updates import live_hub
+
+    if isinstance(worker, ThreadWorker):
+        live_hub.limit_to_threads(worker.cfg.threads)
+    elif isinstance(worker, SyncWorker):
+        # A sync worker serves one request at a time; a stream would block it for its whole duration
+        live_hub.limit_to_threads(1)
+
+
+def on_exit(server):
+    if _cache_process is not None and _cache_process.poll() is None:
+        _cache_process.terminate()
+        _cache_process.wait(10)
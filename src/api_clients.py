@@ -0,0 +1,91 @@
+"""
+Shared Kubernetes ApiClient for the whole process.
+
+Every API group object (CoreV1Api, AppsV1Api, ...) is created once on top of
+a single ApiClient whose urllib3 pool is sized for concurrent requests, keeps
+connections (and their TLS sessions) alive between requests, applies default
+timeouts and retries idempotent calls with backoff.
+"""
+import logging
+import os
+import socket
+import threading
+
+import urllib3
+from kubernetes import client
+from urllib3.connection import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("KUBEFUN_API_POOL_SIZE", "32"))
+CONNECT_TIMEOUT = float(os.getenv("KUBEFUN_API_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("KUBEFUN_API_READ_TIMEOUT", "30"))
+RETRIES = int(os.getenv("KUBEFUN_API_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("KUBEFUN_API_RETRY_BACKOFF", "0.2"))
+
+_api_client = None
+_apis = {}
+_lock = threading.RLock()
+
+
+def _build_api_client():
+    configuration = client.Configuration.get_default_copy()
+    configuration.connection_pool_maxsize = POOL_SIZE
+    # Only reads are retried; the apiserver asks clients to back off with 429 and Retry-After
+    configuration.retries = urllib3.Retry(
+        total=RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    api_client = client.ApiClient(configuration)
+
+    pool_kw = api_client.rest_client.pool_manager.connection_pool_kw
+    pool_kw["timeout"] = urllib3.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT)
+    pool_kw["socket_options"] = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+    logger.info(f"Created shared Kubernetes ApiClient (pool size {POOL_SIZE}, {RETRIES} retries).")
+    return api_client
+
+def get_api_client():
+    """Return the process-wide ApiClient, creating it on first use (after the kube config is loaded)."""
+    global _api_client
+    if _api_client is None:
+        with _lock:
+            if _api_client is None:
+                _api_client = _build_api_client()
+    return _api_client
+
+def api(name):
+    """Return the shared instance of a kubernetes client API class, e.g. api("CoreV1Api")."""
+    instance = _apis.get(name)
+    if instance is None:
+        with _lock:
+            instance = _apis.get(name)
+            if instance is None:
+                instance = _apis[name] = getattr(client, name)(get_api_client())
+    return instance
+
+def pool_stats():
+    """Return per-host connection pool statistics of the shared ApiClient."""
+    if _api_client is None:
+        return []
+    pools = _api_client.rest_client.pool_manager.pools
+    stats = []
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        # The pool queue is pre-filled with None placeholders; real entries are idle connections
+        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+        stats.append({
+            "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+            "maxsize": pool.pool.maxsize if pool.pool is not None else POOL_SIZE,
+            "idle_connections": idle,
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+        })
+    return stats
@@ -0,0 +1,495 @@
+"""
+Shared informer cache process.
+
+One cache process runs the LIST+WATCH informers for every resource kind,
+with the search index, namespace counters, owner and volume indexes and live
+updates built on them, and serves them over HTTP on localhost:
+
+    GET /status                     {"<kind>": resourceVersion or null until synced, ...}
+    POST /call/<function>           result of a @served_by_cache k8s_client function, body [args, kwargs]
+    GET /list/<kind>?namespace=x    JSON array of objects (secrets without their values)
+    GET /get/<kind>/<name>?namespace=x
+    GET /count/<kind>
+    GET|PUT /kv/<kind>?key=k        shared store for src/kube_cache.py (KUBEFUN_CACHE_BACKEND=shared)
+    GET /events                     chunked stream of live row changes, one JSON object per line
+    GET /informers                  {"<kind>": {"objects", "synced", "relists", "events", "last_event"}, ...}
+    GET /metrics                    this process's metrics in the Prometheus text format
+
+Every path but /status and /metrics needs the X-Kubefun-Cache-Token header
+to match KUBEFUN_CACHE_TOKEN, which gunicorn.conf.py generates for each start.
+
+Web workers register a RemoteInformer per kind instead of starting their own
+informers, so scaling workers does not multiply apiserver watches or object
+stores. List rows, namespace counts, search results and the PV/PVC join are
+computed here (see served_by_cache) and only the projected rows are sent to
+workers; encoded results are reused until a store changes. Each worker relays
+/events into its own LiveHub (src/live_updates.py) for the pages it serves.
+Start it with `KUBEFUN_CACHE_TOKEN=... python -m src.cache_server`
+(gunicorn.conf.py does this automatically).
+"""
+import functools
+import hmac
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import urllib3
+from kubernetes.watch.watch import iter_resp_lines
+
+from .informer import RESOURCE_KINDS, get_informer, informer_stats, register_informer, start_informers
+from .instrumentation import CONTENT_TYPE, registry
+from .kube_cache import CACHE_TOKEN_HEADER, MemoryBackend, cache_headers
+from .kube_json import dumps, loads
+from .live_updates import HEARTBEAT, LiveHub, live_hub
+from .snapshot import begin_snapshot, end_snapshot
+
+logger = logging.getLogger(__name__)
+
+CACHE_HOST = os.getenv("KUBEFUN_CACHE_HOST", "127.0.0.1")
+CACHE_PORT = int(os.getenv("KUBEFUN_CACHE_PORT", "39028"))
+
+# Seconds a worker trusts the cache server's sync status before asking again
+STATUS_TTL = 5
+# Events buffered for a worker that reads /events slower than they arrive
+RELAY_QUEUE_SIZE = 10000
+# Seconds a worker reuses informer stats, so one /metrics scrape asks the cache process once
+STATS_TTL = 1
+# Seconds a worker waits for a served call before running it itself
+CALL_TIMEOUT = 60
+# Encoded results of served calls kept by the cache process
+RESULT_CACHE_SIZE = int(os.getenv("KUBEFUN_CACHE_RESULTS", "256"))
+# Paths served without the token; they expose no cluster objects
+PUBLIC_PATHS = {"status", "metrics"}
+
+# Functions the cache process runs for workers (POST /call/<name>), by name
+SERVED_FUNCTIONS = {}
+# This worker's connection to the cache process, once connect_cache_server() has run
+_cache_client = None
+
+served_calls = registry.counter(
+    "kubefun_cache_served_calls_total",
+    "Calls served by the shared cache process by function and result (hit, miss, error).",
+    ("function", "result"),
+)
+
+
+def served_by_cache(function):
+    """
+    Run `function` in the cache process while this worker is connected to one,
+    so its informers and indexes answer the call and only the result crosses
+    the process boundary. Arguments and results must be JSON-serializable;
+    iterators come back as lists. Runs locally when the call fails.
+    """
+    name = function.__name__
+    SERVED_FUNCTIONS[name] = function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = _cache_client
+        if cache is not None:
+            try:
+                return cache.call(name, args, kwargs)
+            except Exception as e:
+                logger.warning(f"Cache server call {name} failed, running it in this worker: {e}")
+        return function(*args, **kwargs)
+    return wrapper
+
+def _store_versions():
+    """resourceVersion of every informer store, or None while any of them has not synced."""
+    versions = []
+    for kind in RESOURCE_KINDS:
+        informer = get_informer(kind)
+        if informer is None:
+            return None
+        versions.append(informer.resource_version)
+    return tuple(versions)
+
+
+class ResultCache:
+    """
+    Encoded results of served calls by function and arguments, reused while
+    every informer store is still at the resourceVersion they were computed
+    from, so workers paging through the same list share one computation.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def call(self, name, body):
+        # Versions are read before the call, so a change made while it runs invalidates its result
+        versions = _store_versions()
+        key = (name, body)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and versions is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                served_calls.inc(name, "hit")
+                return entry[1]
+
+        args, kwargs = loads(body)
+        token = begin_snapshot()
+        try:
+            result = SERVED_FUNCTIONS[name](*args, **kwargs)
+            if not isinstance(result, (dict, list)):
+                result = list(result)
+        finally:
+            end_snapshot(token)
+        encoded = dumps(result)
+        served_calls.inc(name, "miss")
+
+        if versions is not None and self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (versions, encoded)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return encoded
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer each response so headers and body leave in one write; separate small writes
+    # on a keep-alive connection stall on the client's delayed ACK (about 40 ms per request)
+    wbufsize = 64 * 1024
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload.encode() if content_type != "application/json" else dumps(payload)
+        self._send_body(status, body, content_type)
+
+    def _send_body(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self, parts):
+        if parts[0] in PUBLIC_PATHS:
+            return True
+        token = self.headers.get(CACHE_TOKEN_HEADER, "")
+        if hmac.compare_digest(token.encode(), self.server.token.encode()):
+            return True
+        self._send(403, {"error": f"Missing or wrong {CACHE_TOKEN_HEADER} header."})
+        return False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        namespace = query.get("namespace", [None])[0]
+        if not self._authorized(parts):
+            return
+
+        if parts == ["events"]:
+            self._stream_events()
+            return
+        if len(parts) == 2 and parts[0] == "kv":
+            value = self.server.store.get(parts[1], query.get("key", [""])[0])
+            self._send(200 if value is not None else 404, value)
+            return
+
+        if parts == ["informers"]:
+            self._send(200, informer_stats())
+            return
+        if parts == ["metrics"]:
+            self._send(200, registry.render(), CONTENT_TYPE)
+            return
+        if parts == ["status"]:
+            status = {}
+            for kind in RESOURCE_KINDS:
+                informer = get_informer(kind)
+                status[kind] = informer.resource_version if informer is not None else None
+            self._send(200, status)
+            return
+        if len(parts) < 2 or parts[1] not in RESOURCE_KINDS:
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+            return
+
+        action, kind = parts[0], parts[1]
+        informer = get_informer(kind)
+        if informer is None:
+            self._send(503, {"error": f"Informer for {kind} has not synced."})
+        elif action == "list":
+            self._send(200, informer.list(namespace))
+        elif action == "get" and len(parts) == 3:
+            obj = informer.get(unquote(parts[2]), namespace)
+            self._send(200 if obj is not None else 404, obj)
+        elif action == "count":
+            self._send(200, len(informer))
+        else:
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream_events(self):
+        """Relay every live row change to one worker until it disconnects."""
+        subscription = self.server.events.subscribe(None, queue_size=RELAY_QUEUE_SIZE, detailed=True)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    event = subscription.queue.get(timeout=HEARTBEAT)
+                except queue.Empty:
+                    self._write_chunk(b"\n")
+                    continue
+                if subscription.reset():
+                    self._write_chunk(dumps({"type": "RESET"}) + b"\n")
+                    continue
+                if event is not None:
+                    kind, event_type, row, obj, changed = event
+                    line = {"kind": kind, "type": event_type, "row": row, "object": obj, "changed": changed}
+                    self._write_chunk(dumps(line) + b"\n")
+        except OSError:
+            pass
+        finally:
+            self.server.events.unsubscribe(subscription)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self._authorized(parts):
+            return
+        if len(parts) != 2 or parts[0] != "call" or parts[1] not in SERVED_FUNCTIONS:
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+            return
+        try:
+            self._send_body(200, self.server.results.call(parts[1], body))
+        except Exception as e:
+            logger.error(f"Served call {parts[1]} failed: {e}")
+            served_calls.inc(parts[1], "error")
+            self._send(500, {"error": f"{parts[1]} failed: {e}"})
+
+    def do_PUT(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self._authorized(parts):
+            return
+        if len(parts) != 2 or parts[0] != "kv":
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+            return
+        self.server.store.set(parts[1], parse_qs(url.query).get("key", [""])[0], loads(body))
+        self._send(200, None)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def serve(host=CACHE_HOST, port=CACHE_PORT, token=None):
+    """Start every informer and the indexes built on them, and serve them until the process exits."""
+    from .k8s_client import (
+        enable_live_updates, enable_namespace_counts, enable_owner_index, enable_search_index, enable_volume_index,
+    )
+
+    token = token or os.getenv("KUBEFUN_CACHE_TOKEN")
+    if not token:
+        raise RuntimeError("The shared cache process needs KUBEFUN_CACHE_TOKEN.")
+    start_informers()
+    enable_search_index()
+    enable_namespace_counts()
+    enable_owner_index()
+    enable_volume_index()
+    server = ThreadingHTTPServer((host, port), CacheRequestHandler)
+    server.daemon_threads = True
+    server.token = token
+    server.store = MemoryBackend()
+    server.results = ResultCache()
+    # Workers are the only subscribers here; browsers are limited in each worker's own hub
+    server.events = LiveHub(max_clients=None)
+    enable_live_updates(server.events)
+    logger.info(f"Serving informer caches on http://{host}:{port}")
+    server.serve_forever()
+
+
+class RemoteInformer:
+    """
+    Read-only view of one kind held by the cache process, with the subset of
+    the Informer interface used by the list functions. Event handlers are not
+    available across processes; the features built on them run in the cache
+    process and are reached through served_by_cache.
+    """
+
+    supports_handlers = False
+
+    def __init__(self, kind, cache):
+        self.kind = kind
+        self._cache = cache
+
+    def has_synced(self):
+        return self._cache.resource_version(self.kind) is not None
+
+    @property
+    def resource_version(self):
+        """resourceVersion of the shared store, as of the last status check."""
+        return self._cache.resource_version(self.kind)
+
+    def wait_for_sync(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.has_synced():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(1)
+        return True
+
+    def list(self, namespace=None):
+        return self._cache.request(f"/list/{self.kind}", namespace)
+
+    def get(self, name, namespace=None):
+        return self._cache.request(f"/get/{self.kind}/{quote(name)}", namespace, missing_ok=True)
+
+    def __len__(self):
+        return self._cache.request(f"/count/{self.kind}")
+
+    def stats(self):
+        """Stats of the cache process's informer for this kind, or None when it is unreachable."""
+        return self._cache.informer_stats().get(self.kind)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class CacheClient:
+    """Keep-alive HTTP client for the cache process, shared by all RemoteInformers of a worker."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self._http = urllib3.PoolManager(maxsize=int(os.getenv("KUBEFUN_CACHE_CONNECTIONS", "16")))
+        self._status = {}
+        self._status_checked = 0.0
+        self._stats = {}
+        self._stats_checked = 0.0
+        self._lock = threading.Lock()
+
+    def request(self, path, namespace=None, missing_ok=False):
+        fields = {"namespace": namespace} if namespace else None
+        response = self._http.request("GET", self.url + path, fields=fields, headers=cache_headers(), retries=False)
+        if response.status == 404 and missing_ok:
+            return None
+        if response.status != 200:
+            raise RuntimeError(f"Cache server returned {response.status} for {path}")
+        return loads(response.data)
+
+    def call(self, name, args, kwargs):
+        """Run a served function in the cache process and return its decoded result."""
+        response = self._http.request(
+            "POST", f"{self.url}/call/{name}", body=dumps([args, kwargs]),
+            headers={**cache_headers(), "Content-Type": "application/json"}, retries=False, timeout=CALL_TIMEOUT,
+        )
+        if response.status != 200:
+            raise RuntimeError(f"Cache server returned {response.status} for /call/{name}")
+        return loads(response.data)
+
+    def resource_version(self, kind):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._status_checked > STATUS_TTL:
+                try:
+                    self._status = self.request("/status")
+                except Exception as e:
+                    # Treat an unreachable cache as unsynced so callers fall back to the apiserver
+                    logger.warning(f"Cache server {self.url} unavailable: {e}")
+                    self._status = {}
+                self._status_checked = now
+            return self._status.get(kind)
+
+    def informer_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._stats_checked > STATS_TTL:
+                try:
+                    self._stats = self.request("/informers")
+                except Exception as e:
+                    logger.warning(f"Cache server {self.url} unavailable: {e}")
+                    self._stats = {}
+                self._stats_checked = now
+            return self._stats
+
+def relay_events(url, hub, backoff=5):
+    """
+    Publish the cache process's live row changes to a local LiveHub from a
+    background thread, reconnecting when the stream ends. After a reconnect
+    every client reloads, since events may have been missed in between.
+    """
+    http = urllib3.PoolManager(maxsize=1)
+
+    def run():
+        while True:
+            try:
+                response = http.request(
+                    "GET", f"{url.rstrip('/')}/events", headers=cache_headers(), preload_content=False, retries=False,
+                    timeout=urllib3.Timeout(connect=5, read=HEARTBEAT * 3),
+                )
+                try:
+                    if response.status != 200:
+                        raise RuntimeError(f"Cache server returned {response.status} for /events")
+                    hub.enabled = True
+                    for line in iter_resp_lines(response):
+                        if not line.strip():
+                            continue
+                        event = loads(line)
+                        if event["type"] == "RESET":
+                            hub.reset_all()
+                        else:
+                            hub.publish(event["kind"], event["type"], event["row"], event["object"], event["changed"])
+                finally:
+                    response.release_conn()
+            except Exception as e:
+                logger.warning(f"Live update stream from {url} interrupted: {e}")
+            hub.reset_all()
+            time.sleep(backoff)
+
+    thread = threading.Thread(target=run, name="live-relay", daemon=True)
+    thread.start()
+    return thread
+
+def connect_cache_server(url):
+    """Serve every resource kind and served function in this process from the cache process at `url`."""
+    global _cache_client
+    cache = CacheClient(url)
+    for kind in RESOURCE_KINDS:
+        register_informer(kind, RemoteInformer(kind, cache))
+    _cache_client = cache
+    relay_events(url, live_hub)
+    logger.info(f"Using shared informer caches at {url}")
+    return cache
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    from .k8s_client import load_kube_config
+
+    load_kube_config()
+    try:
+        serve()
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Run the imported module rather than this __main__ copy, so the handler sees the
+    # functions k8s_client registers with served_by_cache
+    from src.cache_server import main as run
+
+    run()
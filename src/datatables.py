@@ -0,0 +1,80 @@
+import heapq
+
+# Upper bound on rows returned per request, whatever the client asks for
+MAX_PAGE_LENGTH = 1000
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+def _sort_key(value):
+    # Numbers sort numerically and before text; everything else sorts case-insensitively
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, _cell_text(value).lower())
+
+def parse_request(args, columns):
+    """
+    Parse DataTables server-side processing parameters.
+
+    Returns (draw, start, length, search, order) where order is a list of
+    (column name, descending) pairs restricted to the given columns.
+    """
+    draw = args.get("draw", 0, type=int)
+    start = max(args.get("start", 0, type=int), 0)
+    length = args.get("length", 10, type=int)
+    if length < 0 or length > MAX_PAGE_LENGTH:
+        length = MAX_PAGE_LENGTH
+    search = args.get("search[value]", "").strip().lower()
+
+    order = []
+    index = 0
+    while f"order[{index}][column]" in args:
+        column = args.get(f"order[{index}][column]", type=int)
+        name = args.get(f"columns[{column}][data]")
+        if name in columns:
+            order.append((name, args.get(f"order[{index}][dir]") == "desc"))
+        index += 1
+    return draw, start, length, search, order
+
+def build_response(rows, args, columns):
+    """
+    Apply a DataTables server-side request (search, order, start/length) to
+    an iterable of row dicts and return the JSON payload for the page.
+
+    Only rows on the requested page are returned, and when the page is near
+    the start of the ordering a partial heap selection replaces a full sort.
+    """
+    draw, start, length, search, order = parse_request(args, columns)
+
+    total = 0
+    matched = []
+    for row in rows:
+        total += 1
+        if search and not any(search in _cell_text(row.get(column)).lower() for column in columns):
+            continue
+        matched.append(row)
+
+    filtered = len(matched)
+    if order:
+        # Stable multi-column sort: apply the least significant key first
+        needed = start + length
+        if len(order) == 1 and needed < filtered // 4:
+            name, descending = order[0]
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            matched = pick(needed, matched, key=lambda row: _sort_key(row.get(name)))
+        else:
+            for name, descending in reversed(order):
+                matched.sort(key=lambda row: _sort_key(row.get(name)), reverse=descending)
+
+    page = matched[start:start + length]
+    return {
+        "draw": draw,
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [{column: row.get(column) for column in columns} for row in page],
+    }
@@ -0,0 +1,122 @@
+"""
+Collapsible, lazily loaded JSON views of Kubernetes objects.
+
+Detail pages do not embed whole objects. summarize() describes one level of
+an object: small subtrees are inlined, while large ones (and managedFields
+and the last-applied-configuration annotation, which are never interesting
+at first glance) are left as placeholders. The page loads those later from
+/api/details/..., addressed by a JSON pointer (RFC 6901). What is sent and
+rendered grows with what the user expands, not with the size of the object.
+"""
+import re
+
+from .kube_json import dumps
+
+# Subtrees and strings up to this many JSON-encoded bytes are sent inline
+INLINE_BYTES = 2048
+# Inlined bytes per expanded member; the members beyond it are left collapsed
+EXPAND_BYTES = 16 * 1024
+
+# Array index token of RFC 6901: ASCII digits without leading zeros
+_INDEX = re.compile(r"0|[1-9][0-9]*")
+
+def escape_token(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def unescape_token(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+# Always deferred, whatever their size
+DEFERRED_POINTERS = {
+    "/metadata/managedFields",
+    "/metadata/annotations/" + escape_token("kubectl.kubernetes.io/last-applied-configuration"),
+}
+
+def resolve_pointer(document, pointer):
+    """Return the value a JSON pointer refers to; raises LookupError when it refers to nothing."""
+    if pointer == "":
+        return document
+    if not pointer.startswith("/"):
+        raise LookupError(f"JSON pointer must start with '/': {pointer!r}")
+    value = document
+    for token in pointer[1:].split("/"):
+        token = unescape_token(token)
+        if isinstance(value, dict):
+            if token not in value:
+                raise LookupError(f"No member {token!r} in {pointer!r}")
+            value = value[token]
+        elif isinstance(value, list):
+            if not _INDEX.fullmatch(token) or int(token) >= len(value):
+                raise LookupError(f"No index {token!r} in {pointer!r}")
+            value = value[int(token)]
+        else:
+            raise LookupError(f"Cannot descend into a {type(value).__name__} at {pointer!r}")
+    return value
+
+def _type_of(value):
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bool):
+        return "boolean"
+    if value is None:
+        return "null"
+    return "number"
+
+def _without_deferred(value, pointer):
+    """Return value without its always-deferred members, so they do not count towards its size."""
+    prefix = pointer + "/"
+    deferred = [deferred[len(prefix):] for deferred in DEFERRED_POINTERS if deferred.startswith(prefix)]
+    if not deferred or not isinstance(value, dict):
+        return value
+    pruned = dict(value)
+    for rest in deferred:
+        token = unescape_token(rest.split("/", 1)[0])
+        if token not in pruned:
+            continue
+        if "/" in rest:
+            pruned[token] = _without_deferred(pruned[token], f"{pointer}/{escape_token(token)}")
+        else:
+            del pruned[token]
+    return pruned
+
+def _node(key, pointer, value, expand=False, budget=float("inf")):
+    """
+    Describe one value. An expanded container lists its members, inlining
+    small ones until EXPAND_BYTES are used; any other container or string is
+    inlined when it is small enough and fits the budget left.
+    """
+    node = {"key": key, "pointer": pointer, "type": _type_of(value)}
+    if node["type"] not in ("object", "array", "string"):
+        node["value"] = value
+        return node
+
+    node["bytes"] = len(dumps(_without_deferred(value, pointer)))
+    if node["type"] != "string":
+        node["size"] = len(value)
+    if not expand and (pointer in DEFERRED_POINTERS or node["bytes"] > min(INLINE_BYTES, budget)):
+        node["lazy"] = True
+    elif node["type"] == "string":
+        node["value"] = value
+    else:
+        remaining = EXPAND_BYTES if expand else float("inf")
+        node["children"] = []
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        for child_key, child in items:
+            child_node = _node(child_key, f"{pointer}/{escape_token(child_key)}", child, budget=remaining)
+            if not child_node.get("lazy"):
+                remaining -= child_node.get("bytes", 0)
+            node["children"].append(child_node)
+    return node
+
+def summarize(document, pointer=""):
+    """
+    Describe the value at `pointer` for a collapsible view: its direct members
+    are listed, small ones in full and large ones as lazy placeholders that
+    carry their pointer, member count and encoded size.
+    """
+    key = unescape_token(pointer.rsplit("/", 1)[-1]) if pointer else None
+    return _node(key, pointer, resolve_pointer(document, pointer), expand=True)
@@ -0,0 +1,380 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from kubernetes import client
+from kubernetes.watch.watch import iter_resp_lines
+
+from .api_clients import CONNECT_TIMEOUT, api
+from .instrumentation import registry
+from .kube_json import call_json, loads, name_of, namespace_of, resource_version_of
+
+logger = logging.getLogger(__name__)
+
+HTTP_STATUS_GONE = 410
+
+# Objects requested per LIST page; bounds the size of any single apiserver response
+LIST_PAGE_SIZE = int(os.getenv("KUBEFUN_LIST_PAGE_SIZE", "500"))
+
+# Resource kinds kubefun lists, mapped to (API class, cluster-wide list, namespaced list)
+RESOURCE_KINDS = {
+    "nodes": ("CoreV1Api", "list_node", None),
+    "namespaces": ("CoreV1Api", "list_namespace", None),
+    "pods": ("CoreV1Api", "list_pod_for_all_namespaces", "list_namespaced_pod"),
+    "services": ("CoreV1Api", "list_service_for_all_namespaces", "list_namespaced_service"),
+    "secrets": ("CoreV1Api", "list_secret_for_all_namespaces", "list_namespaced_secret"),
+    "persistent_volumes": ("CoreV1Api", "list_persistent_volume", None),
+    "persistent_volume_claims": (
+        "CoreV1Api",
+        "list_persistent_volume_claim_for_all_namespaces",
+        "list_namespaced_persistent_volume_claim",
+    ),
+    "deployments": ("AppsV1Api", "list_deployment_for_all_namespaces", "list_namespaced_deployment"),
+    "stateful_sets": ("AppsV1Api", "list_stateful_set_for_all_namespaces", "list_namespaced_stateful_set"),
+    "replica_sets": ("AppsV1Api", "list_replica_set_for_all_namespaces", "list_namespaced_replica_set"),
+    "storage_classes": ("StorageV1Api", "list_storage_class", None),
+    "crds": ("ApiextensionsV1Api", "list_custom_resource_definition", None),
+    "cluster_roles": ("RbacAuthorizationV1Api", "list_cluster_role", None),
+    "cluster_role_bindings": ("RbacAuthorizationV1Api", "list_cluster_role_binding", None),
+}
+
+# Fields dropped from objects as they enter an informer store. Secret values are only read
+# through get_secret_details(), so they are never held by, or served from, the caches.
+STRIPPED_FIELDS = {
+    "secrets": ("data", "stringData"),
+}
+
+def get_list_function(kind, namespace=None):
+    """Return the bound kubernetes client list function for a resource kind."""
+    api_name, cluster_method, namespaced_method = RESOURCE_KINDS[kind]
+    api_instance = api(api_name)
+    if namespace and namespaced_method:
+        return getattr(api_instance, namespaced_method)
+    return getattr(api_instance, cluster_method)
+
+def list_resource(kind, namespace=None, **kwargs):
+    """
+    Perform a single LIST call for a resource kind, optionally scoped to a namespace.
+    Returns the decoded JSON list ({"metadata": ..., "items": [...]}) as plain dicts.
+    """
+    list_fn = get_list_function(kind, namespace)
+    if namespace and RESOURCE_KINDS[kind][2]:
+        return call_json(list_fn, namespace, **kwargs)
+    return call_json(list_fn, **kwargs)
+
+def iter_resource_pages(kind, namespace=None, limit=None, **kwargs):
+    """
+    Yield the pages of a chunked LIST, following continue tokens until the
+    collection is exhausted. Only one page is held in memory at a time.
+    """
+    limit = limit or LIST_PAGE_SIZE
+    continue_token = None
+    while True:
+        if continue_token:
+            kwargs["_continue"] = continue_token
+        page = list_resource(kind, namespace, limit=limit, **kwargs)
+        yield page
+        continue_token = page["metadata"].get("continue")
+        if not continue_token:
+            break
+
+def iter_resource(kind, namespace=None, limit=None, **kwargs):
+    """Yield the objects of a resource kind one at a time from a chunked LIST."""
+    for page in iter_resource_pages(kind, namespace, limit, **kwargs):
+        yield from page["items"]
+
+def object_key(obj):
+    """Build the store key ("namespace/name" or "name") for a Kubernetes object."""
+    namespace = namespace_of(obj)
+    if namespace:
+        return f"{namespace}/{name_of(obj)}"
+    return name_of(obj)
+
+
+class Informer:
+    """
+    Keep an in-memory copy of one resource kind up to date with LIST+WATCH.
+
+    The store is keyed by "namespace/name". Watches resume from the last seen
+    resourceVersion and fall back to a full relist when the apiserver answers
+    410 Gone. Handlers registered with add_handler() receive
+    (event_type, obj, old_obj) for every change, including changes discovered
+    by a relist.
+    """
+
+    # Indexes and live updates are only built on informers that deliver events to add_handler()
+    supports_handlers = True
+
+    def __init__(self, kind, watch_timeout=300, backoff=5):
+        self.kind = kind
+        self.watch_timeout = watch_timeout
+        self.backoff = backoff
+        self.resource_version = None
+        self._store = {}
+        self._lock = threading.RLock()
+        self._handlers = []
+        self._stripped = STRIPPED_FIELDS.get(kind, ())
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._response = None
+        self._thread = None
+        self.relists = 0
+        self.events = Counter()
+        # Wall-clock time the apiserver was last heard from (a LIST, an event or a bookmark)
+        self.last_event = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=f"informer-{self.kind}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._response is not None:
+            self._response.close()
+
+    def has_synced(self):
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def add_handler(self, handler, replay=True):
+        """
+        Register a callable invoked as handler(event_type, obj, old_obj).
+        With replay=True the objects already in the store are delivered as ADDED first.
+        Handlers run under the store lock, so they must be quick.
+        """
+        with self._lock:
+            self._handlers.append(handler)
+            if replay:
+                for obj in self._store.values():
+                    handler("ADDED", obj, None)
+
+    def list(self, namespace=None):
+        """Return the cached objects, optionally limited to one namespace."""
+        with self._lock:
+            objects = list(self._store.values())
+        if namespace:
+            return [obj for obj in objects if namespace_of(obj) == namespace]
+        return objects
+
+    def get(self, name, namespace=None):
+        key = f"{namespace}/{name}" if namespace else name
+        with self._lock:
+            return self._store.get(key)
+
+    def __len__(self):
+        return len(self._store)
+
+    def stats(self):
+        """Object count, sync state and watch activity, for /metrics."""
+        return {
+            "objects": len(self._store),
+            "synced": self.has_synced(),
+            "relists": self.relists,
+            "events": dict(self.events),
+            "last_event": self.last_event,
+        }
+
+    def _strip(self, obj):
+        for field in self._stripped:
+            obj.pop(field, None)
+        return obj
+
+    def _notify(self, event_type, obj, old_obj=None):
+        for handler in self._handlers:
+            try:
+                handler(event_type, obj, old_obj)
+            except Exception as e:
+                logger.error(f"Informer handler for {self.kind} failed: {e}")
+
+    def _relist(self):
+        """Replace the store with a fresh LIST and emit the differences as events."""
+        fresh = {}
+        resource_version = None
+        for page in iter_resource_pages(self.kind):
+            # Every page of a continued LIST is served from the first page's resourceVersion
+            resource_version = resource_version or page["metadata"].get("resourceVersion")
+            for obj in page["items"]:
+                fresh[object_key(obj)] = self._strip(obj)
+
+        with self._lock:
+            previous = self._store
+            self._store = fresh
+            self.resource_version = resource_version
+
+            for key, obj in fresh.items():
+                old_obj = previous.get(key)
+                if old_obj is None:
+                    self._notify("ADDED", obj)
+                elif resource_version_of(old_obj) != resource_version_of(obj):
+                    self._notify("MODIFIED", obj, old_obj)
+            for key, old_obj in previous.items():
+                if key not in fresh:
+                    self._notify("DELETED", old_obj, old_obj)
+
+        self.relists += 1
+        self.last_event = time.time()
+        self._synced.set()
+        logger.info(f"Informer for {self.kind} listed {len(fresh)} objects at resourceVersion {self.resource_version}.")
+
+    def _apply(self, event):
+        event_type = event["type"]
+        self.events[event_type] += 1
+        self.last_event = time.time()
+        if event_type == "BOOKMARK":
+            self.resource_version = resource_version_of(event["object"])
+            return
+        if event_type == "ERROR":
+            status = event["object"]
+            raise client.exceptions.ApiException(status=status.get("code"), reason=status.get("message"))
+
+        obj = self._strip(event["object"])
+        key = object_key(obj)
+        with self._lock:
+            old_obj = self._store.get(key)
+            if event_type == "DELETED":
+                self._store.pop(key, None)
+            else:
+                self._store[key] = obj
+            self.resource_version = resource_version_of(obj)
+            self._notify(event_type, obj, old_obj)
+
+    def _watch_once(self):
+        """Stream one WATCH request, decoding each event line straight to dicts."""
+        self._response = get_list_function(self.kind)(
+            watch=True,
+            resource_version=self.resource_version,
+            timeout_seconds=self.watch_timeout,
+            allow_watch_bookmarks=True,
+            _preload_content=False,
+            # The apiserver ends the watch after timeout_seconds; allow for that instead of the default read timeout
+            _request_timeout=(CONNECT_TIMEOUT, self.watch_timeout + 30),
+        )
+        try:
+            for line in iter_resp_lines(self._response):
+                if self._stopped.is_set():
+                    break
+                self._apply(loads(line))
+        finally:
+            self._response.close()
+            self._response.release_conn()
+            self._response = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self._relist()
+                self._watch_once()
+            except client.exceptions.ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.info(f"Watch for {self.kind} expired, relisting.")
+                    self.resource_version = None
+                    continue
+                logger.error(f"Informer for {self.kind} failed: {e}")
+                self._stopped.wait(self.backoff)
+            except Exception as e:
+                logger.error(f"Informer for {self.kind} failed: {e}")
+                self._stopped.wait(self.backoff)
+
+
+# Shared informer registry
+_informers = {}
+_registry_lock = threading.Lock()
+
+def informers_enabled():
+    return os.getenv("KUBEFUN_INFORMERS", "true").lower() in ("1", "true", "yes")
+
+def start_informers(kinds=None):
+    """Start one shared informer per resource kind (all known kinds by default)."""
+    configured = os.getenv("KUBEFUN_INFORMER_KINDS")
+    if kinds is None and configured:
+        kinds = [kind.strip() for kind in configured.split(",") if kind.strip()]
+    with _registry_lock:
+        for kind in kinds or RESOURCE_KINDS:
+            if kind not in _informers:
+                _informers[kind] = Informer(kind)
+            _informers[kind].start()
+    logger.info(f"Started informers for: {', '.join(sorted(_informers))}")
+
+def register_informer(kind, informer):
+    """Register an informer-like object (e.g. a RemoteInformer) to serve a kind."""
+    with _registry_lock:
+        _informers[kind] = informer
+
+def stop_informers():
+    with _registry_lock:
+        for informer in _informers.values():
+            informer.stop()
+        _informers.clear()
+
+def get_informer(kind, synced=True):
+    """
+    Return the informer for a kind, or None when it is not running.
+    With synced=True (the default) an informer that has not finished its
+    initial LIST is treated as unavailable so callers fall back to the apiserver.
+    """
+    informer = _informers.get(kind)
+    if informer is None or (synced and not informer.has_synced()):
+        return None
+    return informer
+
+def get_handler_informer(kind):
+    """Return the informer for a kind when it delivers events to add_handler(), synced or not, otherwise None."""
+    informer = _informers.get(kind)
+    if informer is None or not informer.supports_handlers:
+        return None
+    return informer
+
+def informer_stats():
+    """Return {kind: stats} for every registered informer that reports them."""
+    with _registry_lock:
+        informers = dict(_informers)
+    stats = {}
+    for kind, informer in informers.items():
+        informer_stats = informer.stats() if hasattr(informer, "stats") else None
+        if informer_stats is not None:
+            stats[kind] = informer_stats
+    return stats
+
+def _collect_informers(field, convert=lambda value: value):
+    def collect():
+        for kind, stats in sorted(informer_stats().items()):
+            if stats[field] is not None:
+                yield (kind,), convert(stats[field])
+    return collect
+
+registry.collect(
+    "kubefun_informer_objects", "gauge", "Objects held by the informer of each resource kind.", ("kind",),
+)(_collect_informers("objects"))
+registry.collect(
+    "kubefun_informer_synced", "gauge", "1 once the informer has completed its initial LIST.", ("kind",),
+)(_collect_informers("synced", int))
+registry.collect(
+    "kubefun_informer_relists_total", "counter", "Full LISTs made by the informer, including the first.", ("kind",),
+)(_collect_informers("relists"))
+registry.collect(
+    "kubefun_informer_lag_seconds", "gauge",
+    "Seconds since the informer last heard from the apiserver (a LIST, a watch event or a bookmark).", ("kind",),
+)(_collect_informers("last_event", lambda last_event: round(time.time() - last_event, 3)))
+
+@registry.collect(
+    "kubefun_informer_events_total", "counter", "Watch events received by the informer, by type.", ("kind", "type"),
+)
+def _collect_informer_events():
+    for kind, stats in sorted(informer_stats().items()):
+        for event_type, count in sorted(stats["events"].items()):
+            yield (kind, event_type), count
+
+def wait_for_informers(timeout=None):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    for informer in list(_informers.values()):
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        if not informer.wait_for_sync(remaining):
+            return False
+    return True
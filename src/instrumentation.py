@@ -0,0 +1,200 @@
+"""
+kubefun's own metrics in the Prometheus text format, served on /metrics.
+
+A small in-process registry: counters and histograms updated as requests
+are served, plus collectors that read gauges (cache sizes, informer object
+counts and lag) from the objects that own them when /metrics is scraped.
+Every gunicorn worker keeps its own registry, so samples carry a `worker`
+label (the process id) and are summed across workers in queries.
+"""
+import bisect
+import os
+import threading
+import time
+
+from .tracing import add_call_observer
+
+# Upper bounds in seconds shared by every latency histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, label_values, value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", label_values + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", label_values, total
+            yield f"{self.name}_count", label_values, cumulative
+
+
+class Collected:
+    """A metric family read at scrape time from fn(), which yields (label values, value) pairs."""
+
+    def __init__(self, name, type, documentation, labels, fn):
+        self.name = name
+        self.type = type
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._fn = fn
+
+    def samples(self):
+        for label_values, value in self._fn():
+            yield self.name, tuple(label_values), value
+
+
+class Registry:
+    """Metric families rendered in registration order, each sample tagged with the constant labels."""
+
+    def __init__(self, constant_labels=None):
+        self.constant_labels = dict(constant_labels or {})
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collect(self, name, type, documentation, labels=()):
+        """Decorator registering fn as the source of a gauge or counter read at scrape time."""
+        def decorator(fn):
+            self.register(Collected(name, type, documentation, labels, fn))
+            return fn
+        return decorator
+
+    def render(self):
+        constant_names = tuple(self.constant_labels)
+        constant_values = tuple(self.constant_labels.values())
+        lines = []
+        for metric in self._metrics:
+            names = metric.labels + (("le",) if metric.type == "histogram" else ())
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                lines.append(f"# {metric.name} could not be collected: {_escape(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for sample_name, label_values, value in samples:
+                # Bucket samples carry the extra "le" label; _sum and _count do not
+                sample_names = names if len(label_values) == len(names) else metric.labels
+                labels = _format_labels(constant_names + sample_names, constant_values + tuple(label_values))
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry({"worker": os.getpid()})
+
+http_request_duration = registry.histogram(
+    "kubefun_http_request_duration_seconds",
+    "Time to serve a request, including streamed bodies, by Flask endpoint.",
+    ("endpoint", "method", "status"),
+)
+template_render_duration = registry.histogram(
+    "kubefun_template_render_duration_seconds",
+    "Time to render a Jinja template, including streamed templates.",
+    ("template",),
+)
+apiserver_requests = registry.counter(
+    "kubefun_apiserver_requests_total",
+    "Kubernetes API calls by verb, resource and result code.",
+    ("verb", "resource", "code"),
+)
+apiserver_request_duration = registry.histogram(
+    "kubefun_apiserver_request_duration_seconds",
+    "Wall time of Kubernetes API calls, including reading and decoding the body.",
+    ("verb", "resource"),
+)
+apiserver_decode_seconds = registry.counter(
+    "kubefun_apiserver_decode_seconds_total",
+    "Time spent decoding Kubernetes API responses.",
+    ("verb", "resource"),
+)
+apiserver_response_bytes = registry.counter(
+    "kubefun_apiserver_response_bytes_total",
+    "Bytes received from the Kubernetes API.",
+    ("verb", "resource"),
+)
+
+_STARTED = time.time()
+
+@registry.collect("kubefun_process_start_time_seconds", "gauge", "Start time of this process since the Unix epoch.")
+def _start_time():
+    yield (), _STARTED
+
+
+def observe_api_call(call):
+    """Count one Kubernetes API call (a tracing.ApiCall), whether or not a request is traced."""
+    apiserver_requests.inc(call.verb, call.resource, str(call.error or 200))
+    apiserver_request_duration.observe(call.wall_ms / 1000, call.verb, call.resource)
+    apiserver_decode_seconds.inc(call.verb, call.resource, amount=call.decode_ms / 1000)
+    apiserver_response_bytes.inc(call.verb, call.resource, amount=call.bytes)
+
+add_call_observer(observe_api_call)
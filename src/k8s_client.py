@@ -1,11 +1,41 @@
 import logging
 from kubernetes import client, config
 import os
+import threading
+import time
+
+from .api_clients import api
+from .cache_server import served_by_cache
+from .informer import RESOURCE_KINDS, get_handler_informer, get_informer, iter_resource
+from .kube_cache import cached
+from .kube_json import call_json, name_of, namespace_of
+from .live_updates import live_hub
+from .metrics import MetricsTable, sum_quantities
+from .namespace_counts import NamespaceCounts, count_by_namespace
+from .owner_index import CONTROLLER_KINDS, OwnerIndex
+from .quantity import parse_cpu, parse_memory
+from .search import SearchRun
+from .search_index import SearchIndex
+from .snapshot import current_snapshot, with_snapshot
+from .timeseries import MetricsSampler, sparkline, summarize
+from .volume_index import VolumeIndex, claim_key
 
 logger = logging.getLogger(__name__)
 
 # Load Kubernetes configuration
+_kube_config_loaded = False
+_kube_config_lock = threading.Lock()
+
 def load_kube_config():
+    """Load the kube config once per process; later calls are no-ops."""
+    global _kube_config_loaded
+    with _kube_config_lock:
+        if _kube_config_loaded:
+            return
+        _load_kube_config()
+        _kube_config_loaded = True
+
+def _load_kube_config():
     try:
         config.load_kube_config()
         logger.info("Loaded kube config from local file.")
@@ -13,22 +43,39 @@ def load_kube_config():
         config.load_incluster_config()
         logger.info("Loaded in-cluster kube config.")
 
+def _list_items(kind, namespace=None):
+    """
+    Return the objects of a resource kind, read from the shared informer store
+    when it is synced, from the current request snapshot when the kind is part
+    of its fetch plan, and otherwise streamed from a chunked LIST so only one
+    page of objects is held in memory at a time.
+    """
+    informer = get_informer(kind)
+    if informer is not None:
+        return informer.list(namespace)
+    snapshot = current_snapshot()
+    if snapshot is not None and snapshot.planned(kind, namespace):
+        return snapshot.items(kind, namespace)
+    return iter_resource(kind, namespace)
+
 # Node Functions
+def _node_row(node):
+    """Build the list row for a node."""
+    return {
+        "type": "Node",
+        "name": node["metadata"]["name"],
+        "status": "Ready" if any(
+            cond["type"] == "Ready" and cond["status"] == "True"
+            for cond in node.get("status", {}).get("conditions") or []
+        ) else "NotReady"
+    }
+
+@served_by_cache
+@cached("nodes", informer_kind="nodes")
 def get_nodes():
     """Retrieve all nodes in the cluster."""
-    core_api = client.CoreV1Api()
-    nodes = core_api.list_node()
-    return [
-        {
-            "type": "Node",
-            "name": node.metadata.name,
-            "status": "Ready" if any(
-                cond.type == "Ready" and cond.status == "True"
-                for cond in node.status.conditions
-            ) else "NotReady"
-        }
-        for node in nodes.items
-    ]
+    nodes = _list_items("nodes")
+    return [_node_row(node) for node in nodes]
 
 def search_nodes(query):
     """Search nodes by name."""
@@ -36,75 +83,85 @@ def search_nodes(query):
     return [node for node in nodes if query.lower() in node["name"].lower()]
 
 # Pod Functions
+def _pod_row(pod, desired_replicas="N/A", ready_replicas="N/A"):
+    """Build the list row for a pod."""
+    return {
+        "type": "Pod",
+        "name": pod["metadata"]["name"],
+        "namespace": pod["metadata"].get("namespace"),
+        "status": pod.get("status", {}).get("phase"),
+        "desired_replicas": desired_replicas,
+        "ready_replicas": ready_replicas
+    }
+
+@served_by_cache
+@cached("pods", informer_kind="pods")
 def get_pods(namespace=None):
     """Retrieve pods from Kubernetes with desired and ready replicas."""
-    core_api = client.CoreV1Api()
-    apps_api = client.AppsV1Api()
+    return list(iter_pods(namespace))
 
-    # Fetch Pods
-    if namespace:
-        pods = core_api.list_namespaced_pod(namespace)
-    else:
-        pods = core_api.list_pod_for_all_namespaces()
+# Controller index shared by all requests when informers run, otherwise cached per namespace
+OWNER_INDEX_TTL = float(os.getenv("KUBEFUN_OWNER_INDEX_TTL", "30"))
 
-    # Fetch higher-level controllers (ReplicaSets, Deployments, StatefulSets)
-    replica_sets = apps_api.list_replica_set_for_all_namespaces()
-    deployments = apps_api.list_deployment_for_all_namespaces()
-    stateful_sets = apps_api.list_stateful_set_for_all_namespaces()
+_owner_index = None
+_owner_index_cache = {}
+_owner_index_lock = threading.Lock()
 
-    # Build mappings for replicas
-    desired_ready_mapping = {}
-
-    # Add ReplicaSets
-    for rs in replica_sets.items:
-        desired_ready_mapping[rs.metadata.name] = {
-            "desired": rs.spec.replicas or 0,
-            "ready": rs.status.ready_replicas or 0
-        }
-
-    # Add Deployments
-    for deploy in deployments.items:
-        desired_ready_mapping[deploy.metadata.name] = {
-            "desired": deploy.spec.replicas or 0,
-            "ready": deploy.status.ready_replicas or 0
-        }
-
-    # Add StatefulSets
-    for sts in stateful_sets.items:
-        desired_ready_mapping[sts.metadata.name] = {
-            "desired": sts.spec.replicas or 0,
-            "ready": sts.status.ready_replicas or 0
-        }
-
-    # Match Pods to their controllers
-    pod_data = []
-    for pod in pods.items:
-        controller_name = None
-        desired_replicas = "N/A"
-        ready_replicas = "N/A"
-
-        # Identify the controller
-        for owner in pod.metadata.owner_references or []:
-            if owner.kind in ["ReplicaSet", "StatefulSet"]:
-                controller_name = owner.name
-                break
-
-        # Lookup the controller's replica counts
-        if controller_name and controller_name in desired_ready_mapping:
-            desired_replicas = desired_ready_mapping[controller_name]["desired"]
-            ready_replicas = desired_ready_mapping[controller_name]["ready"]
-
-        # Add pod data
-        pod_data.append({
-            "type": "Pod",
-            "name": pod.metadata.name,
-            "namespace": pod.metadata.namespace,
-            "status": pod.status.phase,
-            "desired_replicas": desired_replicas,
-            "ready_replicas": ready_replicas
-        })
-
-    return pod_data
+def enable_owner_index():
+    """
+    Keep the pod controller index updated from informer events.
+    Informers for every controller kind must already be registered with start_informers().
+    """
+    global _owner_index
+    index = OwnerIndex()
+    for kind in CONTROLLER_KINDS:
+        informer = get_handler_informer(kind)
+        if informer is None:
+            logger.warning(f"No local informer for {kind}; pod controllers will be listed per namespace.")
+            return None
+        informer.add_handler(index.handler(kind))
+    _owner_index = index
+    return index
+
+def get_owner_index(namespace=None):
+    """
+    Return an OwnerIndex covering the controllers of one namespace (or the whole
+    cluster). Without synced informers the index is built from namespaced LISTs
+    and reused for KUBEFUN_OWNER_INDEX_TTL seconds.
+    """
+    if _owner_index is not None and all(get_informer(kind) for kind in CONTROLLER_KINDS):
+        return _owner_index
+
+    now = time.monotonic()
+    with _owner_index_lock:
+        cached = _owner_index_cache.get(namespace)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        snapshot.prefetch(*CONTROLLER_KINDS, namespace=namespace)
+    index = OwnerIndex()
+    for kind in CONTROLLER_KINDS:
+        for obj in _list_items(kind, namespace):
+            index.update(kind, obj)
+
+    with _owner_index_lock:
+        # Drop expired entries so the cache stays bounded by the namespaces in active use
+        for key in [key for key, (expires, _) in _owner_index_cache.items() if expires <= now]:
+            del _owner_index_cache[key]
+        _owner_index_cache[namespace] = (now + OWNER_INDEX_TTL, index)
+    return index
+
+def iter_pods(namespace=None):
+    """Yield pod rows with their controller's desired and ready replicas, one LIST page at a time."""
+    owners = get_owner_index(namespace)
+    for pod in _list_items("pods", namespace):
+        replicas = owners.resolve(pod)
+        if replicas is None:
+            yield _pod_row(pod)
+        else:
+            yield _pod_row(pod, *replicas)
 
 def search_pods(query, namespace=None):
     """Search pods by name or namespace."""
@@ -115,18 +172,20 @@ def search_pods(query, namespace=None):
     ]
 
 # Namespace Functions
+def _namespace_row(ns):
+    """Build the list row for a namespace."""
+    return {
+        "type": "Namespace",
+        "name": ns["metadata"]["name"],
+        "status": ns.get("status", {}).get("phase")
+    }
+
+@served_by_cache
+@cached("namespaces", informer_kind="namespaces")
 def get_namespaces():
     """Retrieve all namespaces in the cluster."""
-    core_api = client.CoreV1Api()
-    namespaces = core_api.list_namespace()
-    return [
-        {
-            "type": "Namespace",
-            "name": ns.metadata.name,
-            "status": ns.status.phase
-        }
-        for ns in namespaces.items
-    ]
+    namespaces = _list_items("namespaces")
+    return [_namespace_row(ns) for ns in namespaces]
 
 def search_namespaces(query):
     """Search namespaces by name."""
@@ -135,24 +194,25 @@ def search_namespaces(query):
 
 
 # Deployment Functions
+def _deployment_row(dep):
+    """Build the list row for a deployment."""
+    return {
+        "type": "Deployment",
+        "name": dep["metadata"]["name"],
+        "namespace": dep["metadata"]["namespace"],
+        "replicas": dep["spec"].get("replicas"),
+        "ready_replicas": dep.get("status", {}).get("readyReplicas") or 0
+    }
+
+@served_by_cache
+@cached("deployments", informer_kind="deployments")
 def get_deployments(namespace=None):
     """Retrieve deployments from Kubernetes."""
-    apps_api = client.AppsV1Api()
-    if namespace:
-        deployments = apps_api.list_namespaced_deployment(namespace)
-    else:
-        deployments = apps_api.list_deployment_for_all_namespaces()
+    return list(iter_deployments(namespace))
 
-    return [
-        {
-            "type": "Deployment",
-            "name": dep.metadata.name,
-            "namespace": dep.metadata.namespace,
-            "replicas": dep.spec.replicas,
-            "ready_replicas": dep.status.ready_replicas or 0
-        }
-        for dep in deployments.items
-    ]
+def iter_deployments(namespace=None):
+    """Yield deployment rows, one LIST page at a time."""
+    return (_deployment_row(dep) for dep in _list_items("deployments", namespace))
 
 def search_deployments(query, namespace=None):
     """Search deployments by name or namespace."""
@@ -163,24 +223,25 @@ def search_deployments(query, namespace=None):
     ]
 
 # StatefulSet Functions
+def _statefulset_row(sts):
+    """Build the list row for a statefulset."""
+    return {
+        "type": "StatefulSet",
+        "name": sts["metadata"]["name"],
+        "namespace": sts["metadata"]["namespace"],
+        "replicas": sts["spec"].get("replicas"),
+        "ready_replicas": sts.get("status", {}).get("readyReplicas") or 0
+    }
+
+@served_by_cache
+@cached("stateful_sets", informer_kind="stateful_sets")
 def get_statefulsets(namespace=None):
     """Retrieve statefulsets from Kubernetes."""
-    apps_api = client.AppsV1Api()
-    if namespace:
-        statefulsets = apps_api.list_namespaced_stateful_set(namespace)
-    else:
-        statefulsets = apps_api.list_stateful_set_for_all_namespaces()
+    return list(iter_statefulsets(namespace))
 
-    return [
-        {
-            "type": "StatefulSet",
-            "name": sts.metadata.name,
-            "namespace": sts.metadata.namespace,
-            "replicas": sts.spec.replicas,
-            "ready_replicas": sts.status.ready_replicas or 0
-        }
-        for sts in statefulsets.items
-    ]
+def iter_statefulsets(namespace=None):
+    """Yield statefulset rows, one LIST page at a time."""
+    return (_statefulset_row(sts) for sts in _list_items("stateful_sets", namespace))
 
 def search_statefulsets(query, namespace=None):
     """Search statefulsets by name or namespace."""
@@ -208,26 +269,26 @@ def search_workloads(query, namespace=None):
     ]
 
 # Service Functions
+def _service_row(svc):
+    """Build the list row for a service."""
+    spec = svc.get("spec", {})
+    return {
+        "name": svc["metadata"]["name"],
+        "namespace": svc["metadata"]["namespace"],
+        "type": spec.get("type") or "Unknown",
+        "cluster_ip": spec.get("clusterIP") or "None",
+        "ports": [f"{port['port']}/{port.get('protocol', 'TCP')}" for port in (spec.get("ports") or [])],
+    }
+
+@served_by_cache
+@cached("services", informer_kind="services")
 def get_services(namespace=None):
     """Retrieve services from Kubernetes."""
-    core_api = client.CoreV1Api()
-    if namespace:
-        services = core_api.list_namespaced_service(namespace)
-    else:
-        services = core_api.list_service_for_all_namespaces()
+    return list(iter_services(namespace))
 
-    return [
-        {
-            "name": svc.metadata.name,
-            "namespace": svc.metadata.namespace,
-            "type": svc.spec.type if svc.spec.type else "Unknown",
-            "cluster_ip": svc.spec.cluster_ip if svc.spec.cluster_ip else "None",
-            "ports": [
-                     f"{port.port}/{port.protocol}" for port in (svc.spec.ports or [])
-                     ],
-        }
-        for svc in services.items
-    ]
+def iter_services(namespace=None):
+    """Yield service rows, one LIST page at a time."""
+    return (_service_row(svc) for svc in _list_items("services", namespace))
 
 def search_services(query, namespace=None):
     """Search services by name or namespace."""
@@ -238,21 +299,24 @@ def search_services(query, namespace=None):
     ]
 
 # CRDs
+def _crd_row(crd):
+    """Build the list row for a CRD."""
+    spec = crd["spec"]
+    return {
+        "name": crd["metadata"]["name"],
+        "group": spec["group"],
+        "version": spec["versions"][0]["name"] if spec.get("versions") else "N/A",
+        "scope": spec["scope"],
+        "type": spec["names"]["kind"],
+    }
+
+@served_by_cache
+@cached("crds", informer_kind="crds")
 def get_crds():
     """Retrieve all CustomResourceDefinitions (CRDs) from Kubernetes."""
-    api_ext = client.ApiextensionsV1Api()
     try:
-        crds = api_ext.list_custom_resource_definition()
-        return [
-            {
-                "name": crd.metadata.name,
-                "group": crd.spec.group,
-                "version": crd.spec.versions[0].name if crd.spec.versions else "N/A",
-                "scope": crd.spec.scope,
-                "type": crd.spec.names.kind,
-            }
-            for crd in crds.items
-        ]
+        crds = _list_items("crds")
+        return [_crd_row(crd) for crd in crds]
     except Exception as e:
         logger.error(f"Error fetching CRDs: {e}")
         return []
@@ -269,20 +333,22 @@ def search_crds(query):
     ]
 
 # Cluster Roles
+def _clusterrole_row(role):
+    """Build the list row for a ClusterRole."""
+    return {
+        "type": "Cluster Role",
+        "name": role["metadata"]["name"],
+        "creation_timestamp": role["metadata"].get("creationTimestamp"),
+        "rules_count": len(role.get("rules") or []),
+    }
+
+@served_by_cache
+@cached("cluster_roles", informer_kind="cluster_roles")
 def get_clusterroles():
     """Retrieve all ClusterRoles in the cluster."""
-    rbac_api = client.RbacAuthorizationV1Api()
     try:
-        clusterroles = rbac_api.list_cluster_role()
-        return [
-            {
-                "type": "Cluster Role",
-                "name": role.metadata.name,
-                "creation_timestamp": role.metadata.creation_timestamp,
-                "rules_count": len(role.rules) if role.rules else 0,
-            }
-            for role in clusterroles.items
-        ]
+        clusterroles = _list_items("cluster_roles")
+        return [_clusterrole_row(role) for role in clusterroles]
     except Exception as e:
         logger.error(f"Error fetching ClusterRoles: {e}")
         return []
@@ -297,20 +363,22 @@ def search_clusterroles(query):
     ]
 
 # Cluster Role Bindings
+def _clusterrolebinding_row(binding):
+    """Build the list row for a ClusterRoleBinding."""
+    return {
+        "type": "Cluster Role Binding",
+        "name": binding["metadata"]["name"],
+        "role_ref": binding["roleRef"]["name"],
+        "subjects_count": len(binding.get("subjects") or []),
+    }
+
+@served_by_cache
+@cached("cluster_role_bindings", informer_kind="cluster_role_bindings")
 def get_clusterrolebindings():
     """Retrieve all ClusterRoleBindings in the cluster."""
-    rbac_api = client.RbacAuthorizationV1Api()
     try:
-        clusterrolebindings = rbac_api.list_cluster_role_binding()
-        return [
-            {
-                "type": "Cluster Role Binding",
-                "name": binding.metadata.name,
-                "role_ref": binding.role_ref.name,
-                "subjects_count": len(binding.subjects) if binding.subjects else 0,
-            }
-            for binding in clusterrolebindings.items
-        ]
+        clusterrolebindings = _list_items("cluster_role_bindings")
+        return [_clusterrolebinding_row(binding) for binding in clusterrolebindings]
     except Exception as e:
         logger.error(f"Error fetching ClusterRoleBindings: {e}")
         return []
@@ -325,22 +393,23 @@ def search_clusterrolebindings(query):
     ]
 
 # Secrets Functions
+def _secret_row(secret):
+    """Build the list row for a secret."""
+    return {
+        "name": secret["metadata"]["name"],
+        "namespace": secret["metadata"]["namespace"],
+        "type": secret.get("type")
+    }
+
+@served_by_cache
+@cached("secrets", informer_kind="secrets")
 def get_secrets(namespace=None):
     """Retrieve secrets from Kubernetes."""
-    core_api = client.CoreV1Api()
-    if namespace:
-        secrets = core_api.list_namespaced_secret(namespace)
-    else:
-        secrets = core_api.list_secret_for_all_namespaces()
+    return list(iter_secrets(namespace))
 
-    return [
-        {
-            "name": secret.metadata.name,
-            "namespace": secret.metadata.namespace,
-            "type": secret.type
-        }
-        for secret in secrets.items
-    ]
+def iter_secrets(namespace=None):
+    """Yield secret rows, one LIST page at a time."""
+    return (_secret_row(secret) for secret in _list_items("secrets", namespace))
 
 def search_secrets(query, namespace=None):
     """Search secrets by name or namespace."""
@@ -351,19 +420,24 @@ def search_secrets(query, namespace=None):
     ]
 
 # Storage Class Functions
+def _storage_class_row(sc):
+    """Build the list row for a storage class."""
+    return {
+        "type": "Storage Class",
+        "name": sc["metadata"]["name"],
+        "provisioner": sc["provisioner"]
+    }
+
+@served_by_cache
+@cached("storage_classes", informer_kind="storage_classes")
 def get_storage_classes():
     """Retrieve storage classes from Kubernetes."""
-    storage_api = client.StorageV1Api()
-    storage_classes = storage_api.list_storage_class()
+    return list(iter_storage_classes())
 
-    return [
-        {
-            "type": "Storage Class",
-            "name": sc.metadata.name,
-            "provisioner": sc.provisioner
-        }
-        for sc in storage_classes.items
-    ]
+@served_by_cache
+def iter_storage_classes():
+    """Yield storage class rows, one LIST page at a time."""
+    return (_storage_class_row(sc) for sc in _list_items("storage_classes"))
 
 
 def search_storage_classes(query):
@@ -373,23 +447,29 @@ def search_storage_classes(query):
 
 
 # Persistent Volume (PV) Functions
+def _pv_row(pv):
+    """Build the list row for a persistent volume."""
+    spec = pv.get("spec", {})
+    claim_ref = spec.get("claimRef")
+    return {
+        "type": "PV",
+        "name": pv["metadata"]["name"],
+        "capacity": (spec.get("capacity") or {}).get("storage", "Unknown"),
+        "status": pv.get("status", {}).get("phase"),
+        "storage_class": spec.get("storageClassName"),
+        "claim_name": claim_ref["name"] if claim_ref else "Unbound",
+        "claim_namespace": claim_ref.get("namespace") if claim_ref else "N/A"
+    }
+
+@served_by_cache
+@cached("persistent_volumes", informer_kind="persistent_volumes")
 def get_persistent_volumes():
     """Retrieve persistent volumes from Kubernetes."""
-    core_api = client.CoreV1Api()
-    pvs = core_api.list_persistent_volume()
+    return list(iter_persistent_volumes())
 
-    return [
-        {
-            "type": "PV",
-            "name": pv.metadata.name,
-            "capacity": pv.spec.capacity.get("storage", "Unknown") if pv.spec.capacity else "Unknown",
-            "status": pv.status.phase,
-            "storage_class": pv.spec.storage_class_name,
-            "claim_name": pv.spec.claim_ref.name if pv.spec.claim_ref else "Unbound",
-            "claim_namespace": pv.spec.claim_ref.namespace if pv.spec.claim_ref else "N/A"
-        }
-        for pv in pvs.items
-    ]
+def iter_persistent_volumes():
+    """Yield persistent volume rows, one LIST page at a time."""
+    return (_pv_row(pv) for pv in _list_items("persistent_volumes"))
 
 
 def search_persistent_volumes(query):
@@ -399,26 +479,29 @@ def search_persistent_volumes(query):
 
 
 # Persistent Volume Claim (PVC) Functions
+def _pvc_row(pvc):
+    """Build the list row for a persistent volume claim."""
+    spec = pvc.get("spec", {})
+    status = pvc.get("status", {})
+    return {
+        "type": "PVC",
+        "name": pvc["metadata"]["name"],
+        "namespace": pvc["metadata"]["namespace"],
+        "storage_class": spec.get("storageClassName"),
+        "capacity": (status.get("capacity") or {}).get("storage", "Unknown"),
+        "status": status.get("phase"),
+        "volume_name": spec.get("volumeName")  # Link to PV
+    }
+
+@served_by_cache
+@cached("persistent_volume_claims", informer_kind="persistent_volume_claims")
 def get_persistent_volume_claims(namespace=None):
     """Retrieve persistent volume claims from Kubernetes."""
-    core_api = client.CoreV1Api()
-    if namespace:
-        pvcs = core_api.list_namespaced_persistent_volume_claim(namespace)
-    else:
-        pvcs = core_api.list_persistent_volume_claim_for_all_namespaces()
+    return list(iter_persistent_volume_claims(namespace))
 
-    return [
-        {
-            "type": "PVC",
-            "name": pvc.metadata.name,
-            "namespace": pvc.metadata.namespace,
-            "storage_class": pvc.spec.storage_class_name,
-            "capacity": pvc.status.capacity.get("storage", "Unknown") if pvc.status.capacity else "Unknown",
-            "status": pvc.status.phase,
-            "volume_name": pvc.spec.volume_name  # Link to PV
-        }
-        for pvc in pvcs.items
-    ]
+def iter_persistent_volume_claims(namespace=None):
+    """Yield persistent volume claim rows, one LIST page at a time."""
+    return (_pvc_row(pvc) for pvc in _list_items("persistent_volume_claims", namespace))
 
 def search_persistent_volume_claims(query, namespace=None):
     """Search persistent volume claims by name or namespace."""
@@ -429,19 +512,74 @@ def search_persistent_volume_claims(query, namespace=None):
     ]
 
 # PV and PVC Relationship Functions
+_volume_index = None
+
+def enable_volume_index():
+    """
+    Keep the PV/PVC join index updated from informer events.
+    Informers for both kinds must already be registered with start_informers().
+    """
+    global _volume_index
+    index = VolumeIndex()
+    for kind, row_builder in (("persistent_volumes", _pv_row), ("persistent_volume_claims", _pvc_row)):
+        informer = get_handler_informer(kind)
+        if informer is None:
+            logger.warning(f"No local informer for {kind}; PV/PVC relationships will be joined per request.")
+            return None
+        informer.add_handler(index.handler(kind, row_builder))
+    _volume_index = index
+    return index
+
+def get_volume_index():
+    """Return the informer-maintained PV/PVC index once both kinds have synced, otherwise None."""
+    if _volume_index is not None and all(get_informer(kind) for kind in ("persistent_volumes", "persistent_volume_claims")):
+        return _volume_index
+    return None
+
+@served_by_cache
+def iter_pv_pvc_relationships(persistent_volumes=None):
+    """
+    Yield (pvc, pv or None) row pairs. Without a synced index, the PVs (already
+    listed rows may be passed in) are indexed once and the claims are joined
+    against them one LIST page at a time.
+    """
+    index = get_volume_index()
+    if index is not None:
+        return index.join()
+    index = VolumeIndex()
+    for pv in get_persistent_volumes() if persistent_volumes is None else persistent_volumes:
+        index.add_pv(pv)
+    return index.join(iter_persistent_volume_claims())
+
+def _mounts_claim(pod, claim_name):
+    volumes = pod.get("spec", {}).get("volumes") or []
+    return any((volume.get("persistentVolumeClaim") or {}).get("claimName") == claim_name for volume in volumes)
+
+@served_by_cache
+def get_pv_claim(pv):
+    """
+    Follow a PV object to the claim its claimRef points at and the pods of that
+    namespace mounting the claim: {"claim": PVC row or None, "pods": [pod rows]}.
+    """
+    key = claim_key(_pv_row(pv))
+    if key is None:
+        return {"claim": None, "pods": []}
+    namespace, name = key
+    index = get_volume_index()
+    if index is not None:
+        claim = index.pvc_for(_pv_row(pv))
+    else:
+        details = get_pvc_details(namespace, name)
+        claim = None if "error" in details else _pvc_row(details)
+    if claim is None:
+        return {"claim": None, "pods": []}
+    pods = [_pod_row(pod) for pod in _list_items("pods", namespace) if _mounts_claim(pod, name)]
+    return {"claim": claim, "pods": pods}
+
 def get_pv_pvc_relationship():
     """Retrieve and match PVs with their associated PVCs."""
-    pvs = get_persistent_volumes()
-    pvcs = get_persistent_volume_claims()
-
     relationships = []
-
-    # Match PVCs with PVs
-    for pvc in pvcs:
-        matched_pv = next(
-            (pv for pv in pvs if pv["name"] == pvc["volume_name"]),
-            None
-        )
+    for pvc, matched_pv in iter_pv_pvc_relationships():
         relationships.append({
             "PVC": pvc["name"],
             "PVC Namespace": pvc["namespace"],
@@ -466,88 +604,210 @@ def search_pv_pvc_relationship(query):
            (relationship["PV"] != "No matching PV" and query.lower() in relationship["PV"].lower())
     ]
 
+@cached("persistent_volumes")
 def get_pv_details(name):
     """Retrieve detailed information about a specific Persistent Volume."""
     try:
-        core_api = client.CoreV1Api()
-        pv = core_api.read_persistent_volume(name=name)
-        return pv.to_dict()
+        core_api = api("CoreV1Api")
+        return call_json(core_api.read_persistent_volume, name=name)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch PV details: {e}"}
 
+@cached("persistent_volume_claims")
 def get_pvc_details(namespace, name):
     """Retrieve detailed information about a specific Persistent Volume Claim."""
     try:
-        core_api = client.CoreV1Api()
-        pvc = core_api.read_namespaced_persistent_volume_claim(name=name, namespace=namespace)
-        return pvc.to_dict()
+        core_api = api("CoreV1Api")
+        return call_json(core_api.read_namespaced_persistent_volume_claim, name=name, namespace=namespace)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch PVC details: {e}"}
 
 
 # General Search
-def search_kubernetes_resources(query):
+SEARCH_KINDS = [
+    ("Namespace", search_namespaces),
+    ("Node", search_nodes),
+    ("Pod", search_pods),
+    ("Service", search_services),
+    ("Secret", search_secrets),
+    ("Deployment", search_deployments),
+    ("StatefulSet", search_statefulsets),
+    ("PV", search_persistent_volumes),
+    ("PVC", search_persistent_volume_claims),
+    ("Storage Class", search_storage_classes),
+    ("CRD", search_crds),
+    ("Cluster Role", search_clusterroles),
+    ("Cluster Role Binding", search_clusterrolebindings),
+]
+
+# Global Search Index
+SEARCH_LIMIT = int(os.getenv("KUBEFUN_SEARCH_LIMIT", "1000"))
+
+# Informer kind -> (search result type, row builder, extra searchable row fields)
+SEARCH_INDEX_KINDS = {
+    "namespaces": ("Namespace", _namespace_row, ()),
+    "nodes": ("Node", _node_row, ()),
+    "pods": ("Pod", _pod_row, ()),
+    "services": ("Service", _service_row, ()),
+    "secrets": ("Secret", _secret_row, ()),
+    "deployments": ("Deployment", _deployment_row, ()),
+    "stateful_sets": ("StatefulSet", _statefulset_row, ()),
+    "persistent_volumes": ("PV", _pv_row, ()),
+    "persistent_volume_claims": ("PVC", _pvc_row, ()),
+    "storage_classes": ("Storage Class", _storage_class_row, ()),
+    "crds": ("CRD", _crd_row, ("group", "type")),
+    "cluster_roles": ("Cluster Role", _clusterrole_row, ()),
+    "cluster_role_bindings": ("Cluster Role Binding", _clusterrolebinding_row, ("role_ref",)),
+}
+
+_search_index = None
+
+def _index_handler(index, kind, row_builder, extra_fields):
+    def handle(event_type, obj, old_obj):
+        if event_type == "DELETED":
+            index.remove(kind, name_of(obj), namespace_of(obj))
+            return
+        row = row_builder(obj)
+        fields = [row["name"], row.get("namespace")] + [row.get(field) for field in extra_fields]
+        index.update(kind, row, fields)
+    return handle
+
+def enable_search_index():
     """
-    Search all Kubernetes resources by name or namespace.
+    Build the global search index and keep it updated from informer events.
+    Informers for every indexed kind must already be registered with start_informers().
+    """
+    global _search_index
+    index = SearchIndex()
+    for kind, (label, row_builder, extra_fields) in SEARCH_INDEX_KINDS.items():
+        informer = get_handler_informer(kind)
+        if informer is None:
+            logger.warning(f"No local informer for {kind}; global search will not use the index.")
+            return None
+        informer.add_handler(_index_handler(index, label, row_builder, extra_fields))
+    _search_index = index
+    logger.info("Global search index enabled.")
+    return index
+
+def get_search_index():
+    """Return the search index once every indexed kind has synced, otherwise None."""
+    if _search_index is None:
+        return None
+    if any(get_informer(kind) is None for kind in SEARCH_INDEX_KINDS):
+        return None
+    return _search_index
+
+@served_by_cache
+def start_search(query, limit=SEARCH_LIMIT):
+    """
+    Start a search of all Kubernetes resources by name or namespace.
+
+    Answered from the search index when it is ready (which also understands
+    ns:/kind: qualifiers and name* prefixes); otherwise returns a concurrent
+    SearchRun that yields per-kind batches as each kind completes.
     """
     logger.info(f"Starting global search for query: '{query}'")
-    results = []
-
-    results.extend(search_namespaces(query))
-    results.extend(search_nodes(query))
-    results.extend(search_pods(query))
-    results.extend(search_services(query))
-    results.extend(search_secrets(query))
-    results.extend(search_deployments(query))
-    results.extend(search_statefulsets(query))
-    results.extend(search_persistent_volumes(query))
-    results.extend(search_persistent_volume_claims(query))
-    results.extend(search_storage_classes(query))
-    results.extend(search_crds(query))
-    results.extend(search_clusterroles(query))  
-    results.extend(search_clusterrolebindings(query))  
+    index = get_search_index()
+    if index is not None:
+        return [{"kind": "index", "results": index.search(query, limit=limit), "error": None}]
 
-    logger.info(f"Global search completed. Found {len(results)} matching resources.")
-    return results
+    # Every LIST the search needs, including the controllers behind search_pods, starts at once
+    return SearchRun(query, SEARCH_KINDS, prefetch=RESOURCE_KINDS)
 
-def get_namespaces_with_counts():
+@with_snapshot
+def search_kubernetes_resources(query, limit=SEARCH_LIMIT):
     """
-    Retrieve namespaces with counts for pods, deployments, and services.
+    Search all Kubernetes resources by name or namespace.
     """
+    results = [result for batch in start_search(query, limit) for result in batch["results"]]
+    logger.info(f"Global search completed. Found {len(results)} matching resources.")
+    return results
 
-    # Get namespaces
-    namespaces = get_namespaces()
-
-    # Initialize counts per namespace
-    namespace_data = []
+# Namespace Counts
+# Column on the namespaces page -> informer kind counted per namespace
+NAMESPACE_COUNT_KINDS = {
+    "pods": "pods",
+    "deployments": "deployments",
+    "services": "services",
+    "secrets": "secrets",
+}
 
-    # Fetch all pods, deployments, and services
-    pods = get_pods()
-    deployments = get_deployments()
-    services = get_services()
-    secrets = get_secrets()
+_namespace_counts = None
 
-    # Aggregate counts
-    for ns in namespaces:
-        ns_name = ns["name"]
+def enable_namespace_counts():
+    """
+    Keep per-namespace object counts updated from informer events.
+    Informers for every counted kind must already be registered with start_informers().
+    """
+    global _namespace_counts
+    counts = NamespaceCounts()
+    for kind in NAMESPACE_COUNT_KINDS.values():
+        informer = get_handler_informer(kind)
+        if informer is None:
+            logger.warning(f"No local informer for {kind}; namespace counts will be computed per request.")
+            return None
+        informer.add_handler(counts.handler(kind))
+    _namespace_counts = counts
+    return counts
+
+def _namespace_counts_by_kind():
+    """
+    Return {column: Counter(namespace -> count)}, from the incremental counters
+    when their informers have synced, otherwise from one pass over each kind.
+    """
+    if _namespace_counts is not None and all(get_informer(kind) for kind in NAMESPACE_COUNT_KINDS.values()):
+        return {column: _namespace_counts.counts(kind) for column, kind in NAMESPACE_COUNT_KINDS.items()}
+    current_snapshot().prefetch(*NAMESPACE_COUNT_KINDS.values())
+    return {column: count_by_namespace(_list_items(kind)) for column, kind in NAMESPACE_COUNT_KINDS.items()}
 
-        # Count resources by namespace
-        pod_count = len([p for p in pods if p["namespace"] == ns_name])
-        deployment_count = len([d for d in deployments if d["namespace"] == ns_name])
-        service_count = len([s for s in services if s["namespace"] == ns_name])
-        secrets_count = len([s for s in secrets if s["namespace"] == ns_name])
+@served_by_cache
+@with_snapshot
+def get_namespaces_with_counts():
+    """
+    Retrieve namespaces with counts for pods, deployments, services and secrets.
+    """
+    current_snapshot().prefetch("namespaces")
+    counts = _namespace_counts_by_kind()
 
+    namespace_data = []
+    for ns in _list_items("namespaces"):
+        row = _namespace_row(ns)
+        ns_name = row["name"]
         namespace_data.append({
             "name": ns_name,
-            "status": "Active" if not ns["status"] else ns["status"],
-            "pods": pod_count,
-            "deployments": deployment_count,
-            "services": service_count,
-            "secrets": secrets_count
+            "status": row["status"] or "Active",
+            **{column: counts[column][ns_name] for column in NAMESPACE_COUNT_KINDS},
         })
 
     return namespace_data
 
+# Live Updates
+# Table kind (as used by /api/<kind>) -> (informer kind, row builder) for pushed row changes
+LIVE_KINDS = {
+    "pods": ("pods", _pod_row),
+    "secrets": ("secrets", _secret_row),
+    "services": ("services", _service_row),
+    "deployments": ("deployments", _deployment_row),
+    "statefulsets": ("stateful_sets", _statefulset_row),
+}
+
+def enable_live_updates(hub=live_hub):
+    """
+    Publish row changes of every live kind to a LiveHub from informer events.
+    Informers for every live kind must already be registered with start_informers().
+    """
+    for informer_kind, _ in LIVE_KINDS.values():
+        if get_handler_informer(informer_kind) is None:
+            logger.warning(f"No local informer for {informer_kind}; live updates are disabled.")
+            return None
+    for kind, (informer_kind, row_builder) in LIVE_KINDS.items():
+        # Open pages already show the current rows, so only later changes are published
+        get_handler_informer(informer_kind).add_handler(hub.handler(kind, row_builder), replay=False)
+    hub.enabled = True
+    return hub
+
+@served_by_cache
+@with_snapshot
 def get_cluster_info():
     """
     Fetch basic cluster information like API server URL, health, and resource counts.
@@ -565,6 +825,11 @@ def get_cluster_info():
     # Context Name (Cluster Name)
     cluster_info["cluster_name"] = os.getenv("KUBERNETES_CLUSTER_NAME", "Unknown Cluster")
 
+    # Fetch node statuses and resource counts concurrently, once per request
+    snapshot = current_snapshot()
+    snapshot.prefetch("nodes")
+    snapshot.prefetch_counts("pods", "namespaces", "deployments", "services")
+
     # Check Node Health
     try:
         nodes = get_nodes()
@@ -581,114 +846,120 @@ def get_cluster_info():
 
     # Count Pods
     try:
-        pods = get_pods()
-        cluster_info["total_pods"] = len(pods)
+        cluster_info["total_pods"] = snapshot.count("pods")
     except Exception as e:
         logger.error(f"Error fetching pods: {e}")
         cluster_info["total_pods"] = 0
 
     # Count Namespaces
     try:
-        namespaces = get_namespaces()
-        cluster_info["total_namespaces"] = len(namespaces)
+        cluster_info["total_namespaces"] = snapshot.count("namespaces")
     except Exception as e:
         logger.error(f"Error fetching namespaces: {e}")
         cluster_info["total_namespaces"] = 0
 
     # Count Deployments
     try:
-        deployments = get_deployments()
-        cluster_info["total_deployments"] = len(deployments)
+        cluster_info["total_deployments"] = snapshot.count("deployments")
     except Exception as e:
         logger.error(f"Error fetching deployments: {e}")
         cluster_info["total_deployments"] = 0
 
     # Count Services
     try:
-        services = get_services()
-        cluster_info["total_services"] = len(services)
+        cluster_info["total_services"] = snapshot.count("services")
     except Exception as e:
         logger.error(f"Error fetching services: {e}")
         cluster_info["total_services"] = 0
 
     return cluster_info
 
+@cached("nodes")
 def get_node_details(node_name):
     """
     Retrieve detailed information about a specific node.
     """
-    core_api = client.CoreV1Api()
-    node = core_api.read_node(name=node_name)
-    return node.to_dict()  
+    try:
+        core_api = api("CoreV1Api")
+        return call_json(core_api.read_node, name=node_name)
+    except client.exceptions.ApiException as e:
+        return {"error": f"Failed to fetch node details: {e}"}
 
+@cached("namespaces")
 def get_namespace_details(namespace_name):
     """
     Retrieve detailed information about a specific namespace.
     """
-    core_api = client.CoreV1Api()
-    namespace = core_api.read_namespace(name=namespace_name)
-    return namespace.to_dict()  
+    try:
+        core_api = api("CoreV1Api")
+        return call_json(core_api.read_namespace, name=namespace_name)
+    except client.exceptions.ApiException as e:
+        return {"error": f"Failed to fetch namespace details: {e}"}
 
+@cached("deployments")
 def get_deployment_details(namespace, deployment_name):
     """
     Retrieve detailed information about a specific deployment.
     """
     try:
-        apps_api = client.AppsV1Api()
-        deployment = apps_api.read_namespaced_deployment(name=deployment_name, namespace=namespace)
+        apps_api = api("AppsV1Api")
 
         # Return the raw deployment object as a dictionary
-        return deployment.to_dict()
+        return call_json(apps_api.read_namespaced_deployment, name=deployment_name, namespace=namespace)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch deployment details: {e}"}
     
+@cached("stateful_sets")
 def get_statefulset_details(namespace, statefulset_name):
     """
     Retrieve detailed information about a specific StatefulSet.
     """
     try:
-        apps_api = client.AppsV1Api()
-        statefulset = apps_api.read_namespaced_stateful_set(name=statefulset_name, namespace=namespace)
+        apps_api = api("AppsV1Api")
 
         # Return the raw StatefulSet object as a dictionary
-        return statefulset.to_dict()
+        return call_json(apps_api.read_namespaced_stateful_set, name=statefulset_name, namespace=namespace)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch StatefulSet details: {e}"}
     
+@cached("pods")
 def get_pod_details(namespace, pod_name):
     """
     Retrieve detailed information about a specific pod.
     """
     try:
-        core_api = client.CoreV1Api()
-        pod = core_api.read_namespaced_pod(name=pod_name, namespace=namespace)
-        events = core_api.list_namespaced_event(namespace=namespace, field_selector=f"involvedObject.name={pod_name}")
+        core_api = api("CoreV1Api")
         # Return the raw pod object as a dictionary
-        return pod.to_dict()
+        return call_json(core_api.read_namespaced_pod, name=pod_name, namespace=namespace)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch pod details: {e}"}
     
+@cached("events")
 def get_pod_events(namespace, pod_name):
     """
     Retrieve events for a specific pod.
     """
     try:
-        core_api = client.CoreV1Api()
-        events = core_api.list_namespaced_event(namespace=namespace, field_selector=f"involvedObject.name={pod_name}")
-        logger.info(f"Fetched {len(events.items)} events in namespace: {namespace}")
-        return [event.to_dict() for event in events.items]
+        core_api = api("CoreV1Api")
+        events = call_json(
+            core_api.list_namespaced_event,
+            namespace=namespace,
+            field_selector=f"involvedObject.name={pod_name}",
+        )["items"]
+        logger.info(f"Fetched {len(events)} events in namespace: {namespace}")
+        return events
     except client.exceptions.ApiException as e:
         logger.error(f"Failed to fetch events for pod {pod_name}: {e}")
         return []
 
+@cached("services")
 def get_service_details(namespace, service_name):
     """
     Retrieve detailed information about a specific service.
     """
     try:
-        core_api = client.CoreV1Api()
-        service = core_api.read_namespaced_service(name=service_name, namespace=namespace)
-        return service.to_dict()
+        core_api = api("CoreV1Api")
+        return call_json(core_api.read_namespaced_service, name=service_name, namespace=namespace)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch service details: {e}"}
     
@@ -697,187 +968,242 @@ import base64
 def get_secret_details(namespace, secret_name):
     """
     Retrieve detailed information about a specific secret.
+    Not cached: the decoded values must not be kept in memory or in the shared cache process.
     """
     try:
-        core_api = client.CoreV1Api()
-        secret = core_api.read_namespaced_secret(name=secret_name, namespace=namespace)
+        core_api = api("CoreV1Api")
+        secret = call_json(core_api.read_namespaced_secret, name=secret_name, namespace=namespace)
 
         # Decode the secret data
         secret_data = {
             key: base64.b64decode(value).decode("utf-8")
-            for key, value in (secret.data or {}).items()
+            for key, value in (secret.get("data") or {}).items()
         }
 
         return {
-            "name": secret.metadata.name,
-            "namespace": secret.metadata.namespace,
-            "type": secret.type,
+            "name": secret["metadata"]["name"],
+            "namespace": secret["metadata"]["namespace"],
+            "type": secret.get("type"),
             "data": secret_data,
-            "creation_timestamp": secret.metadata.creation_timestamp,
+            "creation_timestamp": secret["metadata"].get("creationTimestamp"),
         }
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch secret details: {e}"}
 
+@cached("storage_classes")
 def get_storageclass_details(storageclass_name):
     """
     Retrieve detailed information about a specific StorageClass.
     """
     try:
-        storage_api = client.StorageV1Api()
-        storageclass = storage_api.read_storage_class(name=storageclass_name)
-
-        # Convert the StorageClass object to a dictionary
-        return storageclass.to_dict()
+        storage_api = api("StorageV1Api")
+        return call_json(storage_api.read_storage_class, name=storageclass_name)
     except client.exceptions.ApiException as e:
         return {"error": f"Failed to fetch StorageClass details: {e}"}
 
-def parse_cpu(value):
+# Rows shown in the top nodes/pods tables
+TOP_LIMIT = int(os.getenv("KUBEFUN_TOP_LIMIT", "100"))
+
+# Background metrics sampling; an interval of 0 fetches metrics on every page load instead
+METRICS_INTERVAL = float(os.getenv("KUBEFUN_METRICS_INTERVAL", "15"))
+METRICS_HISTORY = int(os.getenv("KUBEFUN_METRICS_HISTORY", "240"))
+
+_metrics_sampler = None
+
+def _percent(usage, total):
+    return f" ({(usage / total) * 100:.1f}%)" if total > 0 else ""
+
+def fetch_node_metrics():
     """
-    Parse CPU usage from Kubernetes (e.g., '3464u', '123456n') into cores.
+    Fetch node usage from metrics.k8s.io with node capacities (cores, MiB) as a MetricsTable.
     """
-    if value.endswith("n"):  # Nanocores to cores
-        return int(value.strip("n")) / 1e9
-    elif value.endswith("u"):  # Microcores to cores
-        return int(value.strip("u")) / 1e6
-    elif value.endswith("m"):  # Millicores to cores
-        return int(value.strip("m")) / 1000
-    else:  # Assume already in cores
-        return float(value)
-
-def get_top_nodes():
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        snapshot.prefetch("nodes")
+
+    # Fetch node metrics
+    custom_api = api("CustomObjectsApi")
+    metrics = call_json(
+        custom_api.list_cluster_custom_object,
+        group="metrics.k8s.io",
+        version="v1beta1",
+        plural="nodes"
+    )["items"]
+
+    # Map node capacities (cores, Mi)
+    nodes = list(_list_items("nodes"))
+    capacity_cpu = sum_quantities(parse_cpu, ([node["status"]["capacity"]["cpu"]] for node in nodes))
+    capacity_memory = sum_quantities(parse_memory, ([node["status"]["capacity"]["memory"]] for node in nodes))
+    node_capacity = {
+        node["metadata"]["name"]: (capacity_cpu[i], capacity_memory[i])
+        for i, node in enumerate(nodes)
+    }
+
+    # Parse usage in bulk into numeric columns
+    usage_cpu = sum_quantities(parse_cpu, ([node["usage"]["cpu"]] for node in metrics))
+    usage_memory = sum_quantities(parse_memory, ([node["usage"]["memory"]] for node in metrics))
+    table = MetricsTable()
+    for i, node in enumerate(metrics):
+        name = node["metadata"]["name"]
+        total_cpu, total_memory = node_capacity.get(name, (0, 0))
+        table.append(name, None, usage_cpu[i], usage_memory[i], total_cpu, total_memory)
+    return table
+
+def fetch_pod_metrics(namespace=None):
     """
-    Retrieve top nodes with CPU and Memory usage as percentages, converting memory to GiB.
+    Fetch pod usage from metrics.k8s.io with pod resource requests (cores, MiB) as a MetricsTable.
     """
-    try:
-        # Fetch node metrics
-        custom_api = client.CustomObjectsApi()
-        metrics = custom_api.list_cluster_custom_object(
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        snapshot.prefetch("pods", namespace=namespace)
+
+    # Fetch pod metrics
+    custom_api = api("CustomObjectsApi")
+    if namespace:
+        metrics = call_json(
+            custom_api.list_namespaced_custom_object,
             group="metrics.k8s.io",
             version="v1beta1",
-            plural="nodes"
+            namespace=namespace,
+            plural="pods"
+        )["items"]
+    else:
+        metrics = call_json(
+            custom_api.list_cluster_custom_object,
+            group="metrics.k8s.io",
+            version="v1beta1",
+            plural="pods"
+        )["items"]
+
+    # Map pod resource requests (cores, Mi), parsed in bulk
+    keys = []
+    cpu_requests = []
+    memory_requests = []
+    for pod in _list_items("pods", namespace):
+        keys.append((pod["metadata"]["namespace"], pod["metadata"]["name"]))
+        requests = [(container.get("resources") or {}).get("requests") or {} for container in pod["spec"]["containers"]]
+        cpu_requests.append([request.get("cpu", "0") for request in requests])
+        memory_requests.append([request.get("memory", "0Mi") for request in requests])
+    requested_cpu = sum_quantities(parse_cpu, cpu_requests)
+    requested_memory = sum_quantities(parse_memory, memory_requests)
+    pod_requests = {key: (requested_cpu[i], requested_memory[i]) for i, key in enumerate(keys)}
+
+    # Parse usage in bulk into numeric columns
+    usage_cpu = sum_quantities(parse_cpu, ([c["usage"]["cpu"] for c in pod["containers"]] for pod in metrics))
+    usage_memory = sum_quantities(parse_memory, ([c["usage"]["memory"] for c in pod["containers"]] for pod in metrics))
+    table = MetricsTable()
+    for i, pod in enumerate(metrics):
+        name = pod["metadata"]["name"]
+        pod_namespace = pod["metadata"]["namespace"]
+        total_cpu, total_memory = pod_requests.get((pod_namespace, name), (1, 1))
+        table.append(name, pod_namespace, usage_cpu[i], usage_memory[i], total_cpu, total_memory)
+    return table
+
+def start_metrics_sampler():
+    """Start sampling node and pod metrics every KUBEFUN_METRICS_INTERVAL seconds."""
+    global _metrics_sampler
+    if METRICS_INTERVAL <= 0:
+        return None
+    if _metrics_sampler is None:
+        _metrics_sampler = MetricsSampler(
+            {"nodes": fetch_node_metrics, "pods": fetch_pod_metrics},
+            interval=METRICS_INTERVAL,
+            capacity=METRICS_HISTORY,
         )
+    _metrics_sampler.start()
+    logger.info(f"Sampling metrics every {METRICS_INTERVAL:g}s, keeping {METRICS_HISTORY} samples.")
+    return _metrics_sampler
+
+def _sampled_metrics(source):
+    """Return the latest sampled MetricsTable for a source, or None when there is no recent sample."""
+    if _metrics_sampler is None:
+        return None
+    latest = _metrics_sampler.stores[source].latest()
+    # A sampler that keeps failing must not serve stale data forever
+    if latest is None or time.time() - latest[0] > 3 * METRICS_INTERVAL:
+        return None
+    return latest[1]
+
+def get_metrics_version(source):
+    """Timestamp of the latest metrics sample in use for a source, or None when metrics are fetched live."""
+    return _metrics_sampler.stores[source].latest()[0] if _sampled_metrics(source) is not None else None
+
+def get_top_nodes(limit=None):
+    """
+    Retrieve top nodes by CPU usage with CPU and Memory usage as percentages, converting memory to GiB.
+    """
+    try:
+        table = _sampled_metrics("nodes")
+        if table is None:
+            table = fetch_node_metrics()
 
-        # Fetch node capacities
-        core_api = client.CoreV1Api()
-        nodes = core_api.list_node()
-
-        # Map node capacities
-        node_capacity = {
-            node.metadata.name: {
-                "cpu": node.status.capacity["cpu"],  # In cores
-                "memory": node.status.capacity["memory"],  # In Ki
-            }
-            for node in nodes.items
-        }
-
-        # Calculate usage percentages
+        # Format only the selected rows, largest CPU usage first
         top_nodes = []
-        for node in metrics["items"]:
-            name = node["metadata"]["name"]
-            cpu_usage = int(node["usage"]["cpu"].strip("n")) / 1e9  # Convert nanocores to cores
-            memory_usage_mi = int(node["usage"]["memory"].strip("Ki")) // 1024  # Convert Ki to Mi
-
-            total_cpu = int(node_capacity[name]["cpu"])  # Total CPU in cores
-            total_memory_mi = int(node_capacity[name]["memory"].strip("Ki")) // 1024  # Convert Ki to Mi
-
-            # Convert memory to GiB
-            memory_usage_gi = memory_usage_mi / 1024
-            total_memory_gi = total_memory_mi / 1024
-
+        for i in table.top(limit):
+            cpu, memory_gi, total_memory_gi = table.cpu[i], table.memory[i] / 1024, table.memory_total[i] / 1024
             top_nodes.append({
-                "name": name,
-                "cpu": f"{cpu_usage:.2f} cores ({(cpu_usage / total_cpu) * 100:.1f}%)",
-                "memory": f"{memory_usage_gi:.2f} Gi ({(memory_usage_gi / total_memory_gi) * 100:.1f}%)"
+                "name": table.names[i],
+                "cpu": f"{cpu:.2f} cores{_percent(cpu, table.cpu_total[i])}",
+                "memory": f"{memory_gi:.2f} Gi{_percent(memory_gi, total_memory_gi)}",
+                "cpu_cores": cpu,
+                "memory_mi": table.memory[i],
             })
-
-        return sorted(top_nodes, key=lambda x: x["cpu"], reverse=True)
+        return top_nodes
 
     except client.exceptions.ApiException as e:
         logger.error(f"Failed to fetch node metrics: {e}")
         # Return fallback data
         return [{"name": "N/A", "cpu": "N/A", "memory": "N/A"}]
 
-def parse_memory(value):
-    """
-    Parse memory values from Kubernetes (e.g., '256Mi', '2Gi') into Mi (Mebibytes).
-    """
-    if value.endswith("Mi"):
-        return int(value.strip("Mi"))
-    elif value.endswith("Gi"):
-        return int(value.strip("Gi")) * 1024
-    elif value.endswith("Ki"):
-        return int(value.strip("Ki")) // 1024
-    elif value.endswith("G"):
-        return int(value.strip("G")) * 1024  # Convert Gigabytes to MiB
-    elif value.endswith("M"):
-        return int(value.strip("M"))  # Assuming already in MiB
-    else:
-        # Default to Mi if no unit is provided
-        return int(value)
-
-def get_top_pods(namespace=None):
+def get_top_pods(namespace=None, limit=None):
     """
-    Retrieve top pods with CPU and Memory usage as percentages.
+    Retrieve top pods by CPU usage with CPU and Memory usage as percentages of their requests.
     """
     try:
-        # Fetch pod metrics
-        custom_api = client.CustomObjectsApi()
-        if namespace:
-            metrics = custom_api.list_namespaced_custom_object(
-                group="metrics.k8s.io",
-                version="v1beta1",
-                namespace=namespace,
-                plural="pods"
-            )
-        else:
-            metrics = custom_api.list_cluster_custom_object(
-                group="metrics.k8s.io",
-                version="v1beta1",
-                plural="pods"
-            )
-
-        # Fetch pod specifications
-        core_api = client.CoreV1Api()
-        pods = core_api.list_pod_for_all_namespaces() if not namespace else core_api.list_namespaced_pod(namespace)
-
-        # Map pod resource requests/limits
-        pod_resources = {
-            (pod.metadata.namespace, pod.metadata.name): {
-                "cpu": sum(
-                    int(container.resources.requests.get("cpu", "0").strip("m")) / 1000
-                    if container.resources and container.resources.requests else 0
-                    for container in pod.spec.containers
-                ),
-                "memory": sum(
-                    parse_memory(container.resources.requests.get("memory", "0Mi"))
-                    if container.resources and container.resources.requests else 0
-                    for container in pod.spec.containers
-                )
-            }
-            for pod in pods.items
-        }
+        table = _sampled_metrics("pods")
+        if table is None:
+            table = fetch_pod_metrics(namespace)
 
-        # Calculate usage percentages
+        # Format only the selected rows, largest CPU usage first
         top_pods = []
-        for pod in metrics["items"]:
-            name = pod["metadata"]["name"]
-            namespace = pod["metadata"]["namespace"]
-
-            cpu_usage = sum(parse_cpu(container["usage"]["cpu"]) for container in pod["containers"])
-            memory_usage = sum(parse_memory(container["usage"]["memory"]) for container in pod["containers"])
-
-            total_cpu = pod_resources.get((namespace, name), {}).get("cpu", 1)
-            total_memory = pod_resources.get((namespace, name), {}).get("memory", 1)
-
+        for i in table.top(limit, namespace=namespace):
+            cpu, memory = table.cpu[i], table.memory[i]
+            total_cpu, total_memory = table.cpu_total[i], table.memory_total[i]
             top_pods.append({
-                "name": name,
-                "namespace": namespace,
-                "cpu": f"{cpu_usage:.2f} cores ({(cpu_usage / total_cpu) * 100:.1f}%)" if total_cpu > 0 else "N/A",
-                "memory": f"{memory_usage} Mi ({(memory_usage / total_memory) * 100:.1f}%)" if total_memory > 0 else "N/A"
+                "name": table.names[i],
+                "namespace": table.namespaces[i],
+                "cpu": f"{cpu:.2f} cores{_percent(cpu, total_cpu)}" if total_cpu > 0 else "N/A",
+                "memory": f"{memory:.0f} Mi{_percent(memory, total_memory)}" if total_memory > 0 else "N/A",
+                "cpu_cores": cpu,
+                "memory_mi": memory,
             })
-
-        return sorted(top_pods, key=lambda x: x["cpu"], reverse=True)
+        return top_pods
     except client.exceptions.ApiException as e:
         logger.error(f"Metrics Server unavailable for pods: {e}")
         # Return fallback data
         return [{"name": "N/A", "namespace": "N/A", "cpu": "N/A", "memory": "N/A"}]
+
+def get_metrics_history(source, name, namespace=None, window=3600, points=60):
+    """
+    Summarize the sampled CPU (cores) and memory (MiB) of one node or pod over
+    the last `window` seconds: p50/p95/max plus downsampled sparkline series.
+    """
+    if _metrics_sampler is None:
+        return {"error": "Metrics sampling is disabled (KUBEFUN_METRICS_INTERVAL=0)."}
+    series = _metrics_sampler.stores[source].window((namespace, name), window)
+    if series is None:
+        return {"error": f"No metrics samples for {source[:-1]} {namespace + '/' if namespace else ''}{name}."}
+    times, cpu, memory = series
+    return {
+        "name": name,
+        "namespace": namespace,
+        "window": window,
+        "samples": len(times),
+        "cpu": summarize(cpu),
+        "memory": summarize(memory),
+        "sparkline": {
+            "times": sparkline(times, points),
+            "cpu": sparkline(cpu, points),
+            "memory": sparkline(memory, points),
+        },
+    }
@@ -0,0 +1,249 @@
+"""
+Read-through cache for k8s_client functions.
+
+Each resource kind has a policy (TTL, max entries, max bytes) applied by an
+LRU/TTL cache; concurrent misses for the same key are collapsed into one
+call (single flight). The store behind the policies is swappable:
+
+    KUBEFUN_CACHE_BACKEND=memory   per-process cachetools caches (default)
+    KUBEFUN_CACHE_BACKEND=shared   the shared cache process (src/cache_server.py),
+                                   so every worker sees one copy
+
+Per-kind policies can be overridden with JSON, e.g.
+KUBEFUN_CACHE_POLICIES='{"pods": {"ttl": 2}, "nodes": {"max_entries": 8}}'.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlencode
+
+import urllib3
+from cachetools import TTLCache
+
+from .informer import get_informer
+from .instrumentation import registry
+from .kube_json import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {
+    "ttl": float(os.getenv("KUBEFUN_CACHE_TTL", "5")),
+    "max_entries": int(os.getenv("KUBEFUN_CACHE_MAX_ENTRIES", "1024")),
+    "max_bytes": int(os.getenv("KUBEFUN_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+}
+
+# Policies that differ from the default; slow-changing kinds are kept longer
+POLICIES = {
+    "nodes": {"ttl": 15},
+    "storage_classes": {"ttl": 60},
+    "crds": {"ttl": 60},
+    "cluster_roles": {"ttl": 60},
+    "cluster_role_bindings": {"ttl": 60},
+    "events": {"ttl": 2},
+}
+for _kind, _overrides in json.loads(os.getenv("KUBEFUN_CACHE_POLICIES", "{}")).items():
+    POLICIES.setdefault(_kind, {}).update(_overrides)
+
+def policy_for(kind):
+    return {**DEFAULT_POLICY, **POLICIES.get(kind, {})}
+
+def _size_of(value):
+    try:
+        return len(dumps(value))
+    except TypeError:
+        return 1024
+
+
+class KindCache(TTLCache):
+    """TTL + LRU cache bounded by encoded size in bytes and by number of entries."""
+
+    def __init__(self, policy):
+        super().__init__(maxsize=policy["max_bytes"], ttl=policy["ttl"], getsizeof=_size_of)
+        self.max_entries = policy["max_entries"]
+        self.evictions = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        while len(self) > self.max_entries:
+            self.popitem()
+
+    def popitem(self):
+        # Called by cachetools whenever an entry must make room, by size or by count
+        self.evictions += 1
+        return super().popitem()
+
+
+class MemoryBackend:
+    """One KindCache per resource kind, held in this process."""
+
+    def __init__(self):
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, kind):
+        cache = self._caches.get(kind)
+        if cache is None:
+            cache = self._caches[kind] = KindCache(policy_for(kind))
+        return cache
+
+    def get(self, kind, key):
+        with self._lock:
+            return self._cache(kind).get(key)
+
+    def set(self, kind, key, value):
+        with self._lock:
+            try:
+                self._cache(kind)[key] = value
+            except ValueError:
+                # Larger than the kind's whole byte budget; serve it uncached
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                kind: {
+                    "entries": len(cache), "bytes": cache.currsize, "max_bytes": cache.maxsize,
+                    "evictions": cache.evictions,
+                }
+                for kind, cache in self._caches.items()
+            }
+
+
+# Every request to the shared cache process carries its token (KUBEFUN_CACHE_TOKEN, set by gunicorn.conf.py)
+CACHE_TOKEN_HEADER = "X-Kubefun-Cache-Token"
+
+def cache_headers():
+    return {CACHE_TOKEN_HEADER: os.getenv("KUBEFUN_CACHE_TOKEN", "")}
+
+
+class SharedBackend:
+    """Store entries in the shared cache process over localhost (see src/cache_server.py)."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self._http = urllib3.PoolManager(maxsize=int(os.getenv("KUBEFUN_CACHE_CONNECTIONS", "16")))
+
+    def get(self, kind, key):
+        try:
+            response = self._http.request(
+                "GET", f"{self.url}/kv/{kind}", fields={"key": key}, headers=cache_headers(), retries=False,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            logger.warning(f"Shared cache unavailable: {e}")
+            return None
+        return loads(response.data) if response.status == 200 else None
+
+    def set(self, kind, key, value):
+        try:
+            self._http.request(
+                "PUT", f"{self.url}/kv/{kind}?{urlencode({'key': key})}",
+                body=dumps(value), headers={**cache_headers(), "Content-Type": "application/json"}, retries=False,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            logger.warning(f"Shared cache unavailable: {e}")
+
+    def stats(self):
+        return {}
+
+
+def create_backend():
+    name = os.getenv("KUBEFUN_CACHE_BACKEND", "memory")
+    cache_url = os.getenv("KUBEFUN_CACHE_URL")
+    if name == "shared":
+        if cache_url:
+            return SharedBackend(cache_url)
+        logger.warning("KUBEFUN_CACHE_BACKEND=shared needs KUBEFUN_CACHE_URL; using the in-process cache.")
+    return MemoryBackend()
+
+_backend = None
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+cache_requests = registry.counter(
+    "kubefun_kube_cache_requests_total",
+    "Reads of cached k8s_client functions by kind and result (hit, miss, bypass while an informer is synced).",
+    ("kind", "result"),
+)
+
+def _collect_backend(field):
+    def collect():
+        for kind, stats in sorted(get_backend().stats().items()):
+            yield (kind,), stats[field]
+    return collect
+
+registry.collect(
+    "kubefun_kube_cache_evictions_total", "counter", "Entries evicted to stay within a kind's cache limits.", ("kind",),
+)(_collect_backend("evictions"))
+registry.collect(
+    "kubefun_kube_cache_entries", "gauge", "Entries held in the in-process cache of each kind.", ("kind",),
+)(_collect_backend("entries"))
+registry.collect(
+    "kubefun_kube_cache_bytes", "gauge", "JSON-encoded bytes held in the in-process cache of each kind.", ("kind",),
+)(_collect_backend("bytes"))
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+def set_backend(backend):
+    """Swap the store behind every cached function (e.g. MemoryBackend() or SharedBackend(url))."""
+    global _backend
+    _backend = backend
+
+def single_flight(key, fn):
+    """Run fn() once for concurrent callers with the same key; the others wait for its result."""
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = fn()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+def cached(kind, informer_kind=None):
+    """
+    Cache a k8s_client read under a kind's policy, keyed by function name and arguments.
+
+    Results that are {"error": ...} dicts are not stored. With informer_kind,
+    the cache is bypassed while that kind's informer is synced, since the
+    informer store is already current and in memory.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if informer_kind is not None and get_informer(informer_kind) is not None:
+                cache_requests.inc(kind, "bypass")
+                return fn(*args, **kwargs)
+
+            key = f"{fn.__name__}:{dumps([args, sorted(kwargs.items())]).decode()}"
+            backend = get_backend()
+            value = backend.get(kind, key)
+            if value is not None:
+                cache_requests.inc(kind, "hit")
+                return value
+            cache_requests.inc(kind, "miss")
+
+            def load():
+                result = fn(*args, **kwargs)
+                if not (isinstance(result, dict) and "error" in result):
+                    backend.set(kind, key, result)
+                return result
+
+            return single_flight(key, load)
+        return wrapper
+    return decorator
@@ -0,0 +1,101 @@
+"""
+Raw JSON access to the Kubernetes API.
+
+Calls go out with _preload_content=False and the response body is decoded
+straight into plain dicts (camelCase keys, as served by the apiserver),
+skipping the kubernetes client's OpenAPI model deserialisation.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from .tracing import record_call
+
+_call_limits = contextvars.ContextVar("kubefun_call_limits", default=None)
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:  # orjson is optional; the stdlib decoder is slower but equivalent
+    import json
+
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj):
+        return json.dumps(obj).encode()
+
+
+class CallLimits:
+    """
+    Timeout and cancellation applied to every call_json() made in a context
+    (see call_limits()). A cancelled CallLimits, or one whose parent is
+    cancelled, makes further calls raise CancelledError, so work nobody waits
+    for stops at its next API call, e.g. the next page of a LIST.
+    """
+
+    def __init__(self, timeout, parent=None):
+        self.timeout = timeout
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+@contextlib.contextmanager
+def call_limits(limits):
+    """Apply limits to the calls made in this context, including pool tasks wrapped with in_request_context()."""
+    token = _call_limits.set(limits)
+    try:
+        yield limits
+    finally:
+        _call_limits.reset(token)
+
+def call_json(api_fn, *args, **kwargs):
+    """
+    Invoke a kubernetes client method and return its decoded JSON body.
+    The call is recorded on the current request's trace (see tracing.py).
+    Under call_limits() each call is bounded by their timeout (connecting and
+    reading included) and refused once they are cancelled.
+    """
+    limits = _call_limits.get()
+    if limits is not None:
+        if limits.cancelled:
+            raise CancelledError(f"{getattr(api_fn, '__name__', api_fn)} cancelled")
+        kwargs.setdefault("_request_timeout", limits.timeout)
+    started = time.perf_counter()
+    try:
+        response = api_fn(*args, _preload_content=False, **kwargs)
+    except Exception as e:
+        error = getattr(e, "status", None) or type(e).__name__
+        record_call(api_fn, args, kwargs, 0, 0.0, (time.perf_counter() - started) * 1000, error)
+        raise
+    try:
+        data = response.data
+        received = time.perf_counter()
+        obj = loads(data)
+        decoded = time.perf_counter()
+    finally:
+        response.release_conn()
+    record_call(api_fn, args, kwargs, len(data), (decoded - received) * 1000, (decoded - started) * 1000)
+    return obj
+
+def name_of(obj):
+    return obj["metadata"]["name"]
+
+def namespace_of(obj):
+    return obj["metadata"].get("namespace")
+
+def resource_version_of(obj):
+    return obj["metadata"].get("resourceVersion")
@@ -0,0 +1,165 @@
+"""
+Row-level change events pushed to open pages with Server-Sent Events.
+
+Informer handlers publish (kind, ADDED|MODIFIED|DELETED, row) to a LiveHub.
+Every open page holds one Subscription, filtered by kind, namespace and
+optionally object name, and reads it through sse_stream(). Pages patch their
+tables from the events instead of re-fetching, so update latency is watch
+latency and an open page costs the apiserver nothing.
+
+Each subscription has a bounded queue. A client that falls behind loses its
+queued events and receives a single "reset" event, after which the page
+reloads its table.
+"""
+import os
+import queue
+import threading
+import time
+
+from .kube_json import dumps
+
+QUEUE_SIZE = int(os.getenv("KUBEFUN_LIVE_QUEUE_SIZE", "1000"))
+# Each open stream holds a server thread, so streams per process are capped
+MAX_CLIENTS = int(os.getenv("KUBEFUN_LIVE_MAX_CLIENTS", "16"))
+# Threads of a bounded server pool that streams never take, so ordinary requests are still served
+RESERVED_THREADS = 2
+HEARTBEAT = float(os.getenv("KUBEFUN_LIVE_HEARTBEAT", "15"))
+# Streams are closed after this long; browsers reconnect on their own, which rebalances them across workers
+MAX_DURATION = float(os.getenv("KUBEFUN_LIVE_MAX_DURATION", "600"))
+RETRY_MS = 5000
+
+
+class Subscription:
+    """
+    One client's filter and bounded event queue. kinds=None matches every kind.
+    Detailed subscriptions (by default those for one named object) also get
+    the full object and MODIFIED events that leave the row unchanged.
+    """
+
+    def __init__(self, kinds, namespace=None, name=None, queue_size=QUEUE_SIZE, detailed=None):
+        self.kinds = None if kinds is None else frozenset(kinds)
+        self.namespace = namespace
+        self.name = name
+        self.detailed = bool(name) if detailed is None else detailed
+        self.queue = queue.Queue(queue_size)
+        self.overflowed = False
+
+    def matches(self, kind, row):
+        if self.kinds is not None and kind not in self.kinds:
+            return False
+        if self.namespace and row.get("namespace") != self.namespace:
+            return False
+        return not self.name or row["name"] == self.name
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def reset(self):
+        """Drop queued events and report whether the client must reload."""
+        overflowed, self.overflowed = self.overflowed, False
+        if overflowed:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+        return overflowed
+
+
+class LiveHub:
+    """
+    Fan informer events out to subscriptions.
+
+    Events are (kind, event_type, row, obj, changed). Only detailed subscriptions
+    receive the object; the others receive MODIFIED events only when the
+    row actually changed.
+    """
+
+    def __init__(self, max_clients=MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.enabled = False
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def limit_to_threads(self, threads):
+        """Lower max_clients so streams leave RESERVED_THREADS of a `threads`-thread server free."""
+        limit = max(threads - RESERVED_THREADS, 0)
+        if self.max_clients is None or self.max_clients > limit:
+            self.max_clients = limit
+        return self.max_clients
+
+    def subscribe(self, kinds, namespace=None, name=None, queue_size=QUEUE_SIZE, detailed=None):
+        """Return a new Subscription, or None when the process already serves max_clients streams."""
+        with self._lock:
+            if self.max_clients is not None and len(self._subscriptions) >= self.max_clients:
+                return None
+            subscription = Subscription(kinds, namespace, name, queue_size, detailed)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, kind, event_type, row, obj=None, changed=True):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.matches(kind, row):
+                continue
+            if subscription.detailed:
+                subscription.offer((kind, event_type, row, obj, changed))
+            elif changed:
+                subscription.offer((kind, event_type, row, None, changed))
+
+    def reset_all(self):
+        """Make every client reload, e.g. after events may have been missed."""
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.overflowed = True
+                subscription.offer(None)
+
+    def handler(self, kind, row_builder):
+        """Return an informer handler that publishes the rows of one kind."""
+        def handle(event_type, obj, old_obj):
+            row = row_builder(obj)
+            changed = event_type != "MODIFIED" or old_obj is None or row_builder(old_obj) != row
+            self.publish(kind, event_type, row, obj, changed)
+        return handle
+
+
+live_hub = LiveHub()
+
+def _format(event, data):
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+def sse_stream(hub, subscription):
+    """Yield the text/event-stream body for one subscription until MAX_DURATION or disconnect."""
+    deadline = time.monotonic() + MAX_DURATION
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            try:
+                event = subscription.queue.get(timeout=HEARTBEAT)
+            except queue.Empty:
+                # Comment lines keep proxies from closing the stream and reveal disconnected clients
+                yield ": keepalive\n\n"
+                continue
+            if subscription.reset():
+                yield _format("reset", {})
+                continue
+            if event is None:
+                continue
+            kind, event_type, row, obj, _ = event
+            data = {"kind": kind, "row": row}
+            if obj is not None:
+                data["object"] = obj
+            yield _format(event_type.lower(), data)
+    finally:
+        hub.unsubscribe(subscription)
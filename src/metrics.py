@@ -0,0 +1,68 @@
+import heapq
+from array import array
+
+from .quantity import parse_column
+
+
+def sum_quantities(parse, groups):
+    """
+    Parse groups of quantity strings (e.g. the containers of each pod) as one
+    column and return an array with one summed value per group.
+    """
+    values = []
+    sizes = []
+    for group in groups:
+        group = list(group)
+        values.extend(group)
+        sizes.append(len(group))
+    parsed = parse_column(parse, values)
+
+    sums = array("d")
+    offset = 0
+    for size in sizes:
+        sums.append(sum(parsed[offset:offset + size]))
+        offset += size
+    return sums
+
+
+class MetricsTable:
+    """
+    Column-oriented resource usage for a set of pods or nodes.
+
+    Usage and totals (requests for pods, capacity for nodes) are kept as
+    numeric arrays so rows sort by value, and top() selects the K largest
+    rows without sorting the whole table. Nothing is formatted here; callers
+    format only the rows they render.
+    """
+
+    COLUMNS = ("cpu", "memory", "cpu_total", "memory_total")
+
+    def __init__(self):
+        self.names = []
+        self.namespaces = []
+        for column in self.COLUMNS:
+            setattr(self, column, array("d"))
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, name, namespace, cpu, memory, cpu_total, memory_total):
+        self.names.append(name)
+        self.namespaces.append(namespace)
+        self.cpu.append(cpu)
+        self.memory.append(memory)
+        self.cpu_total.append(cpu_total)
+        self.memory_total.append(memory_total)
+
+    def top(self, k=None, column="cpu", namespace=None):
+        """
+        Return the row indices of the k largest values of a column, largest
+        first, optionally restricted to one namespace.
+        """
+        values = getattr(self, column)
+        indices = range(len(values))
+        if namespace:
+            indices = [i for i in indices if self.namespaces[i] == namespace]
+        if k is None or k >= len(indices):
+            return sorted(indices, key=values.__getitem__, reverse=True)
+        return heapq.nlargest(k, indices, key=values.__getitem__)
@@ -0,0 +1,46 @@
+import threading
+from collections import Counter
+
+from .kube_json import namespace_of
+
+
+def count_by_namespace(objects):
+    """Count objects per namespace in a single pass."""
+    return Counter(namespace_of(obj) for obj in objects)
+
+
+class NamespaceCounts:
+    """
+    Per-namespace object counts for several resource kinds, kept current from
+    informer events so reading them costs O(namespaces) instead of a scan of
+    every object.
+
+    Namespaces are immutable on Kubernetes objects, so only ADDED and DELETED
+    events change a count.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def handler(self, kind):
+        """Return an informer handler that maintains the counts for one kind."""
+        with self._lock:
+            self._counts.setdefault(kind, Counter())
+
+        def handle(event_type, obj, old_obj):
+            namespace = namespace_of(obj)
+            with self._lock:
+                counts = self._counts[kind]
+                if event_type == "ADDED":
+                    counts[namespace] += 1
+                elif event_type == "DELETED":
+                    counts[namespace] -= 1
+                    if counts[namespace] <= 0:
+                        del counts[namespace]
+        return handle
+
+    def counts(self, kind):
+        """Return a copy of the per-namespace counts for one kind."""
+        with self._lock:
+            return Counter(self._counts.get(kind, ()))
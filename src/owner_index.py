@@ -0,0 +1,81 @@
+import threading
+
+from .kube_json import name_of, namespace_of
+
+# Informer kind -> ownerReference kind of the controllers pods are resolved to
+CONTROLLER_KINDS = {
+    "replica_sets": "ReplicaSet",
+    "deployments": "Deployment",
+    "stateful_sets": "StatefulSet",
+}
+
+
+def controller_ref(obj):
+    """Return the managing ownerReference of an object (the one marked controller), if any."""
+    refs = obj["metadata"].get("ownerReferences") or []
+    for ref in refs:
+        if ref.get("controller"):
+            return ref
+    return refs[0] if refs else None
+
+
+class OwnerIndex:
+    """
+    Controllers keyed by (namespace, kind, name), used to resolve a pod to the
+    workload that owns it: Pod -> ReplicaSet -> Deployment, or Pod -> StatefulSet.
+
+    Each entry keeps the controller's desired and ready replicas plus its own
+    controller reference, so resolution is a couple of dict lookups per pod.
+    """
+
+    def __init__(self):
+        self._controllers = {}
+        self._lock = threading.Lock()
+
+    def update(self, kind, obj):
+        """Add or replace a controller, given its informer kind and decoded object."""
+        owner = controller_ref(obj)
+        entry = {
+            "desired": obj["spec"].get("replicas") or 0,
+            "ready": (obj.get("status") or {}).get("readyReplicas") or 0,
+            "owner": (owner["kind"], owner["name"]) if owner else None,
+        }
+        with self._lock:
+            self._controllers[(namespace_of(obj), CONTROLLER_KINDS[kind], name_of(obj))] = entry
+
+    def remove(self, kind, obj):
+        with self._lock:
+            self._controllers.pop((namespace_of(obj), CONTROLLER_KINDS[kind], name_of(obj)), None)
+
+    def handler(self, kind):
+        """Return an informer handler that keeps one controller kind up to date."""
+        def handle(event_type, obj, old_obj):
+            if event_type == "DELETED":
+                self.remove(kind, obj)
+            else:
+                self.update(kind, obj)
+        return handle
+
+    def resolve(self, pod):
+        """
+        Return the (desired, ready) replicas of the top-level workload that owns a
+        pod, or None when the pod has no known controller.
+        """
+        ref = controller_ref(pod)
+        if ref is None:
+            return None
+        namespace = namespace_of(pod)
+        key = (namespace, ref["kind"], ref["name"])
+        with self._lock:
+            entry = self._controllers.get(key)
+            # Follow ReplicaSet -> Deployment when the ReplicaSet is managed by a known Deployment
+            for _ in CONTROLLER_KINDS:
+                if entry is None or entry["owner"] is None:
+                    break
+                parent = self._controllers.get((namespace, *entry["owner"]))
+                if parent is None:
+                    break
+                entry = parent
+        if entry is None:
+            return None
+        return entry["desired"], entry["ready"]
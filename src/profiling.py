@@ -0,0 +1,308 @@
+"""
+Opt-in profiling of single requests, plus continuous low-rate sampling.
+
+With KUBEFUN_PROFILING=true, any route runs under a profiler when asked
+with ?profile=<format> or an X-Kubefun-Profile: <format> header:
+
+    collapsed   wall-clock stack samples of every thread working for the
+                request, one "frame;frame;... count" line per stack, as read
+                by flamegraph.pl, speedscope and similar tools
+    pstats      deterministic cProfile of the request and its pool tasks,
+                merged into one file for pstats, snakeviz or gprof2dot; one
+                at a time per process, a concurrent one is refused with 409
+
+Profiles are written to KUBEFUN_PROFILE_DIR, and the response names the file
+in its X-Kubefun-Profile header. Files are listed on /debug/profiles. The
+render cache is bypassed for profiled requests, so the page is really built.
+
+With KUBEFUN_PROFILE_CONTINUOUS_HZ > 0, a background thread samples every
+busy thread of the process at that rate. Each KUBEFUN_PROFILE_SEGMENT
+seconds it writes the collapsed stacks to a file in the same directory. The
+oldest segments are deleted to keep them under KUBEFUN_PROFILE_BUFFER_MB.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("KUBEFUN_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("KUBEFUN_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "kubefun-profiles"))
+# Seconds between stack samples of a profiled request
+REQUEST_INTERVAL = float(os.getenv("KUBEFUN_PROFILE_INTERVAL", "0.002"))
+CONTINUOUS_HZ = float(os.getenv("KUBEFUN_PROFILE_CONTINUOUS_HZ", "0"))
+SEGMENT_SECONDS = float(os.getenv("KUBEFUN_PROFILE_SEGMENT", "60"))
+BUFFER_BYTES = int(float(os.getenv("KUBEFUN_PROFILE_BUFFER_MB", "64")) * 1024 * 1024)
+# Request profiles kept in PROFILE_DIR; older ones are deleted
+MAX_REQUEST_PROFILES = int(os.getenv("KUBEFUN_PROFILE_KEEP", "100"))
+
+FORMATS = {"collapsed": ".collapsed", "pstats": ".pstats"}
+HEADER = "X-Kubefun-Profile"
+
+# From Python 3.12 cProfile hooks sys.monitoring: one profiler sees every thread, and a second one cannot start
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+_sequence = itertools.count(1)
+# Held by the running pstats profile
+_cprofile_lock = threading.Lock()
+
+# Leaf frames of threads parked with nothing to do, left out of continuous samples
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socketserver.py", "serve_forever"),
+}
+
+
+def profiles_available():
+    """True when request profiles or continuous segments may be written, so /debug/profiles is served."""
+    return ENABLED or CONTINUOUS_HZ > 0
+
+def requested_format(args, headers):
+    """Return the profile format a request asks for, or None when it is not to be profiled."""
+    if not ENABLED:
+        return None
+    value = (args.get("profile") or headers.get(HEADER) or "").strip().lower()
+    if not value:
+        return None
+    # ?profile=1 asks for the default format
+    return value if value in FORMATS else "collapsed"
+
+def _frame_label(code):
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _thread_label(name):
+    # Pool and server threads are numbered (snapshot-fetch_3, Thread-7); their samples are merged per role
+    return re.sub(r"^Thread-\d+", "Thread", re.sub(r"_\d+$", "", name))
+
+def collapse(frame, thread_name):
+    """Return the collapsed stack of a frame, root first and prefixed with the thread's role."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(_thread_label(thread_name))
+    return ";".join(reversed(labels))
+
+def write_collapsed(path, stacks):
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class StackSampler:
+    """
+    Sample the Python stacks of a set of threads from a background thread.
+
+    `threads` is a callable returning the idents to sample (None for every
+    thread but the sampler). Samples accumulate as collapsed stacks.
+    """
+
+    def __init__(self, interval, threads=None, skip_idle=False):
+        self.interval = interval
+        self.threads = threads
+        self.skip_idle = skip_idle
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, name="stack-sampler"):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def take(self):
+        """Return the stacks sampled so far and start counting afresh."""
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+        return stacks
+
+    def sample(self):
+        wanted = self.threads() if self.threads is not None else None
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (wanted is not None and ident not in wanted):
+                continue
+            code = frame.f_code
+            if self.skip_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stacks.append(collapse(frame, names.get(ident, "thread")))
+        with self._lock:
+            self.stacks.update(stacks)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+
+class Profile:
+    """
+    One profiled request. Wall-clock stacks are sampled for "collapsed";
+    for "pstats" every thread working for the request runs under cProfile.
+    On Python 3.12+ a single process-wide cProfile covers the pool tasks
+    (and, unavoidably, whatever else the process runs meanwhile).
+    """
+
+    def __init__(self, fmt, trace, endpoint):
+        self.format = fmt
+        self.name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_sequence)}-{endpoint}{FORMATS[fmt]}"
+        self.path = os.path.join(PROFILE_DIR, self.name)
+        self._profilers = []
+        self._lock = threading.Lock()
+        self._request_profiler = None
+        self._sampler = None
+        if fmt == "collapsed":
+            self._sampler = StackSampler(REQUEST_INTERVAL, threads=lambda: set(trace.threads))
+        else:
+            self._request_profiler = self._new_profiler()
+
+    def _new_profiler(self):
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        return profiler
+
+    def start(self):
+        """Start profiling; raises RuntimeError when another pstats profile is running in this process."""
+        if self._sampler is not None:
+            self._sampler.start("request-profiler")
+            return self
+        if not _cprofile_lock.acquire(blocking=False):
+            raise RuntimeError("Another pstats profile is running in this process; retry when it is done.")
+        try:
+            self._request_profiler.enable()
+        except BaseException:
+            _cprofile_lock.release()
+            raise
+        return self
+
+    def run(self, fn, *args, **kwargs):
+        """Run a pool task for the request, profiled like the request itself."""
+        if self._sampler is not None or PROCESS_WIDE_CPROFILE:
+            return fn(*args, **kwargs)
+        return self._new_profiler().runcall(fn, *args, **kwargs)
+
+    def stop(self):
+        """Stop profiling and write the profile file."""
+        if self._sampler is not None:
+            self._sampler.stop()
+            stacks = self._sampler.take()
+        else:
+            try:
+                self._request_profiler.disable()
+            finally:
+                _cprofile_lock.release()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self._sampler is not None:
+            write_collapsed(self.path, stacks)
+        else:
+            with self._lock:
+                profilers = list(self._profilers)
+            merged = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                merged.add(profiler)
+            merged.dump_stats(self.path)
+        _prune(lambda name: not name.startswith("continuous-"), max_files=MAX_REQUEST_PROFILES)
+        return self.path
+
+
+def list_profiles():
+    """Return the profiles in PROFILE_DIR, newest first."""
+    try:
+        entries = list(os.scandir(PROFILE_DIR))
+    except FileNotFoundError:
+        return []
+    profiles = [
+        {"name": entry.name, "bytes": entry.stat().st_size, "modified": entry.stat().st_mtime}
+        for entry in entries
+        if entry.is_file() and entry.name.endswith(tuple(FORMATS.values()))
+    ]
+    profiles.sort(key=lambda profile: -profile["modified"])
+    return profiles
+
+def _prune(selected, max_files=None, max_bytes=None):
+    """Delete the oldest selected profiles beyond max_files or max_bytes, always keeping the newest."""
+    kept_bytes = 0
+    for index, profile in enumerate(p for p in list_profiles() if selected(p["name"])):
+        kept_bytes += profile["bytes"]
+        if index == 0:
+            continue
+        if (max_files is not None and index >= max_files) or (max_bytes is not None and kept_bytes > max_bytes):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile["name"]))
+            except FileNotFoundError:
+                # Another worker pruned it first
+                pass
+
+
+class ContinuousProfiler:
+    """Low-rate StackSampler over the whole process, flushed to disk in segments."""
+
+    def __init__(self, hz=CONTINUOUS_HZ, segment=SEGMENT_SECONDS, buffer_bytes=BUFFER_BYTES):
+        self.sampler = StackSampler(1 / hz, skip_idle=True)
+        self.segment = segment
+        self.buffer_bytes = buffer_bytes
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self.sampler.start("continuous-profiler")
+        self._thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.sampler.stop()
+
+    def flush(self):
+        stacks = self.sampler.take()
+        if not stacks:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"continuous-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.collapsed")
+        write_collapsed(path, stacks)
+        _prune(lambda name: name.startswith("continuous-"), max_bytes=self.buffer_bytes)
+        return path
+
+    def _run(self):
+        while not self._stopped.wait(self.segment):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"Failed to write continuous profile: {e}")
+
+
+_continuous = None
+
+def start_continuous_profiler():
+    """Start continuous sampling when KUBEFUN_PROFILE_CONTINUOUS_HZ is set."""
+    global _continuous
+    if CONTINUOUS_HZ <= 0:
+        return None
+    if _continuous is None:
+        _continuous = ContinuousProfiler()
+    _continuous.start()
+    logger.info(f"Sampling stacks at {CONTINUOUS_HZ:g} Hz into {PROFILE_DIR} (up to {BUFFER_BYTES // (1024 * 1024)} MB).")
+    return _continuous
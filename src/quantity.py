@@ -0,0 +1,80 @@
+"""
+Kubernetes resource quantities (resource.Quantity), parsed exactly.
+
+    quantity        ::= <signedNumber><suffix>
+    suffix          ::= <binarySI> | <decimalExponent> | <decimalSI>
+    binarySI        ::= Ki | Mi | Gi | Ti | Pi | Ei
+    decimalSI       ::= n | u | m | "" | k | M | G | T | P | E
+    decimalExponent ::= "e" <signedNumber> | "E" <signedNumber>
+
+Values are Fractions, so "1.5Gi" or "100m" carry no rounding error until
+they are converted to cores or MiB for display.
+"""
+import re
+from array import array
+from fractions import Fraction
+from functools import lru_cache
+
+BINARY_SI = {
+    "Ki": 2 ** 10,
+    "Mi": 2 ** 20,
+    "Gi": 2 ** 30,
+    "Ti": 2 ** 40,
+    "Pi": 2 ** 50,
+    "Ei": 2 ** 60,
+}
+
+DECIMAL_SI = {
+    "n": Fraction(1, 10 ** 9),
+    "u": Fraction(1, 10 ** 6),
+    "m": Fraction(1, 10 ** 3),
+    "": Fraction(1),
+    "k": Fraction(10 ** 3),
+    "M": Fraction(10 ** 6),
+    "G": Fraction(10 ** 9),
+    "T": Fraction(10 ** 12),
+    "P": Fraction(10 ** 15),
+    "E": Fraction(10 ** 18),
+}
+
+MEBIBYTE = 2 ** 20
+
+_QUANTITY = re.compile(
+    r"^(?P<sign>[+-]?)(?P<whole>\d*)(?:\.(?P<fraction>\d*))?"
+    r"(?:(?P<exponent>[eE][+-]?\d+)|(?P<suffix>[KMGTPE]i|[numkMGTPE]?))$"
+)
+
+# Distinct strings remembered by the parsers; clusters reuse a handful of request values
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_quantity(value):
+    """Parse a quantity string into an exact Fraction of its base unit (cores, bytes)."""
+    match = _QUANTITY.match(value.strip()) if isinstance(value, str) else None
+    if match is None or not (match["whole"] or match["fraction"]):
+        raise ValueError(f"Invalid quantity: {value!r}")
+
+    digits = match["fraction"] or ""
+    number = Fraction(int((match["whole"] or "0") + digits), 10 ** len(digits))
+    if match["sign"] == "-":
+        number = -number
+
+    if match["exponent"]:
+        return number * Fraction(10) ** int(match["exponent"][1:])
+    suffix = match["suffix"]
+    return number * BINARY_SI.get(suffix, DECIMAL_SI.get(suffix))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_cpu(value):
+    """Parse a CPU quantity (e.g. '3464u', '123456n', '250m', '2') into cores."""
+    return float(parse_quantity(value))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_memory(value):
+    """Parse a memory quantity (e.g. '256Mi', '1.5Gi', '128974848', '129M') into MiB."""
+    return float(parse_quantity(value) / MEBIBYTE)
+
+def parse_column(parse, values):
+    """Parse a whole column of quantity strings with one of the parsers above into an array of floats."""
+    return array("d", map(parse, values))
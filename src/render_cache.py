@@ -0,0 +1,160 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import make_response, request
+
+from .informer import get_informer
+from .instrumentation import registry
+from .tracing import current_trace
+
+# Pages whose data kinds all have synced informers stay valid until a resourceVersion changes
+MAX_AGE = float(os.getenv("KUBEFUN_RENDER_CACHE_MAX_AGE", "300"))
+# Fallback lifetime for pages that depend on data without a resourceVersion to compare
+TTL = float(os.getenv("KUBEFUN_RENDER_CACHE_TTL", "10"))
+SIZE = int(os.getenv("KUBEFUN_RENDER_CACHE_SIZE", "256"))
+# Streamed pages larger than this are sent without being kept, so their memory stays flat
+MAX_BODY = int(os.getenv("KUBEFUN_RENDER_CACHE_MAX_BODY", str(2 * 1024 * 1024)))
+
+
+class RenderCache:
+    """
+    LRU cache of rendered pages keyed by path and query args.
+
+    Each entry records the versions it was rendered from: the resourceVersion
+    of every kind the page reads, plus any extra version a page supplies (for
+    example the timestamp of the latest metrics sample). An entry is served
+    while those versions are unchanged and it is younger than MAX_AGE, or
+    younger than TTL when some version is unknown (no synced informer).
+    """
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, etag, mimetype, entry_versions, stored = entry
+                lifetime = TTL if None in versions else MAX_AGE
+                if entry_versions == versions and time.monotonic() - stored < lifetime:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, etag, mimetype
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, versions, body, mimetype):
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            self._entries[key] = (body, etag, mimetype, versions, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return etag
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+render_cache = RenderCache()
+
+@registry.collect(
+    "kubefun_render_cache_requests_total", "counter", "Lookups of rendered pages by result (hit or miss).", ("result",),
+)
+def _collect_render_cache():
+    yield ("hit",), render_cache.hits
+    yield ("miss",), render_cache.misses
+
+registry.collect(
+    "kubefun_render_cache_evictions_total", "counter", "Rendered pages evicted to stay within KUBEFUN_RENDER_CACHE_SIZE.",
+)(lambda: [((), render_cache.evictions)])
+registry.collect(
+    "kubefun_render_cache_entries", "gauge", "Rendered pages held in the render cache.",
+)(lambda: [((), len(render_cache))])
+
+def kind_version(kind):
+    """Return the current resourceVersion of a kind's informer, or None without a synced informer."""
+    informer = get_informer(kind)
+    return getattr(informer, "resource_version", None) if informer is not None else None
+
+def _respond(body, etag, mimetype):
+    if etag in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        response = make_response(body)
+        response.mimetype = mimetype
+    response.set_etag(etag)
+    # Browsers keep the page but revalidate it on every load, which costs a 304 when unchanged
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def _tee(chunks, key, versions, mimetype):
+    """Pass a streamed body through, storing it once it completes unless it outgrows MAX_BODY."""
+    parts = []
+    size = 0
+    try:
+        for chunk in chunks:
+            if parts is not None:
+                data = chunk.encode() if isinstance(chunk, str) else chunk
+                size += len(data)
+                if size <= MAX_BODY:
+                    parts.append(data)
+                else:
+                    parts = None
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    if parts is not None:
+        render_cache.put(key, versions, b"".join(parts), mimetype)
+
+def cached_page(*kinds, extra=None):
+    """
+    Cache a GET view's rendered body by path and query args, invalidated when
+    the resourceVersion of any of `kinds` changes (or `extra()` returns a new
+    value). Responses carry an ETag and conditional requests get 304.
+    Only 200 responses are cached; streamed ones are stored once fully sent.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            trace = current_trace()
+            if trace is not None and trace.profile is not None:
+                # A profiled request must build the page, and its output is not shared
+                return view(*args, **kwargs)
+
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            versions = tuple(kind_version(kind) for kind in kinds)
+            if extra is not None:
+                versions += (extra(),)
+
+            cached = render_cache.get(key, versions)
+            if cached is not None:
+                return _respond(*cached)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if response.is_streamed:
+                response.response = _tee(response.response, key, versions, response.mimetype)
+                return response
+            etag = render_cache.put(key, versions, response.get_data(), response.mimetype)
+            return _respond(response.get_data(), etag, response.mimetype)
+        return wrapper
+    return decorator
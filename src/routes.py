@@ -1,111 +1,214 @@
-from flask import render_template, request
-from .k8s_client import get_nodes, get_pods, get_secrets, get_services, get_deployments, get_statefulsets
-from .k8s_client import get_namespaces_with_counts, search_kubernetes_resources, get_cluster_info
-from .k8s_client import get_storage_classes, get_persistent_volumes, get_persistent_volume_claims
+import logging
+import time
+
+from flask import (
+    Response, abort, before_render_template, g, jsonify, render_template, request, send_from_directory,
+    stream_template, template_rendered, url_for,
+)
+from .k8s_client import get_nodes
+from .k8s_client import get_namespaces_with_counts, start_search, get_cluster_info, SEARCH_LIMIT
+from .k8s_client import iter_storage_classes, get_persistent_volumes, iter_pv_pvc_relationships, get_pv_claim
 from .k8s_client import get_node_details, get_namespace_details, get_deployment_details, get_pod_details, get_pod_events, get_statefulset_details
 from .k8s_client import get_service_details, get_secret_details, get_storageclass_details
-from .k8s_client import get_top_nodes, get_top_pods, get_pv_details, get_pvc_details
+from .k8s_client import get_top_nodes, get_top_pods, get_metrics_history, get_metrics_version, TOP_LIMIT, get_pv_details, get_pvc_details
+from .k8s_client import get_pods, get_secrets, get_services, get_deployments, get_statefulsets, LIVE_KINDS
+from .api_clients import pool_stats
+from .datatables import build_response
+from .detail_view import resolve_pointer, summarize
+from .instrumentation import CONTENT_TYPE, http_request_duration, registry, template_render_duration
+from .live_updates import live_hub, sse_stream
+from .profiling import PROFILE_DIR, Profile, list_profiles, profiles_available, requested_format
+from .profiling import HEADER as PROFILE_HEADER
+from .render_cache import cached_page
+from .snapshot import begin_snapshot, end_snapshot
+from .tracing import begin_trace, end_trace, perf_stats
+
+logger = logging.getLogger(__name__)
+
+# Kinds read by get_cluster_info(), shown on the welcome page and dashboard
+CLUSTER_INFO_KINDS = ("nodes", "pods", "namespaces", "deployments", "services")
+
+# Long-lived streams, left out of /debug/perf so they do not dominate it
+UNTRACED_ENDPOINTS = {"static", "live_updates"}
+
+# Row sources and columns for the DataTables server-side endpoints. The cached get_* readers
+# keep repeated draws (paging, sorting, typing in the search box) from re-listing the kind
+TABLE_SOURCES = {
+    "pods": (get_pods, ["name", "namespace", "status"]),
+    "secrets": (get_secrets, ["name", "namespace", "type"]),
+    "services": (get_services, ["name", "namespace", "type", "cluster_ip", "ports"]),
+    "deployments": (get_deployments, ["name", "namespace", "replicas", "ready_replicas"]),
+    "statefulsets": (get_statefulsets, ["name", "namespace", "replicas", "ready_replicas"]),
+}
+
+# Objects shown on details.html, by the kind used in /api/details/<kind>/<name>: (read function, namespaced)
+DETAIL_SOURCES = {
+    "node": (get_node_details, False),
+    "namespace": (get_namespace_details, False),
+    "pv": (get_pv_details, False),
+    "pvc": (get_pvc_details, True),
+}
 
 def init_routes(app):
     """Register all routes for the Flask app."""
 
+    @app.before_request
+    def bind_snapshot():
+        # Every kind is fetched at most once per request, shared across k8s_client calls
+        g.snapshot_token = begin_snapshot()
+        # Every Kubernetes API call made for the request is recorded on its trace
+        g.trace, g.trace_token = begin_trace(request.endpoint or "unmatched", request.full_path.rstrip("?"))
+        # Opt-in profiling (KUBEFUN_PROFILING=true) with ?profile=collapsed|pstats or the X-Kubefun-Profile header
+        profile_format = requested_format(request.args, request.headers)
+        if profile_format is not None and g.trace.endpoint not in UNTRACED_ENDPOINTS:
+            try:
+                g.trace.profile = Profile(profile_format, g.trace, g.trace.endpoint).start()
+            except RuntimeError as e:
+                return jsonify({"error": str(e)}), 409
+
+    @app.after_request
+    def add_server_timing(response):
+        # Streamed bodies are rendered after this point; /debug/perf has their full totals
+        trace = g.get("trace")
+        if trace is not None:
+            response.headers["Server-Timing"] = trace.server_timing()
+            if trace.profile is not None:
+                # Written once the response, including a streamed body, is complete
+                response.headers[PROFILE_HEADER] = url_for('profile_file', name=trace.profile.name)
+        g.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def release_snapshot(exc):
+        token = g.pop("snapshot_token", None)
+        if token is not None:
+            end_snapshot(token)
+        trace = g.pop("trace", None)
+        if trace is not None:
+            end_trace(g.pop("trace_token"))
+            duration_ms = trace.finish()
+            if trace.profile is not None:
+                try:
+                    trace.profile.stop()
+                except OSError as e:
+                    logger.error(f"Failed to write profile {trace.profile.name}: {e}")
+            if trace.endpoint not in UNTRACED_ENDPOINTS:
+                perf_stats.add(trace)
+                status = g.pop("status", 500 if exc is not None else None)
+                http_request_duration.observe(duration_ms / 1000, trace.endpoint, request.method, str(status))
+
+    def start_render(sender, template, context, **extra):
+        # Streamed templates signal template_rendered once their last chunk is produced
+        g.setdefault("render_started", {})[template.name] = time.perf_counter()
+
+    def finish_render(sender, template, context, **extra):
+        started = g.get("render_started", {}).pop(template.name, None)
+        if started is not None:
+            template_render_duration.observe(time.perf_counter() - started, template.name)
+
+    # The handlers are local functions, so the signals must hold strong references to them
+    before_render_template.connect(start_render, app, weak=False)
+    template_rendered.connect(finish_render, app, weak=False)
+
     @app.route('/')
+    @cached_page(*CLUSTER_INFO_KINDS)
     def welcome():
         cluster_info = get_cluster_info()
         return render_template("welcome.html", cluster_info=cluster_info)
     
     @app.route('/dashboard')
+    @cached_page(*CLUSTER_INFO_KINDS)
     def dashboard():
         cluster_info = get_cluster_info()
 
         return render_template("dashboard.html", cluster_info=cluster_info)
     
     @app.route('/nodes')
+    @cached_page("nodes", extra=lambda: get_metrics_version("nodes"))
     def nodes():
         nodes = get_nodes()
-        top_nodes = get_top_nodes()
+        top_nodes = get_top_nodes(limit=TOP_LIMIT)
         # Handle errors if metrics fetch fails
         if isinstance(top_nodes, dict) and "error" in top_nodes:
             return f"Error fetching node metrics: {top_nodes['error']}", 500
         return render_template('nodes.html', nodes=nodes, top_nodes=top_nodes)
     
     @app.route('/namespaces')
+    @cached_page("namespaces", "pods", "deployments", "services", "secrets")
     def namespaces():
         namespaces = get_namespaces_with_counts()
         return render_template('namespaces.html', namespaces=namespaces)
 
     @app.route('/deployments')
+    @cached_page()
     def deployments():
         """Display deployments, optionally filtered by namespace."""
         namespace = request.args.get('namespace')  
-        deployments = get_deployments(namespace)
-        statefulsets = get_statefulsets(namespace)
-
-        return render_template('deployments.html', deployments=deployments, statefulsets=statefulsets, namespace=namespace)
+        # Rows are fetched page by page from /api/deployments and /api/statefulsets
+        return render_template('deployments.html', namespace=namespace)
 
     @app.route('/pods')
+    @cached_page(extra=lambda: get_metrics_version("pods"))
     def pods():
         """Display Pods, optionally filtered by namespace."""
         namespace = request.args.get('namespace')  
-        pods = get_pods(namespace)  
-        top_pods = get_top_pods()
+        # Pod rows are fetched page by page from /api/pods
+        top_pods = get_top_pods(namespace, limit=TOP_LIMIT)
         if isinstance(top_pods, dict) and "error" in top_pods:
             return f"Error fetching pod metrics: {top_pods['error']}", 500
-        return render_template("pods.html", pods=pods, namespace=namespace, top_pods=top_pods)
+        return render_template("pods.html", namespace=namespace, top_pods=top_pods)
 
     @app.route('/search')
     def search():
         query = request.args.get('query', '').strip()
-        results = []
-
-        if query:
-            results = search_kubernetes_resources(query)
+        # Per-kind searches run concurrently; rows stream out as each kind completes
+        limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+        results = start_search(query, limit) if query else []
 
         cluster_info = get_cluster_info()
-        return render_template("welcome.html", results=results, query=query, cluster_info=cluster_info)
+        return stream_template("welcome.html", results=results, query=query, cluster_info=cluster_info)
 
     @app.route('/volumes')
+    @cached_page("persistent_volumes", "persistent_volume_claims", "storage_classes")
     def volumes():
-        """Render the volumes page with updated data."""
-        # Fetch the data
-        storage_classes = get_storage_classes()
+        """Render the volumes page, streaming rows as they are read."""
         persistent_volumes = get_persistent_volumes()
-        persistent_volume_claims = get_persistent_volume_claims()
-
-        # Prepare data for relationships (if required)
-        pv_pvc_relationships = []
-        for pvc in persistent_volume_claims:
-            matched_pv = next(
-                (pv for pv in persistent_volumes if pv["name"] == pvc["volume_name"]),
-                None
-            )
-            pv_pvc_relationships.append({
-                "PVC": pvc,
-                "PV": matched_pv
-            })
+        # Claims are joined to volumes while the PVC table renders, one LIST page of claims at a time
+        pv_pvc_relationships = (
+            {"PVC": pvc, "PV": pv}
+            for pvc, pv in iter_pv_pvc_relationships(persistent_volumes)
+        )
 
-        return render_template(
+        return stream_template(
             'volumes.html',
-            storage_classes=storage_classes,
+            storage_classes=iter_storage_classes(),
             persistent_volumes=persistent_volumes,
-            persistent_volume_claims=persistent_volume_claims,
             pv_pvc_relationships=pv_pvc_relationships
         )
 
-
     @app.route('/node/<node_name>')
+    @cached_page("nodes")
     def node_detail(node_name):
         """Route to display details of a specific node."""
         node_details = get_node_details(node_name)
-        return render_template('details.html', resource_name=node_name, resource_type="Node", details=node_details)
+        return render_template(
+            'details.html', resource_name=node_name, resource_type="Node",
+            tree=summarize(node_details), subtree_url=url_for('detail_subtree', kind="node", name=node_name),
+        )
 
     @app.route('/namespace/<namespace_name>')
+    @cached_page("namespaces")
     def namespace_detail(namespace_name):
         """Route to display details of a specific namespace."""
         namespace_details = get_namespace_details(namespace_name)
-        return render_template('details.html', resource_name=namespace_name, resource_type="Namespace", details=namespace_details)
+        return render_template(
+            'details.html', resource_name=namespace_name, resource_type="Namespace",
+            tree=summarize(namespace_details),
+            subtree_url=url_for('detail_subtree', kind="namespace", name=namespace_name),
+        )
 
     @app.route("/deployment/<namespace>/<deployment_name>")
+    @cached_page("deployments")
     def deployment_details(namespace, deployment_name):
         """Render deployment details."""
         details = get_deployment_details(namespace, deployment_name)
@@ -114,11 +217,13 @@ def init_routes(app):
         return render_template("deployment_details.html", deployment=details)
     
     @app.route('/statefulset/<namespace>/<name>')
+    @cached_page("stateful_sets")
     def statefulset_details(namespace, name):
         details = get_statefulset_details(namespace, name)
         return render_template('statefulset_details.html', statefulset=details)
     
     @app.route("/statefulsets/<namespace>/<stateful_name>")
+    @cached_page("stateful_sets")
     def stateful_details(namespace, stateful_name):
         """Render deployment details."""
         details = get_statefulset_details(namespace, stateful_name)
@@ -127,6 +232,8 @@ def init_routes(app):
         return render_template("deployment_details.html", deployment=details)
 
     @app.route("/pod/<namespace>/<pod_name>")
+    # Events have no informer, so pod pages fall back to the TTL
+    @cached_page("pods", "events")
     def pod_details(namespace, pod_name):
         """Render pod details."""
         details = get_pod_details(namespace, pod_name)
@@ -136,20 +243,23 @@ def init_routes(app):
         return render_template("pod_details.html", pod=details, events=events)
 
     @app.route('/services')
+    @cached_page()
     def services():
         """Display Services, optionally filtered by namespace."""
         namespace = request.args.get('namespace')  
-        services_list = get_services(namespace)
-        return render_template("services.html", services=services_list, namespace=namespace)
+        # Service rows are fetched page by page from /api/services
+        return render_template("services.html", namespace=namespace)
 
     @app.route('/secrets')
+    @cached_page()
     def secrets():
         """Display Secrets, optionally filtered by namespace."""
         namespace = request.args.get('namespace')  
-        secrets_list = get_secrets(namespace)
-        return render_template("secrets.html", secrets=secrets_list, namespace=namespace)
+        # Secret rows are fetched page by page from /api/secrets
+        return render_template("secrets.html", namespace=namespace)
     
     @app.route("/service/<namespace>/<service_name>")
+    @cached_page("services")
     def service_details(namespace, service_name):
         """Render service details."""
         details = get_service_details(namespace, service_name)
@@ -158,6 +268,7 @@ def init_routes(app):
         return render_template("service_details.html", service=details)
     
     @app.route("/secret/<namespace>/<secret_name>")
+    @cached_page("secrets")
     def secret_details(namespace, secret_name):
         """Render secret details."""
         details = get_secret_details(namespace, secret_name)
@@ -166,6 +277,7 @@ def init_routes(app):
         return render_template("secret_details.html", secret=details)
     
     @app.route("/storageclass/<storageclass_name>")
+    @cached_page("storage_classes")
     def storageclass_details(storageclass_name):
         """Render storageclass details."""
         details = get_storageclass_details(storageclass_name)
@@ -174,17 +286,21 @@ def init_routes(app):
         return render_template("storageclass_details.html", storageclass=details)
 
     @app.route('/pv/<name>')
+    @cached_page("persistent_volumes", "persistent_volume_claims", "pods")
     def pv_details(name):
-        """Display details of a specific Persistent Volume."""
+        """Display details of a specific Persistent Volume, with its claim and the pods using it."""
         details = get_pv_details(name)
         return render_template(
             'details.html',
             resource_type="Persistent Volume",
             resource_name=name,
-            details=details
+            tree=summarize(details),
+            subtree_url=url_for('detail_subtree', kind="pv", name=name),
+            volume_claim=None if "error" in details else get_pv_claim(details),
         )
     
     @app.route('/pvc/<namespace>/<name>')
+    @cached_page("persistent_volumes", "persistent_volume_claims")
     def pvc_details(namespace, name):
         """Display details of a specific Persistent Volume Claim."""
         details = get_pvc_details(namespace, name)
@@ -192,10 +308,135 @@ def init_routes(app):
             'details.html',
             resource_type="Persistent Volume Claim",
             resource_name=f"{namespace}/{name}",
-            details=details
+            tree=summarize(details),
+            subtree_url=url_for('detail_subtree', kind="pvc", name=name, namespace=namespace),
+        )
+
+    @app.route('/api/<kind>')
+    def table_data(kind):
+        """Serve one page of a list view using the DataTables server-side protocol."""
+        if kind not in TABLE_SOURCES:
+            abort(404)
+        rows, columns = TABLE_SOURCES[kind]
+        namespace = request.args.get('namespace') or None
+        return jsonify(build_response(rows(namespace), request.args, columns))
+
+    @app.route('/api/details/<kind>/<name>')
+    def detail_subtree(kind, name):
+        """
+        One member of a detail page's object, addressed by a JSON pointer (?pointer=/status/images).
+        Returns its summary as JSON, its members rendered for details.html with ?format=html,
+        or the value itself with ?raw=1. Namespaced kinds take ?namespace=.
+        """
+        if kind not in DETAIL_SOURCES:
+            abort(404)
+        read, namespaced = DETAIL_SOURCES[kind]
+        if namespaced:
+            namespace = request.args.get('namespace')
+            if not namespace:
+                return jsonify({"error": f"{kind} details need a namespace."}), 400
+            details = read(namespace, name)
+        else:
+            details = read(name)
+        if "error" in details:
+            return jsonify(details), 404
+
+        pointer = request.args.get('pointer', '')
+        try:
+            if request.args.get('raw'):
+                return jsonify(resolve_pointer(details, pointer))
+            node = summarize(details, pointer)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        if request.args.get('format') == 'html':
+            return render_template("json_tree.html", node=node)
+        return jsonify(node)
+
+    @app.route('/api/live')
+    def live_updates():
+        """
+        Server-Sent Events stream of row changes (?kind=pods&kind=services&namespace=x&name=y).
+        Events are "added", "modified" and "deleted" with {"kind", "row"} data, plus
+        the full "object" when a name is given, and "reset" when the page must reload.
+        """
+        kinds = request.args.getlist('kind')
+        unknown = [kind for kind in kinds if kind not in LIVE_KINDS]
+        if not kinds or unknown:
+            return jsonify({"error": f"Unknown live kinds: {', '.join(unknown) or 'none given'}"}), 404
+        if not live_hub.enabled:
+            return jsonify({"error": "Live updates need informers (KUBEFUN_INFORMERS=true)."}), 503
+        subscription = live_hub.subscribe(kinds, request.args.get('namespace') or None, request.args.get('name') or None)
+        if subscription is None:
+            return jsonify({"error": "Too many live update streams; reload the page to see changes."}), 503
+        response = Response(sse_stream(live_hub, subscription), mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        # Reverse proxies such as nginx would otherwise buffer the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    @app.route('/api/pods/<namespace>/<pod_name>/events')
+    def pod_events(namespace, pod_name):
+        """Events of one pod, re-read by the pod page when a live update arrives."""
+        return jsonify(get_pod_events(namespace, pod_name))
+
+    @app.route('/api/metrics/nodes/<name>')
+    def node_metrics_history(name):
+        """p50/p95/max and sparkline series of a node's sampled usage (?window=seconds&points=n)."""
+        history = get_metrics_history(
+            "nodes", name,
+            window=request.args.get('window', 3600, type=int),
+            points=request.args.get('points', 60, type=int),
         )
+        if "error" in history:
+            return jsonify(history), 404
+        return jsonify(history)
+
+    @app.route('/api/metrics/pods/<namespace>/<name>')
+    def pod_metrics_history(namespace, name):
+        """p50/p95/max and sparkline series of a pod's sampled usage (?window=seconds&points=n)."""
+        history = get_metrics_history(
+            "pods", name, namespace,
+            window=request.args.get('window', 3600, type=int),
+            points=request.args.get('points', 60, type=int),
+        )
+        if "error" in history:
+            return jsonify(history), 404
+        return jsonify(history)
+
+    @app.route('/debug/pool')
+    def api_pool():
+        """Connection pool statistics of the shared Kubernetes ApiClient."""
+        return jsonify(pool_stats())
+
+    @app.route('/metrics')
+    def metrics():
+        """kubefun's own metrics in the Prometheus text format."""
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    @app.route('/debug/perf')
+    def debug_perf():
+        """Slowest routes, Kubernetes API calls and requests since the process started (?format=json)."""
+        report = perf_stats.report()
+        if request.args.get('format') == 'json':
+            return jsonify(report)
+        return render_template("debug_perf.html", report=report)
+
+    @app.route('/debug/profiles')
+    def profiles():
+        """Profiles written by profiled requests and continuous sampling, newest first."""
+        if not profiles_available():
+            abort(404)
+        return jsonify(list_profiles())
+
+    @app.route('/debug/profiles/<name>')
+    def profile_file(name):
+        """Download one profile (collapsed stacks as text, pstats as binary)."""
+        if not profiles_available():
+            abort(404)
+        return send_from_directory(PROFILE_DIR, name, as_attachment=name.endswith(".pstats"))
 
     @app.route('/about')
+    @cached_page()
     def about():
         return render_template("about.html")
     
\ No newline at end of file
@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from kubernetes import client
+
+from .kube_json import CallLimits, call_limits
+from .snapshot import current_snapshot
+from .tracing import in_request_context
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool shared by all searches; each kind runs as one task
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("KUBEFUN_SEARCH_WORKERS", "16")),
+    thread_name_prefix="search",
+)
+
+SEARCH_TIMEOUT = float(os.getenv("KUBEFUN_SEARCH_TIMEOUT", "10"))
+
+
+class _KindTask:
+    """One kind of a SearchRun: its call limits and when its task started running."""
+
+    def __init__(self, kind, limits):
+        self.kind = kind
+        self.limits = limits
+        self.started = None
+
+    def deadline(self, timeout):
+        return None if self.started is None else self.started + timeout
+
+
+class SearchRun:
+    """
+    Concurrent fan-out of one query over several per-kind search functions.
+
+    Iterating yields one batch per kind, in completion order, as
+    {"kind": ..., "results": [...], "error": None | str}. Kinds that fail,
+    are forbidden or exceed the timeout produce an empty batch with an error,
+    so callers always get partial results instead of an exception.
+
+    Each kind gets `timeout` seconds from when its task starts running, and
+    every API call it makes is bounded by the same timeout. A kind that
+    times out is cancelled: its task stops at its next API call. When the
+    run ends, or its consumer goes away, the fetches it prefetched stop too.
+    """
+
+    def __init__(self, query, searches, timeout=SEARCH_TIMEOUT, prefetch=()):
+        self.query = query
+        self.timeout = timeout
+        self.errors = {}
+        self._started = time.monotonic()
+        # Parent of every kind's limits; also bounds the prefetched LISTs shared by several kinds
+        self.limits = CallLimits(timeout)
+        self._tasks = {}
+        with call_limits(self.limits):
+            snapshot = current_snapshot()
+            if prefetch and snapshot is not None:
+                # Start every LIST the searches need at once, each fetched once for all of them
+                snapshot.prefetch(*prefetch)
+            # Each task runs in a copy of the caller's context so it shares the request snapshot
+            for kind, search_fn in searches:
+                task = _KindTask(kind, CallLimits(timeout, parent=self.limits))
+                future = _executor.submit(in_request_context(self._run_kind), task, search_fn, query)
+                self._tasks[future] = task
+
+    @staticmethod
+    def _run_kind(task, search_fn, query):
+        task.started = time.monotonic()
+        with call_limits(task.limits):
+            return search_fn(query)
+
+    def _batch(self, kind, results=None, error=None):
+        if error:
+            self.errors[kind] = error
+            logger.warning(f"Search for '{self.query}' in {kind}: {error}")
+        return {"kind": kind, "results": results or [], "error": error}
+
+    def _result_batch(self, future):
+        kind = self._tasks[future].kind
+        try:
+            return self._batch(kind, future.result())
+        except client.exceptions.ApiException as e:
+            reason = "forbidden" if e.status == 403 else f"{e.status} {e.reason}"
+            return self._batch(kind, error=reason)
+        except Exception as e:
+            return self._batch(kind, error=str(e) or type(e).__name__)
+
+    def __iter__(self):
+        pending = set(self._tasks)
+        try:
+            while pending:
+                now = time.monotonic()
+                deadlines = {future: self._tasks[future].deadline(self.timeout) for future in pending}
+                for future, deadline in deadlines.items():
+                    if deadline is not None and deadline <= now:
+                        pending.discard(future)
+                        self._tasks[future].limits.cancel()
+                        yield self._batch(self._tasks[future].kind, error=f"timed out after {self.timeout:g}s")
+                running = [deadline for future, deadline in deadlines.items() if future in pending and deadline]
+                # Kinds still queued behind other searches get their time once they start
+                wait_for = max(0.0, min(running) - now) if running else self.timeout
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield self._result_batch(future)
+        finally:
+            # Nobody waits for the remaining kinds (or the prefetched LISTs) any more
+            for future in pending:
+                future.cancel()
+            self.limits.cancel()
+
+        elapsed = time.monotonic() - self._started
+        logger.info(f"Search for '{self.query}' finished in {elapsed:.2f}s with {len(self.errors)} incomplete kinds.")
@@ -0,0 +1,150 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+def _normalize_kind(kind):
+    return kind.replace(" ", "").lower()
+
+def parse_query(query):
+    """
+    Split a search query into (terms, qualifiers).
+
+    Supported syntax:
+      ns:<namespace>   only objects in that namespace
+      kind:<kind>      only that resource type, e.g. kind:pod, kind:clusterrolebinding
+      foo*             prefix match on the object name
+      foo              substring match on name, namespace and kind-specific fields
+    """
+    terms, qualifiers = [], {}
+    for token in query.lower().split():
+        key, sep, value = token.partition(":")
+        if sep and key in ("ns", "kind") and value:
+            qualifiers[key] = _normalize_kind(value) if key == "kind" else value
+        else:
+            terms.append(token)
+    return terms, qualifiers
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the rows returned by global search.
+
+    Each document is one object row, keyed by (kind, namespace, name), with
+    n-gram postings over its lowercased searchable fields. Substring queries
+    intersect the postings of the query's n-grams and verify only those
+    candidates, so their cost follows the number of matches rather than the
+    number of objects in the cluster. Documents are updated incrementally via
+    update()/remove(), normally fed from informer watch events.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._postings = {}
+        self._by_kind = {}
+        self._by_namespace = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def update(self, kind, row, fields):
+        """Insert or replace the row of one object; fields are the searchable strings."""
+        key = (kind, row.get("namespace"), row["name"])
+        fields = tuple(field.lower() for field in fields if field)
+        with self._lock:
+            old = self._docs.get(key)
+            if old is not None:
+                if old[1] == fields:
+                    self._docs[key] = (row, fields)
+                    return
+                self._unindex(key, old[1])
+            self._docs[key] = (row, fields)
+            for gram in set().union(*map(_ngrams, fields)):
+                self._postings.setdefault(gram, set()).add(key)
+            self._by_kind.setdefault(_normalize_kind(kind), set()).add(key)
+            if key[1]:
+                self._by_namespace.setdefault(key[1].lower(), set()).add(key)
+
+    def remove(self, kind, name, namespace=None):
+        key = (kind, namespace, name)
+        with self._lock:
+            old = self._docs.pop(key, None)
+            if old is not None:
+                self._unindex(key, old[1])
+
+    def _unindex(self, key, fields):
+        for gram in set().union(*map(_ngrams, fields)):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+        self._discard(self._by_kind, _normalize_kind(key[0]), key)
+        if key[1]:
+            self._discard(self._by_namespace, key[1].lower(), key)
+
+    @staticmethod
+    def _discard(index, value, key):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+    def _candidates(self, terms, qualifiers):
+        """Return the smallest known superset of matching keys, or None for 'all documents'."""
+        sets = []
+        if "kind" in qualifiers:
+            sets.append(self._by_kind.get(qualifiers["kind"], set()))
+        if "ns" in qualifiers:
+            sets.append(self._by_namespace.get(qualifiers["ns"], set()))
+        for term in terms:
+            for gram in _ngrams(term.rstrip("*")):
+                sets.append(self._postings.get(gram, set()))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for other in sets[1:]:
+            if not candidates:
+                break
+            candidates &= other
+        return candidates
+
+    @staticmethod
+    def _matches(key, fields, terms):
+        for term in terms:
+            if term.endswith("*"):
+                if not key[2].lower().startswith(term[:-1]):
+                    return False
+            elif not any(term in field for field in fields):
+                return False
+        return True
+
+    @staticmethod
+    def _order(key):
+        kind, namespace, name = key
+        return kind, namespace or "", name
+
+    def search(self, query, limit=None):
+        """
+        Return rows matching every term and qualifier of the query, up to limit
+        rows, ordered by kind, namespace and name so repeated queries list them
+        the same way.
+        """
+        terms, qualifiers = parse_query(query)
+        with self._lock:
+            candidates = self._candidates(terms, qualifiers)
+            keys = self._docs.keys() if candidates is None else candidates
+            matches = [key for key in keys if self._matches(key, self._docs[key][1], terms)]
+            matches.sort(key=self._order)
+            if limit:
+                matches = matches[:limit]
+            return [self._docs[key][0] for key in matches]
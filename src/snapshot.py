@@ -0,0 +1,121 @@
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .informer import get_informer, iter_resource, list_resource
+from .kube_json import namespace_of
+from .tracing import in_request_context
+
+# Shared pool for apiserver fetches issued on behalf of request snapshots
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("KUBEFUN_FETCH_WORKERS", "8")),
+    thread_name_prefix="snapshot-fetch",
+)
+
+_current_snapshot = contextvars.ContextVar("kubefun_snapshot", default=None)
+
+
+class ClusterSnapshot:
+    """
+    Per-request fetch plan: every resource kind is fetched at most once,
+    fetches run concurrently on a shared pool, and counts are served from the
+    informer store or a limit=1 LIST instead of materialising whole lists.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, cache, key, fn, *args):
+        with self._lock:
+            future = cache.get(key)
+            if future is None:
+                # Fetches run in a copy of the caller's context so their API calls join the request trace
+                future = _executor.submit(in_request_context(fn), *args)
+                cache[key] = future
+            return future
+
+    def _has_items(self, kind, namespace=None):
+        with self._lock:
+            return (kind, namespace) in self._items or (kind, None) in self._items
+
+    def planned(self, kind, namespace=None):
+        """True when a kind has been prefetched or fetched, so reading it costs no extra LIST."""
+        return self._has_items(kind, namespace)
+
+    def prefetch(self, *kinds, namespace=None):
+        """Start fetching the given kinds in the background."""
+        for kind in kinds:
+            if get_informer(kind) is None and not self._has_items(kind, namespace):
+                self._submit(self._items, (kind, namespace), _fetch_items, kind, namespace)
+
+    def prefetch_counts(self, *kinds):
+        """Start counting the given kinds in the background."""
+        for kind in kinds:
+            if get_informer(kind) is None and not self._has_items(kind):
+                self._submit(self._counts, kind, _fetch_count, kind)
+
+    def items(self, kind, namespace=None):
+        """Return the objects of a kind, fetching them once per snapshot."""
+        informer = get_informer(kind)
+        if informer is not None:
+            return informer.list(namespace)
+
+        with self._lock:
+            cluster_wide = self._items.get((kind, None))
+        if namespace and cluster_wide is not None:
+            return [obj for obj in cluster_wide.result() if namespace_of(obj) == namespace]
+        return self._submit(self._items, (kind, namespace), _fetch_items, kind, namespace).result()
+
+    def count(self, kind):
+        """Return the number of objects of a kind without listing it when avoidable."""
+        informer = get_informer(kind)
+        if informer is not None:
+            return len(informer)
+        if self._has_items(kind):
+            return len(self.items(kind))
+
+        count = self._submit(self._counts, kind, _fetch_count, kind).result()
+        if count is None:
+            return len(self.items(kind))
+        return count
+
+
+def _fetch_items(kind, namespace=None):
+    return list(iter_resource(kind, namespace))
+
+def _fetch_count(kind):
+    """Count a kind with a limit=1 LIST; None when the apiserver gives no remaining count."""
+    result = list_resource(kind, limit=1)
+    metadata = result["metadata"]
+    remaining = metadata.get("remainingItemCount")
+    if remaining is None:
+        return None if metadata.get("continue") else len(result["items"])
+    return len(result["items"]) + remaining
+
+def current_snapshot():
+    """Return the snapshot bound to the current request, if any."""
+    return _current_snapshot.get()
+
+def begin_snapshot():
+    """Bind a fresh snapshot to the current context and return its reset token."""
+    return _current_snapshot.set(ClusterSnapshot())
+
+def end_snapshot(token):
+    _current_snapshot.reset(token)
+
+def with_snapshot(func):
+    """Run func inside a snapshot, binding a fresh one if none is active."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_snapshot() is not None:
+            return func(*args, **kwargs)
+        token = begin_snapshot()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end_snapshot(token)
+    return wrapper
@@ -0,0 +1,139 @@
+import logging
+import math
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+
+class TimeSeriesStore:
+    """
+    Fixed-size ring buffer of CPU and memory samples for a set of series
+    (one per node or pod).
+
+    All series share one timeline of sample timestamps, and each series holds
+    two float32 columns with one slot per sample, so memory is bounded by
+    series x capacity x 8 bytes. Series that disappear from a sample
+    (deleted pods, removed nodes) are dropped.
+    """
+
+    COLUMNS = ("cpu", "memory")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._series = {}
+        self._ticks = 0
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def record(self, timestamp, table):
+        """Append one MetricsTable sample; rows are keyed by (namespace, name)."""
+        slot = self._ticks % self.capacity
+        seen = set()
+        with self._lock:
+            self._times[slot] = timestamp
+            for i, name in enumerate(table.names):
+                key = (table.namespaces[i], name)
+                columns = self._series.get(key)
+                if columns is None:
+                    columns = self._series[key] = tuple(array("f", [NAN]) * self.capacity for _ in self.COLUMNS)
+                columns[0][slot] = table.cpu[i]
+                columns[1][slot] = table.memory[i]
+                seen.add(key)
+            for key in [key for key in self._series if key not in seen]:
+                del self._series[key]
+            self._ticks += 1
+            self._latest = (timestamp, table)
+
+    def latest(self):
+        """Return (timestamp, MetricsTable) of the most recent sample, or None."""
+        return self._latest
+
+    def window(self, key, seconds, now=None):
+        """Return (times, cpu, memory) lists for one series over the last `seconds`, oldest first."""
+        now = time.time() if now is None else now
+        cutoff = now - seconds
+        with self._lock:
+            columns = self._series.get(key)
+            if columns is None:
+                return None
+            count = min(self._ticks, self.capacity)
+            start = self._ticks - count
+            times, cpu, memory = [], [], []
+            for tick in range(start, self._ticks):
+                slot = tick % self.capacity
+                if self._times[slot] < cutoff or math.isnan(columns[0][slot]):
+                    continue
+                times.append(self._times[slot])
+                # Round away float32 noise (0.01 is stored as 0.0099999997)
+                cpu.append(round(columns[0][slot], 6))
+                memory.append(round(columns[1][slot], 6))
+        return times, cpu, memory
+
+    def __len__(self):
+        return len(self._series)
+
+
+def summarize(values):
+    """Return p50, p95 and max of a list of samples (nearest-rank percentiles)."""
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(values)
+
+    def percentile(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {"p50": percentile(50), "p95": percentile(95), "max": ordered[-1]}
+
+def sparkline(values, points):
+    """Downsample a list of samples to at most `points` bucket means."""
+    if len(values) <= points:
+        return list(values)
+    size = len(values) / points
+    return [
+        sum(bucket) / len(bucket)
+        for bucket in (values[int(i * size):int((i + 1) * size)] for i in range(points))
+    ]
+
+
+class MetricsSampler:
+    """
+    Poll metrics sources on a background thread into one TimeSeriesStore each.
+
+    `sources` maps a name ("nodes", "pods") to a callable returning a
+    MetricsTable; a failing source is logged and retried on the next tick.
+    """
+
+    def __init__(self, sources, interval, capacity):
+        self.interval = interval
+        self.sources = sources
+        self.stores = {name: TimeSeriesStore(capacity) for name in sources}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def sample(self):
+        for name, fetch in self.sources.items():
+            try:
+                self.stores[name].record(time.time(), fetch())
+            except Exception as e:
+                logger.error(f"Failed to sample {name} metrics: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            self.sample()
+            self._stopped.wait(max(0, self.interval - (time.monotonic() - started)))
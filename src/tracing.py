@@ -0,0 +1,306 @@
+"""
+Per-request tracing of Kubernetes API calls.
+
+Every call made through kube_json.call_json() is recorded on the trace bound
+to the current Flask request: verb, resource, namespace, response bytes,
+JSON decoding time and wall time. Work fanned out to thread pools is wrapped
+with in_request_context(), so its calls land on the same trace and the
+threads working for a request are known (see profiling.py).
+
+Finished requests are folded into PerfStats, which keeps per-route and
+per-call totals plus the slowest requests with their call breakdown, shown
+on /debug/perf.
+"""
+import contextvars
+import heapq
+import os
+import threading
+import time
+from collections import deque
+
+# Per-call entries written to the Server-Timing header; the totals are always sent
+HEADER_CALLS = int(os.getenv("KUBEFUN_TRACE_HEADER_CALLS", "20"))
+# Slowest requests kept, with their calls, for /debug/perf
+SLOWEST = int(os.getenv("KUBEFUN_PERF_SLOWEST", "20"))
+# Recent durations kept per route for the percentiles on /debug/perf
+WINDOW = 500
+
+_current_trace = contextvars.ContextVar("kubefun_trace", default=None)
+_observers = []
+
+
+def describe_call(api_fn, args, kwargs):
+    """
+    Return (verb, resource, namespace) for a kubernetes client method call,
+    e.g. list_namespaced_pod(ns) -> ("LIST", "pod", ns).
+    """
+    name = getattr(api_fn, "__name__", str(api_fn))
+    verb, _, resource = name.partition("_")
+    verb = "GET" if verb == "read" else verb.upper()
+    namespaced = resource.startswith("namespaced_")
+    resource = resource.removeprefix("namespaced_").removesuffix("_for_all_namespaces")
+    if resource.endswith("custom_object"):
+        resource = f"{kwargs.get('plural')}.{kwargs.get('group')}"
+    namespace = kwargs.get("namespace")
+    if namespace is None and namespaced and args:
+        namespace = args[0]
+    return verb, resource, namespace
+
+
+class ApiCall:
+    """One Kubernetes API call as seen by a request."""
+
+    __slots__ = ("verb", "resource", "namespace", "bytes", "decode_ms", "wall_ms", "error")
+
+    def __init__(self, verb, resource, namespace, nbytes, decode_ms, wall_ms, error=None):
+        self.verb = verb
+        self.resource = resource
+        self.namespace = namespace
+        self.bytes = nbytes
+        self.decode_ms = decode_ms
+        self.wall_ms = wall_ms
+        self.error = error
+
+    @property
+    def key(self):
+        return f"{self.verb} {self.resource}"
+
+    def to_dict(self):
+        return {
+            "verb": self.verb,
+            "resource": self.resource,
+            "namespace": self.namespace,
+            "bytes": self.bytes,
+            "decode_ms": round(self.decode_ms, 3),
+            "wall_ms": round(self.wall_ms, 3),
+            "error": self.error,
+        }
+
+
+class RequestTrace:
+    """The API calls of one request, appended to from any thread working on it."""
+
+    def __init__(self, endpoint=None, path=None):
+        self.endpoint = endpoint
+        self.path = path
+        self.calls = []
+        self.duration_ms = None
+        # Idents of the threads currently working for the request, starting with its own
+        self.threads = {threading.get_ident()}
+        # A profiling.Profile when the request is profiled
+        self.profile = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, call):
+        with self._lock:
+            self.calls.append(call)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._started) * 1000
+
+    def finish(self):
+        self.duration_ms = self.elapsed_ms()
+        return self.duration_ms
+
+    def totals(self):
+        with self._lock:
+            calls = list(self.calls)
+        return {
+            "calls": len(calls),
+            "bytes": sum(call.bytes for call in calls),
+            "api_ms": sum(call.wall_ms for call in calls),
+            "decode_ms": sum(call.decode_ms for call in calls),
+        }
+
+    def server_timing(self, max_calls=HEADER_CALLS):
+        """Render the trace as a Server-Timing header value (shown by browser dev tools)."""
+        totals = self.totals()
+        entries = [
+            f'app;dur={self.elapsed_ms():.1f}',
+            f'api;dur={totals["api_ms"]:.1f};desc="{totals["calls"]} calls, {totals["bytes"]} bytes"',
+            f'decode;dur={totals["decode_ms"]:.1f}',
+        ]
+        with self._lock:
+            calls = list(self.calls)
+        for index, call in enumerate(calls[:max_calls]):
+            desc = " ".join(part for part in (call.key, call.namespace, f"{call.bytes}B") if part)
+            entries.append(f'api-{index};dur={call.wall_ms:.1f};desc="{desc}"')
+        return ", ".join(entries)
+
+    def to_dict(self):
+        totals = self.totals()
+        return {
+            "endpoint": self.endpoint,
+            "path": self.path,
+            "duration_ms": round(self.duration_ms or self.elapsed_ms(), 3),
+            "calls": len(self.calls),
+            "bytes": totals["bytes"],
+            "api_ms": round(totals["api_ms"], 3),
+            "decode_ms": round(totals["decode_ms"], 3),
+            "breakdown": [call.to_dict() for call in self.calls],
+        }
+
+
+class _Totals:
+    """Running count, sum and maximum of one series, plus a window of recent values."""
+
+    def __init__(self, window=0):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window) if window else None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if self.recent is not None:
+            self.recent.append(value)
+
+    def percentile(self, fraction):
+        samples = sorted(self.recent or ())
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class PerfStats:
+    """Aggregate finished request traces per route and API calls per verb and resource."""
+
+    def __init__(self, slowest=SLOWEST):
+        self.slowest_size = slowest
+        self._routes = {}
+        self._calls = {}
+        self._slowest = []
+        self._sequence = 0
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        totals = trace.totals()
+        with self._lock:
+            route = self._routes.get(trace.endpoint)
+            if route is None:
+                route = self._routes[trace.endpoint] = {
+                    "duration": _Totals(WINDOW), "api": _Totals(), "calls": 0, "bytes": 0,
+                }
+            route["duration"].add(trace.duration_ms)
+            route["api"].add(totals["api_ms"])
+            route["calls"] += totals["calls"]
+            route["bytes"] += totals["bytes"]
+
+            for call in trace.calls:
+                stats = self._calls.get(call.key)
+                if stats is None:
+                    stats = self._calls[call.key] = {"wall": _Totals(), "decode": _Totals(), "bytes": 0, "errors": 0}
+                stats["wall"].add(call.wall_ms)
+                stats["decode"].add(call.decode_ms)
+                stats["bytes"] += call.bytes
+                stats["errors"] += call.error is not None
+
+            if self.slowest_size:
+                # Min-heap on duration; the sequence number breaks ties without comparing traces
+                self._sequence += 1
+                entry = (trace.duration_ms, self._sequence, trace)
+                if len(self._slowest) < self.slowest_size:
+                    heapq.heappush(self._slowest, entry)
+                elif entry[0] > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._calls.clear()
+            self._slowest.clear()
+            self._started = time.time()
+
+    def report(self):
+        """Routes and calls ordered by total time spent, and the slowest requests first."""
+        with self._lock:
+            routes = [
+                {
+                    "endpoint": endpoint,
+                    "requests": stats["duration"].count,
+                    "total_ms": round(stats["duration"].total, 3),
+                    "mean_ms": round(stats["duration"].total / stats["duration"].count, 3),
+                    "p50_ms": round(stats["duration"].percentile(0.50), 3),
+                    "p95_ms": round(stats["duration"].percentile(0.95), 3),
+                    "max_ms": round(stats["duration"].max, 3),
+                    "api_calls_per_request": round(stats["calls"] / stats["duration"].count, 2),
+                    "api_ms_per_request": round(stats["api"].total / stats["duration"].count, 3),
+                    "bytes_per_request": round(stats["bytes"] / stats["duration"].count),
+                }
+                for endpoint, stats in self._routes.items()
+            ]
+            calls = [
+                {
+                    "call": key,
+                    "count": stats["wall"].count,
+                    "total_ms": round(stats["wall"].total, 3),
+                    "mean_ms": round(stats["wall"].total / stats["wall"].count, 3),
+                    "max_ms": round(stats["wall"].max, 3),
+                    "decode_ms": round(stats["decode"].total, 3),
+                    "bytes": stats["bytes"],
+                    "errors": stats["errors"],
+                }
+                for key, stats in self._calls.items()
+            ]
+            slowest = [trace.to_dict() for _, _, trace in sorted(self._slowest, key=lambda entry: -entry[0])]
+            since = self._started
+        routes.sort(key=lambda route: -route["total_ms"])
+        calls.sort(key=lambda call: -call["total_ms"])
+        return {"since": since, "routes": routes, "calls": calls, "slowest": slowest}
+
+
+perf_stats = PerfStats()
+
+def current_trace():
+    """Return the trace bound to the current request, if any."""
+    return _current_trace.get()
+
+def begin_trace(endpoint=None, path=None):
+    """Bind a fresh trace to the current context and return (trace, reset token)."""
+    trace = RequestTrace(endpoint, path)
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+def in_request_context(fn):
+    """
+    Wrap fn to run in a copy of the caller's context, e.g. on a thread pool,
+    with the running thread counted as working for the caller's trace.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(_run_for_trace, fn, args, kwargs)
+    return run
+
+def _run_for_trace(fn, args, kwargs):
+    trace = _current_trace.get()
+    if trace is None:
+        return fn(*args, **kwargs)
+    ident = threading.get_ident()
+    trace.threads.add(ident)
+    try:
+        if trace.profile is not None:
+            return trace.profile.run(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+    finally:
+        trace.threads.discard(ident)
+
+def add_call_observer(observer):
+    """Have observer(call) called with every ApiCall, including calls made outside requests."""
+    _observers.append(observer)
+
+def record_call(api_fn, args, kwargs, nbytes, decode_ms, wall_ms, error=None):
+    """Record one API call on the current trace, if any, and pass it to the observers."""
+    verb, resource, namespace = describe_call(api_fn, args, kwargs)
+    call = ApiCall(verb, resource, namespace, nbytes, decode_ms, wall_ms, error)
+    for observer in _observers:
+        observer(call)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(call)
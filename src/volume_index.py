@@ -0,0 +1,104 @@
+import threading
+
+
+def claim_key(pv):
+    """Return the (namespace, name) of the claim a PV row is bound or reserved to, or None."""
+    if pv["claim_name"] == "Unbound":
+        return None
+    return pv["claim_namespace"], pv["claim_name"]
+
+
+class VolumeIndex:
+    """
+    PV and PVC rows indexed for joining in both directions.
+
+    PVs are keyed by name (what a claim's spec.volumeName points at) and by
+    their claimRef (namespace, name); claims are keyed by (namespace, name).
+    Matching a claim to its volume, or a volume to its claim, is a dict lookup
+    instead of a scan of the other kind.
+
+    The index is either built once from lists (add_pv/add_pvc) or kept current
+    from informer events through handler().
+    """
+
+    def __init__(self):
+        self._pvs = {}
+        self._pvs_by_claim = {}
+        self._pvcs = {}
+        self._lock = threading.Lock()
+
+    def add_pv(self, pv):
+        with self._lock:
+            self._remove_pv(pv["name"])
+            self._pvs[pv["name"]] = pv
+            key = claim_key(pv)
+            if key is not None:
+                self._pvs_by_claim[key] = pv
+
+    def remove_pv(self, name):
+        with self._lock:
+            self._remove_pv(name)
+
+    def _remove_pv(self, name):
+        old = self._pvs.pop(name, None)
+        if old is None:
+            return
+        key = claim_key(old)
+        if key is not None and self._pvs_by_claim.get(key) is old:
+            del self._pvs_by_claim[key]
+
+    def add_pvc(self, pvc):
+        with self._lock:
+            self._pvcs[(pvc["namespace"], pvc["name"])] = pvc
+
+    def remove_pvc(self, namespace, name):
+        with self._lock:
+            self._pvcs.pop((namespace, name), None)
+
+    def handler(self, kind, row_builder):
+        """Return an informer handler that keeps the rows of one kind up to date."""
+        def handle(event_type, obj, old_obj):
+            metadata = obj["metadata"]
+            if kind == "persistent_volumes":
+                if event_type == "DELETED":
+                    self.remove_pv(metadata["name"])
+                else:
+                    self.add_pv(row_builder(obj))
+            elif event_type == "DELETED":
+                self.remove_pvc(metadata.get("namespace"), metadata["name"])
+            else:
+                self.add_pvc(row_builder(obj))
+        return handle
+
+    def pv_for(self, pvc):
+        """
+        Return the PV row of a claim: the volume named by spec.volumeName, or for
+        a claim that is not bound yet, a volume whose claimRef reserves it.
+        """
+        with self._lock:
+            if pvc["volume_name"]:
+                pv = self._pvs.get(pvc["volume_name"])
+                if pv is not None:
+                    return pv
+            return self._pvs_by_claim.get((pvc["namespace"], pvc["name"]))
+
+    def pvc_for(self, pv):
+        """Return the claim row a PV's claimRef points at, if that claim exists."""
+        key = claim_key(pv)
+        if key is None:
+            return None
+        with self._lock:
+            return self._pvcs.get(key)
+
+    def pvs(self):
+        with self._lock:
+            return list(self._pvs.values())
+
+    def pvcs(self):
+        with self._lock:
+            return list(self._pvcs.values())
+
+    def join(self, pvcs=None):
+        """Yield (pvc, pv or None) for every claim in `pvcs`, or every indexed claim."""
+        for pvc in self.pvcs() if pvcs is None else pvcs:
+            yield pvc, self.pv_for(pvc)
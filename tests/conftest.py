@@ -0,0 +1,53 @@
+"""
+Tests run the Flask app against the benchmark apiserver (benchmarks/fake_apiserver.py)
+serving a small synthetic cluster, with informers off so every read reaches it.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.cluster import generate_cluster  # noqa: E402
+from benchmarks.fake_apiserver import FakeApiServer  # noqa: E402
+
+_apiserver = None
+
+
+def pytest_configure(config):
+    # kubefun reads its settings when its modules are imported, so they are set before any test imports it
+    global _apiserver
+    workdir = tempfile.mkdtemp(prefix="kubefun-tests-")
+    _apiserver = FakeApiServer(generate_cluster("small")).start()
+    os.environ.pop("KUBEFUN_CACHE_URL", None)
+    os.environ.update({
+        "KUBECONFIG": _apiserver.write_kubeconfig(os.path.join(workdir, "kubeconfig")),
+        "KUBEFUN_INFORMERS": "false",
+        "KUBEFUN_METRICS_INTERVAL": "0",
+        "KUBEFUN_PROFILING": "true",
+        "KUBEFUN_PROFILE_DIR": os.path.join(workdir, "profiles"),
+    })
+
+
+def pytest_unconfigure(config):
+    if _apiserver is not None:
+        _apiserver.stop()
+
+
+@pytest.fixture
+def apiserver():
+    return _apiserver
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import urllib3
+
+from benchmarks.run import free_port
+from src.kube_cache import CACHE_TOKEN_HEADER
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "test-token"
+
+
+@pytest.fixture(scope="module")
+def cache_url():
+    port = free_port()
+    env = {**os.environ, "KUBEFUN_CACHE_PORT": str(port), "KUBEFUN_CACHE_TOKEN": TOKEN}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.cache_server"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    http = urllib3.PoolManager()
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                status = http.request("GET", f"{url}/status", retries=False).json()
+                if all(version is not None for version in status.values()):
+                    break
+            except urllib3.exceptions.HTTPError:
+                pass
+            time.sleep(0.2)
+        else:
+            pytest.fail("The cache process did not sync in time.")
+        yield url
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def _request(method, url, token=None, body=None):
+    headers = {CACHE_TOKEN_HEADER: token} if token is not None else {}
+    return urllib3.request(method, url, body=body, headers=headers, retries=False)
+
+
+def test_writes_and_reads_need_the_token(cache_url):
+    assert _request("PUT", f"{cache_url}/kv/pods?key=k", body=b"1").status == 403
+    assert _request("PUT", f"{cache_url}/kv/pods?key=k", token="wrong", body=b"1").status == 403
+    assert _request("GET", f"{cache_url}/list/pods").status == 403
+    assert _request("PUT", f"{cache_url}/kv/pods?key=k", token=TOKEN, body=b"1").status == 200
+    assert _request("GET", f"{cache_url}/kv/pods?key=k", token=TOKEN).json() == 1
+    # Sync status and metrics hold no cluster objects
+    assert _request("GET", f"{cache_url}/status").status == 200
+
+
+def test_served_calls_return_projected_rows(cache_url):
+    body = json.dumps([[], {}]).encode()
+    assert _request("POST", f"{cache_url}/call/get_namespaces_with_counts", body=body).status == 403
+    response = _request("POST", f"{cache_url}/call/get_namespaces_with_counts", token=TOKEN, body=body)
+    assert response.status == 200
+    namespaces = response.json()
+    assert {"name", "pods", "deployments", "services", "secrets"} <= set(namespaces[0])
+
+    body = json.dumps([["ns-1"], {}]).encode()
+    pods = _request("POST", f"{cache_url}/call/get_pods", token=TOKEN, body=body).json()
+    assert pods and {pod["namespace"] for pod in pods} == {"ns-1"}
+    # Only functions marked @served_by_cache can be called
+    assert _request("POST", f"{cache_url}/call/load_kube_config", token=TOKEN, body=body).status == 404
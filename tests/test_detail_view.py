@@ -0,0 +1,48 @@
+import pytest
+
+from src.detail_view import resolve_pointer, summarize
+
+DOCUMENT = {
+    "metadata": {"name": "node-0", "labels": {"kubernetes.io/hostname": "node-0"}},
+    "status": {"addresses": [{"type": "InternalIP"}, {"type": "Hostname"}]},
+}
+
+
+def test_resolve_pointer():
+    assert resolve_pointer(DOCUMENT, "") is DOCUMENT
+    assert resolve_pointer(DOCUMENT, "/status/addresses/1/type") == "Hostname"
+    assert resolve_pointer(DOCUMENT, "/metadata/labels/kubernetes.io~1hostname") == "node-0"
+
+
+@pytest.mark.parametrize("index", ["01", "00", "-1", "+1", "1.0", "²", "١", " 1", ""])
+def test_resolve_pointer_rejects_invalid_array_indexes(index):
+    with pytest.raises(LookupError):
+        resolve_pointer(DOCUMENT, f"/status/addresses/{index}")
+
+
+def test_summarize_defers_managed_fields():
+    document = {"metadata": {"name": "node-0", "managedFields": [{"manager": "kubelet"}]}}
+    metadata = summarize(document, "/metadata")
+    managed_fields = next(child for child in metadata["children"] if child["key"] == "managedFields")
+    assert managed_fields["lazy"]
+    assert summarize(document, "/metadata/managedFields")["children"][0]["pointer"] == "/metadata/managedFields/0"
+
+
+def test_details_api_answers_invalid_indexes_with_404(client):
+    response = client.get("/api/details/node/node-0?pointer=/status/addresses/%C2%B2")
+    assert response.status_code == 404
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("path", ["/api/details/node/nope", "/api/details/namespace/nope", "/api/details/pv/nope"])
+def test_details_api_answers_missing_objects_with_404(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("path", ["/node/nope", "/namespace/nope"])
+def test_detail_pages_render_missing_objects(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert b"Failed to fetch" in response.data
@@ -0,0 +1,32 @@
+import os
+import pstats
+
+from src import profiling
+
+
+def _profiled_functions(name):
+    stats = pstats.Stats(os.path.join(profiling.PROFILE_DIR, name))
+    return {function for _, _, function in stats.stats}
+
+
+def test_pstats_profile_covers_pool_tasks(client):
+    # The dashboard counts pods, namespaces, deployments and services on the snapshot pool
+    response = client.get("/dashboard?profile=pstats")
+    assert response.status_code == 200
+    name = response.headers[profiling.HEADER].rsplit("/", 1)[-1]
+    functions = _profiled_functions(name)
+    assert "_fetch_count" in functions
+    assert "call_json" in functions
+
+
+def test_pstats_profiles_run_one_at_a_time(client):
+    running = profiling.Profile("pstats", trace=None, endpoint="test").start()
+    try:
+        response = client.get("/dashboard?profile=pstats")
+        assert response.status_code == 409
+        assert "error" in response.get_json()
+        # Sampled profiles do not use cProfile and still run
+        assert client.get("/dashboard?profile=collapsed").status_code == 200
+    finally:
+        running.stop()
+    assert client.get("/dashboard?profile=pstats").status_code == 200
@@ -0,0 +1,56 @@
+from fractions import Fraction
+
+import pytest
+
+from src.quantity import parse_column, parse_cpu, parse_memory, parse_quantity
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("250m", Fraction(1, 4)),
+    ("2", Fraction(2)),
+    ("1.5k", Fraction(1500)),
+    ("123456n", Fraction(123456, 10 ** 9)),
+    ("3464u", Fraction(3464, 10 ** 6)),
+    ("129M", Fraction(129 * 10 ** 6)),
+    ("1Ki", Fraction(1024)),
+    ("1.5Gi", Fraction(3 * 2 ** 29)),
+    ("256Mi", Fraction(256 * 2 ** 20)),
+    (".5", Fraction(1, 2)),
+    ("5.", Fraction(5)),
+])
+def test_suffixes(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1e3", Fraction(1000)),
+    ("1E-3", Fraction(1, 1000)),
+    ("1.5e+2", Fraction(150)),
+    ("2E0", Fraction(2)),
+])
+def test_exponents(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("+1Ki", Fraction(1024)),
+    ("-100m", Fraction(-1, 10)),
+    ("-1e3", Fraction(-1000)),
+])
+def test_signs(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    "", " ", "Ki", "m", ".", "-", "abc", "1.2.3", "1Z", "1ki", "1KiB", "1e", "1e3m", "1E1.5", "--1", "1 Gi", None, 5,
+])
+def test_rejects_malformed_input(value):
+    with pytest.raises(ValueError, match="Invalid quantity"):
+        parse_quantity(value)
+
+
+def test_unit_conversions():
+    assert parse_cpu("250m") == 0.25
+    assert parse_memory("1.5Gi") == 1536.0
+    assert parse_memory("128974848") == pytest.approx(123.0, abs=0.01)
+    assert list(parse_column(parse_cpu, ["1", "500m"])) == [1.0, 0.5]
@@ -0,0 +1,20 @@
+def test_table_draws_reuse_the_cached_list(client, apiserver):
+    apiserver.requests.clear()
+    pages = [
+        client.get(f"/api/pods?draw={draw}&start={start}&length=10&search[value]={search}").get_json()
+        for draw, (start, search) in enumerate([(0, ""), (10, ""), (0, "app-")], 1)
+    ]
+    assert [page["draw"] for page in pages] == [1, 2, 3]
+    assert all(len(page["data"]) == 10 for page in pages)
+    assert pages[0]["data"] != pages[1]["data"]
+    assert apiserver.requests["LIST pods"] == 1
+
+
+def test_table_rows_filter_by_namespace(client):
+    page = client.get("/api/secrets?namespace=ns-1&length=-1").get_json()
+    assert page["recordsTotal"] > 0
+    assert {row["namespace"] for row in page["data"]} == {"ns-1"}
+
+
+def test_unknown_table_is_404(client):
+    assert client.get("/api/widgets").status_code == 404